@@ -0,0 +1,306 @@
+"""
+Offline normalization of Australian and New Zealand street addresses.
+
+Produces a canonical key so that spelling variants of the same address
+("45 William St, Melbourne", "45 william street melbourne",
+"45 William St., Melbourne VIC") share one Places lookup, one cache entry
+and one batch slot. Everything here is local string processing - no API calls.
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+from html import escape
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Street types -> Australia Post / NZ Post standard abbreviation
+STREET_TYPES = {
+    "ALLEY": "ALLY", "ALLY": "ALLY",
+    "ARCADE": "ARC", "ARC": "ARC",
+    "AVENUE": "AVE", "AVE": "AVE", "AV": "AVE",
+    "BOULEVARD": "BVD", "BOULEVARDE": "BVD", "BLVD": "BVD", "BVD": "BVD",
+    "CIRCUIT": "CCT", "CCT": "CCT",
+    "CLOSE": "CL", "CL": "CL",
+    "COURT": "CT", "CT": "CT",
+    "CRESCENT": "CRES", "CRES": "CRES", "CR": "CRES",
+    "DRIVE": "DR", "DR": "DR",
+    "ESPLANADE": "ESP", "ESP": "ESP",
+    "GROVE": "GR", "GR": "GR",
+    "HIGHWAY": "HWY", "HWY": "HWY",
+    "LANE": "LANE", "LN": "LANE",
+    "PARADE": "PDE", "PDE": "PDE",
+    "PLACE": "PL", "PL": "PL",
+    "QUAY": "QY", "QY": "QY",
+    "ROAD": "RD", "RD": "RD",
+    "SQUARE": "SQ", "SQ": "SQ",
+    "STREET": "ST", "ST": "ST",
+    "TERRACE": "TCE", "TCE": "TCE", "TERR": "TCE",
+    "WAY": "WAY",
+}
+
+AU_STATES = {
+    "NEW SOUTH WALES": "NSW", "NSW": "NSW",
+    "VICTORIA": "VIC", "VIC": "VIC",
+    "QUEENSLAND": "QLD", "QLD": "QLD",
+    "SOUTH AUSTRALIA": "SA", "SA": "SA",
+    "WESTERN AUSTRALIA": "WA", "WA": "WA",
+    "TASMANIA": "TAS", "TAS": "TAS",
+    "NORTHERN TERRITORY": "NT", "NT": "NT",
+    "AUSTRALIAN CAPITAL TERRITORY": "ACT", "ACT": "ACT",
+}
+
+COUNTRIES = {
+    "AUSTRALIA": "AU", "AU": "AU", "AUS": "AU",
+    "NEW ZEALAND": "NZ", "NZ": "NZ", "AOTEAROA": "NZ",
+}
+
+# Localities common enough to infer the state when it was omitted
+KNOWN_LOCALITIES = {
+    "SYDNEY": ("AU", "NSW"), "PARRAMATTA": ("AU", "NSW"), "NEWCASTLE": ("AU", "NSW"),
+    "MELBOURNE": ("AU", "VIC"), "GEELONG": ("AU", "VIC"),
+    "BRISBANE": ("AU", "QLD"), "GOLD COAST": ("AU", "QLD"),
+    "ADELAIDE": ("AU", "SA"),
+    "PERTH": ("AU", "WA"),
+    "HOBART": ("AU", "TAS"),
+    "DARWIN": ("AU", "NT"),
+    "CANBERRA": ("AU", "ACT"),
+    "AUCKLAND": ("NZ", ""), "WELLINGTON": ("NZ", ""), "CHRISTCHURCH": ("NZ", ""),
+    "HAMILTON": ("NZ", ""), "DUNEDIN": ("NZ", ""), "TAURANGA": ("NZ", ""),
+}
+
+# Sub-premise designators; all unit-like words share one "unit" slot in the key
+UNIT_WORDS = {"UNIT", "U", "APARTMENT", "APT", "FLAT", "SUITE", "STE", "SHOP", "SHP"}
+LEVEL_WORDS = {"LEVEL", "LVL", "L", "FLOOR", "FL"}
+
+_NUMBER_RE = re.compile(r"^\d+[A-Z]?(-\d+[A-Z]?)?$")
+_SLASH_UNIT_RE = re.compile(r"^([A-Z]?\d+[A-Z]?)/(\d+[A-Z]?(?:-\d+[A-Z]?)?)$")
+_PREFIXED_RE = re.compile(r"^(L|LVL|U)(\d+[A-Z]?)$")
+_POSTCODE_RE = re.compile(r"^\d{4}$")
+
+
+@dataclass(frozen=True)
+class NormalizedAddress:
+    """Parsed address components, all upper-case and abbreviated."""
+    unit: str = ""
+    level: str = ""
+    street_number: str = ""
+    street_name: str = ""
+    street_type: str = ""
+    locality: str = ""
+    state: str = ""
+    postcode: str = ""
+    country: str = ""
+    raw: str = ""
+
+    @property
+    def is_parsed(self) -> bool:
+        return bool(self.street_number and self.street_name)
+
+    @property
+    def key(self) -> str:
+        """
+        Canonical cache key. The postcode is redundant with locality + state, so it
+        only takes part when no locality was given - that way "Melbourne" and
+        "Melbourne VIC 3000" collapse to the same key.
+        """
+        if not self.is_parsed:
+            return "raw:" + self.raw
+        place = self.locality or self.postcode
+        return "|".join([
+            self.country, self.state, place,
+            f"{self.street_name} {self.street_type}".strip(),
+            self.street_number, self.unit, self.level,
+        ])
+
+
+def _tokenize(text: str) -> List[str]:
+    text = text.upper().replace("&", " AND ")
+    text = re.sub(r"[^\w\s/\-,]", " ", text)   # drop periods, hashes, quotes
+    text = re.sub(r"\s*-\s*", "-", text)        # "45 - 47" -> "45-47"
+    text = re.sub(r"\s*/\s*", "/", text)        # "3 / 45" -> "3/45"
+    return text.replace(",", " , ").split()
+
+
+def _match_suffix(tokens: List[str], table: dict) -> Optional[Tuple[str, int]]:
+    """Longest multi-word match of the trailing tokens against table keys."""
+    for length in (3, 2, 1):
+        if len(tokens) > length and " ".join(tokens[-length:]) in table:
+            return table[" ".join(tokens[-length:])], length
+    return None
+
+
+def normalize_address(address: str) -> NormalizedAddress:
+    """Parses an AU/NZ address string into canonical components."""
+    tokens = _tokenize(address or "")
+    raw = " ".join(t for t in tokens if t != ",")
+
+    unit = level = number = ""
+    state = postcode = country = ""
+
+    # 1. Trailing country / postcode / state (in any order, from the right)
+    tail_changed = True
+    while tokens and tail_changed:
+        tail_changed = False
+        while tokens and tokens[-1] == ",":
+            tokens.pop()
+        if not country:
+            match = _match_suffix(tokens, COUNTRIES)
+            if match:
+                country, length = match
+                del tokens[-length:]
+                tail_changed = True
+        if not state:
+            match = _match_suffix(tokens, AU_STATES)
+            if match:
+                state, length = match
+                del tokens[-length:]
+                tail_changed = True
+        if tokens and _POSTCODE_RE.match(tokens[-1]) and not postcode and len(tokens) > 1:
+            postcode = tokens.pop()
+            tail_changed = True
+
+    # 2. Leading unit / level designators
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i]
+        nxt = tokens[i + 1] if i + 1 < len(tokens) else ""
+        if tok == ",":
+            i += 1
+            continue
+        prefixed = _PREFIXED_RE.match(tok)
+        if tok in LEVEL_WORDS and nxt and (nxt[0].isdigit() or nxt == "G"):
+            level = nxt
+            i += 2
+        elif tok in UNIT_WORDS and nxt and nxt[0].isdigit():
+            unit = nxt
+            i += 2
+        elif prefixed and prefixed.group(1) in ("L", "LVL"):
+            level = prefixed.group(2)
+            i += 1
+        elif prefixed and prefixed.group(1) == "U":
+            unit = prefixed.group(2)
+            i += 1
+        else:
+            break
+    tokens = tokens[i:]
+
+    # 3. Street number (optionally "unit/number")
+    while tokens and tokens[0] == ",":
+        tokens.pop(0)
+    if tokens:
+        slash = _SLASH_UNIT_RE.match(tokens[0])
+        if slash:
+            unit, number = slash.group(1), slash.group(2)
+            tokens.pop(0)
+        elif _NUMBER_RE.match(tokens[0]):
+            number = tokens.pop(0)
+
+    # 4. Street name up to the street type; a type word with no name before it is
+    #    part of the name ("St Kilda Rd", "The Esplanade").
+    name_tokens: List[str] = []
+    street_type = ""
+    while tokens:
+        tok = tokens.pop(0)
+        if tok == ",":
+            if name_tokens:
+                break
+            continue
+        if tok in STREET_TYPES and name_tokens:
+            street_type = STREET_TYPES[tok]
+            break
+        name_tokens.append(tok)
+
+    locality = " ".join(t for t in tokens if t != ",")
+
+    # 5. Infer state/country from well-known localities and AU postcode ranges. The
+    #    city is the last comma-separated part ("Grey Lynn, Auckland"); an NZ city
+    #    does not override an Australian state that was given.
+    last_comma = max((i for i, tok in enumerate(tokens) if tok == ","), default=-1)
+    known = KNOWN_LOCALITIES.get(" ".join(tokens[last_comma + 1:]))
+    if known and not (state and known[0] == "NZ"):
+        country = country or known[0]
+        if country == known[0]:
+            state = state or known[1]
+    if state:
+        country = country or "AU"
+    if not state and postcode and country != "NZ":
+        state = _state_from_postcode(postcode)
+        country = country or ("AU" if state else "")
+
+    return NormalizedAddress(
+        unit=unit,
+        level=level,
+        street_number=number,
+        street_name=" ".join(name_tokens),
+        street_type=street_type,
+        locality=locality,
+        state=state,
+        postcode=postcode,
+        country=country,
+        raw=raw,
+    )
+
+
+def _state_from_postcode(postcode: str) -> str:
+    """Australia Post postcode ranges; returns "" if the postcode is not Australian."""
+    n = int(postcode)
+    if 200 <= n <= 299 or 2600 <= n <= 2618 or 2900 <= n <= 2920:
+        return "ACT"
+    if 1000 <= n <= 2999:
+        return "NSW"
+    if 3000 <= n <= 3999 or 8000 <= n <= 8999:
+        return "VIC"
+    if 4000 <= n <= 4999 or 9000 <= n <= 9999:
+        return "QLD"
+    if 5000 <= n <= 5999:
+        return "SA"
+    if 6000 <= n <= 6999:
+        return "WA"
+    if 7000 <= n <= 7999:
+        return "TAS"
+    if 800 <= n <= 999:
+        return "NT"
+    return ""
+
+
+def canonical_key(address: str) -> str:
+    """Shortcut for normalize_address(address).key."""
+    return normalize_address(address).key
+
+
+def validate_and_sanitize_address(address: str) -> str:
+    """
+    Validates and sanitizes the address input.
+
+    Args:
+        address: Raw address string from user input
+
+    Returns:
+        Sanitized address string
+
+    Raises:
+        ValueError: If address is invalid
+    """
+    if not address:
+        raise ValueError("Address is required")
+
+    # Remove leading/trailing whitespace
+    address = address.strip()
+
+    # Check length
+    if len(address) < 3:
+        raise ValueError("Address is too short")
+    if len(address) > 500:
+        raise ValueError("Address is too long (max 500 characters)")
+
+    # Basic pattern validation - allow alphanumeric, spaces, commas, hyphens, periods
+    if not re.match(r'^[\w\s,.\-#/]+$', address):
+        raise ValueError("Address contains invalid characters")
+
+    # Escape HTML to prevent XSS
+    address = escape(address)
+
+    logger.debug("Validated address input: %s...", address[:50])
+    return address
@@ -0,0 +1,309 @@
+"""
+Tier 3: AI classification of businesses the deterministic tiers could not place.
+
+Candidates are checked against the shared cache, the misses are split into
+size-bounded prompts, and the prompts run concurrently (up to max_concurrency)
+against the configured generateContent backends, hedged across them (see
+hedging.py) so one slow generation does not stall the request.
+
+Each candidate comes with a local shortlist of plausible classes (see
+shortlist.py); the model answers with an option number and titles are filled
+in from the local table. Candidates with no shortlist are asked for a
+free-form code, and so are those none of whose options fit: the model may
+answer with an outside code straight away, and is asked again without
+options if it does not.
+
+Businesses the model could not classify (or that no backend answered for)
+are kept in a negative cache and not asked about again until their
+re-check interval has passed (see negative_cache.py).
+"""
+
+import contextvars
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import requests
+
+from hedging import AIBackend, HedgeBudget, Hedger
+from models import AIClassification, AnzsicClass
+from negative_cache import AI_ERROR, AI_UNKNOWN, NegativeCache
+from profiling import upstream_call
+from shortlist import ShortlistIndex
+
+logger = logging.getLogger(__name__)
+
+# Answers that mean "the model could not classify this business"
+UNKNOWN_CODES = {"", "Unknown", "9999"}
+
+
+def cache_key(candidate: Dict[str, Any]) -> str:
+    return f"{candidate['name']}|{candidate.get('address', '')}"
+
+
+def negative_key(candidate: Dict[str, Any]) -> str:
+    return f"ai:{cache_key(candidate)}"
+
+
+class AITier:
+    def __init__(
+        self,
+        api_key: Optional[str],
+        backends: Union[str, Sequence[AIBackend]],
+        codes: List[AnzsicClass],
+        cache: Optional[Dict[str, AIClassification]] = None,
+        max_items_per_prompt: int = 10,
+        max_prompt_chars: int = 4000,
+        max_concurrency: int = 4,
+        timeout: float = 20,
+        shortlist_size: int = 8,
+        hedge_budget: Optional[HedgeBudget] = None,
+        hedge_default_delay: float = 3.0,
+        negative_cache: Optional[NegativeCache] = None,
+    ):
+        self.api_key = api_key
+        if isinstance(backends, str):
+            backends = [AIBackend(name=backends, url=backends, timeout=timeout)]
+        self.backends = list(backends)
+        self.shortlist_size = shortlist_size
+        self.set_codes(codes)
+        # Format: { "Business Name|Address": AIClassification }
+        self.cache = cache if cache is not None else {}
+        self.negative_cache = negative_cache if negative_cache is not None else NegativeCache()
+        self.max_items_per_prompt = max(1, max_items_per_prompt)
+        self.max_prompt_chars = max_prompt_chars
+        self.max_concurrency = max(1, max_concurrency)
+        self.hedger = Hedger(self.backends, budget=hedge_budget, default_delay=hedge_default_delay)
+
+    def set_codes(self, codes: List[AnzsicClass]) -> None:
+        """Swaps in a new code table (title lookup and shortlist index) in one assignment."""
+        self._tables = ({c.code: c.title for c in codes}, ShortlistIndex(codes))
+
+    @property
+    def official_titles(self) -> Dict[str, str]:
+        return self._tables[0]
+
+    def classify(self, candidates: List[Dict[str, Any]]) -> List[Optional[AIClassification]]:
+        """
+        Classifies candidates ({"name", "type", "address"}). Returns one entry per
+        candidate, in order; None where the model gave no usable answer, now
+        or recently (negatively cached).
+        """
+        results: List[Optional[AIClassification]] = [None] * len(candidates)
+        for i, answer in self.iter_classify(candidates):
+            results[i] = answer
+        return results
+
+    def iter_classify(self, candidates: List[Dict[str, Any]]) -> Iterator[Tuple[int, Optional[AIClassification]]]:
+        """
+        Generator version of classify. Yields (candidate index, answer) once per
+        candidate: cache hits first, then the answers of each prompt as soon as
+        that prompt completes, so callers can stream them.
+        """
+        if not self.api_key:
+            for i in range(len(candidates)):
+                yield i, None
+            return
+
+        # 1. Check Caches (and collapse duplicates within this call)
+        pending: Dict[str, List[int]] = {}
+        for i, c in enumerate(candidates):
+            key = cache_key(c)
+            if key in self.cache:
+                logger.debug("Cache hit for: %s", c['name'])
+                yield i, self.cache[key]
+            elif self.negative_cache.get(negative_key(c)) is not None:
+                logger.debug("Negative cache hit for: %s", c['name'])
+                yield i, None
+            else:
+                pending.setdefault(key, []).append(i)
+
+        if not pending:
+            return
+
+        # 2. Shortlist, chunk the misses and run the prompts concurrently
+        official_titles, index = self._tables
+        unique = [
+            (c, index.shortlist(c["name"], c.get("type", ""), self.shortlist_size))
+            for c in (candidates[indexes[0]] for indexes in pending.values())
+        ]
+        chunks = self._chunk(unique)
+        logger.info("AI tier: %s businesses in %s prompt(s)", len(unique), len(chunks))
+
+        def run(chunk):
+            return self._classify_chunk(chunk, official_titles)
+
+        # 3. Merge and Cache each prompt as it completes (failures go to the negative cache)
+        if len(chunks) == 1:
+            yield from self._merge_chunk(chunks[0], run(chunks[0]), pending)
+            return
+        pool = ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks)))
+        try:
+            futures = {pool.submit(contextvars.copy_context().run, run, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                yield from self._merge_chunk(futures[future], future.result(), pending)
+        finally:
+            # A caller that stops early (client went away) does not start the queued prompts
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _merge_chunk(self, chunk: List[Tuple[Dict[str, Any], List[AnzsicClass]]],
+                     answers: List[Union[AIClassification, str]],
+                     pending: Dict[str, List[int]]) -> Iterator[Tuple[int, Optional[AIClassification]]]:
+        """Caches one prompt's answers (failures in the negative cache) and yields them for every candidate index they cover."""
+        for (c, _), answer in zip(chunk, answers):
+            key = cache_key(c)
+            if isinstance(answer, AIClassification):
+                self.cache[key] = answer
+                self.negative_cache.clear(negative_key(c))
+            else:
+                self.negative_cache.record(negative_key(c), answer)
+                answer = None
+            for i in pending[key]:
+                yield i, answer
+
+    def _chunk(self, items: List[Tuple[Dict[str, Any], List[AnzsicClass]]]) -> List[List[Tuple[Dict[str, Any], List[AnzsicClass]]]]:
+        """Splits (candidate, shortlist) items so each prompt stays within the item and character budgets."""
+        chunks = []
+        current = []
+        current_chars = 0
+        for item in items:
+            line_chars = len(self._format_item(len(current) + 1, *item))
+            full = len(current) >= self.max_items_per_prompt or current_chars + line_chars > self.max_prompt_chars
+            if current and full:
+                chunks.append(current)
+                current, current_chars = [], 0
+            current.append(item)
+            current_chars += line_chars
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _format_item(item_id: int, candidate: Dict[str, Any], shortlist: List[AnzsicClass]) -> str:
+        line = f"{item_id}. {candidate['name']} (type: {candidate['type']})\n"
+        if shortlist:
+            options = "; ".join(f"{n}) {c.title}" for n, c in enumerate(shortlist, start=1))
+            line += f"   Options: {options}\n"
+        return line
+
+    def _build_prompt(self, chunk: List[Tuple[Dict[str, Any], List[AnzsicClass]]]) -> str:
+        items_str = "".join(self._format_item(i, c, shortlist) for i, (c, shortlist) in enumerate(chunk, start=1))
+        return f"""Classify each business into the ANZSIC 2006 industry it most likely belongs to.
+For a business with Options, answer with the number of the best option. If none of its options fit, answer with its 4-digit ANZSIC 2006 code as a string instead.
+For a business without Options, answer with its 4-digit ANZSIC 2006 code as a string, or "Unknown".
+
+{items_str}
+Return only a JSON object mapping each business number to its answer, e.g. {{"1": 2, "2": "4520", "3": "5420"}}."""
+
+    def _classify_chunk(self, chunk: List[Tuple[Dict[str, Any], List[AnzsicClass]]],
+                        official_titles: Dict[str, str]) -> List[Union[AIClassification, str]]:
+        """
+        One hedged generateContent call (plus a free-form follow-up for items none
+        of whose options fit). Never raises; returns one entry per item: its
+        AIClassification, or the negative cache failure class - AI_UNKNOWN when
+        the model could not classify it, AI_ERROR when no backend gave a usable
+        response.
+        """
+        payload = {
+            "contents": [{
+                "parts": [{"text": self._build_prompt(chunk)}]
+            }],
+            "generationConfig": {"responseMimeType": "application/json"}
+        }
+
+        api_results = self.hedger.call(lambda backend: self._request(backend, payload))
+        if api_results is None:
+            return [AI_ERROR] * len(chunk)
+
+        answers: List[Union[AIClassification, str]] = []
+        unfit = []
+        for i, (_, shortlist) in enumerate(chunk):
+            answer = api_results.get(str(i + 1))
+            if shortlist:
+                resolved = self._resolve_option(answer, shortlist, official_titles)
+                if resolved is None:
+                    unfit.append(i)
+            else:
+                resolved = self._resolve(answer, official_titles)
+            answers.append(resolved or AI_UNKNOWN)
+
+        if unfit:
+            # "None of the options fit" is not an answer: ask for a code without options
+            logger.info("AI tier: asking again without options for %s businesses", len(unfit))
+            retried = self._classify_chunk([(chunk[i][0], []) for i in unfit], official_titles)
+            for i, answer in zip(unfit, retried):
+                answers[i] = answer
+        return answers
+
+    def _request(self, backend: AIBackend, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Posts the prompt to one backend; the parsed answer object, or None on any failure."""
+        text = ""
+        try:
+            with upstream_call(f"ai.{backend.name}") as call:
+                response = requests.post(f"{backend.url}?key={self.api_key}", json=payload, timeout=backend.timeout)
+                call["status"] = response.status_code
+            if response.status_code != 200:
+                logger.error("AI Batch Error (%s): %s - %s", backend.name, response.status_code, response.text)
+                return None
+
+            result = response.json()
+            text = result["candidates"][0]["content"]["parts"][0]["text"].strip()
+            clean_text = text.replace("```json", "").replace("```", "").strip()
+            api_results = json.loads(clean_text)
+        except (KeyError, IndexError, ValueError) as e:
+            logger.error("Batch Parsing Failed (%s): %s", backend.name, e)
+            logger.debug("Raw: %s", text)
+            return None
+        except Exception as e:
+            logger.error("Batch Request Failed (%s): %s", backend.name, e)
+            return None
+
+        if not isinstance(api_results, dict):
+            logger.error("Batch Parsing Failed (%s): expected a JSON object", backend.name)
+            return None
+        return api_results
+
+    @classmethod
+    def _resolve_option(cls, answer: Any, shortlist: List[AnzsicClass],
+                        official_titles: Dict[str, str]) -> Optional[AIClassification]:
+        """
+        Maps an option number back to its class, or validates a 4-digit code given
+        instead of an option; None for 0 (none fit), anything out of range or a
+        code the ANZSIC table does not have.
+        """
+        if isinstance(answer, str) and len(answer.strip()) == 4:
+            return cls._resolve(answer, official_titles)
+        try:
+            option = int(answer)
+        except (TypeError, ValueError):
+            return None
+        if 1 <= option <= len(shortlist):
+            chosen = shortlist[option - 1]
+            return AIClassification(code=chosen.code, title=chosen.title, official=True)
+        return None
+
+    @staticmethod
+    def _resolve(info: Any, official_titles: Dict[str, str]) -> Optional[AIClassification]:
+        """
+        Validates a free-form code answer against the local ANZSIC table, whose
+        title is used. None for "Unknown" or a code the table does not have (a
+        made-up or mistyped code would be cached and stored without a hierarchy).
+        """
+        if isinstance(info, dict):
+            code = str(info.get("code", "")).strip()
+            ai_title = info.get("title") or "AI Classified Industry"
+        elif isinstance(info, (str, int)):
+            code = str(info).strip()
+            ai_title = "AI Classified Industry"
+        else:
+            return None
+
+        if code in UNKNOWN_CODES:
+            return None
+
+        official_title = official_titles.get(code)
+        if not official_title:
+            logger.info("AI tier: rejected code %r (%s), not an ANZSIC class", code[:20], ai_title)
+            return None
+        return AIClassification(code=code, title=official_title, official=True)
@@ -0,0 +1,43 @@
+"""
+Loading and versioning of the local ANZSIC database (data/anzsic_codes.json).
+
+scripts/update_anzsic_from_abs.py writes the codes file and then bumps
+"version" in the sidecar meta file (data/anzsic_codes.meta.json). A running
+locator compares that version with the one it loaded to decide when to reload.
+"""
+
+import json
+import os
+from typing import Dict, List, Set
+
+from models import AnzsicClass
+
+CODES_PATH = os.path.join(os.path.dirname(__file__), "data", "anzsic_codes.json")
+
+
+def meta_path_for(codes_path: str) -> str:
+    return os.path.splitext(codes_path)[0] + ".meta.json"
+
+
+def load_codes(codes_path: str = CODES_PATH) -> List[AnzsicClass]:
+    with open(codes_path, "r") as f:
+        return [AnzsicClass.from_dict(row) for row in json.load(f)]
+
+
+def read_data_version(codes_path: str = CODES_PATH) -> int:
+    """Version from the meta file; 0 when the data has never been refreshed."""
+    try:
+        with open(meta_path_for(codes_path), "r") as f:
+            return int(json.load(f).get("version", 0))
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def changed_codes(old: List[AnzsicClass], new: List[AnzsicClass]) -> Set[str]:
+    """Codes that were added, removed or retitled between two loads."""
+    old_titles: Dict[str, str] = {c.code: c.title for c in old}
+    new_titles: Dict[str, str] = {c.code: c.title for c in new}
+    return {
+        code for code in old_titles.keys() | new_titles.keys()
+        if old_titles.get(code) != new_titles.get(code)
+    }
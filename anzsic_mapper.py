@@ -1,365 +1,909 @@
 import requests
-import json
+import contextvars
 import os
 import logging
-from typing import Dict, List, Optional, Any
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+from address_normalizer import canonical_key
+from itsdangerous import BadData, URLSafeSerializer
+
+from ai_tier import AITier, cache_key as ai_cache_key, negative_key as ai_negative_key
+from cache_warmer import AI_PREFIX, PLACE_PREFIX, HitCounter
+from hedging import AIBackend, HedgeBudget, parse_backends
+from negative_cache import NO_MATCH, NegativeCache
+from profiling import upstream_call
+from anzsic_data import CODES_PATH, changed_codes, load_codes, read_data_version
+from models import (
+    AIClassification,
+    AnzsicClass,
+    Classification,
+    ClassificationResult,
+    SourceIntelligence,
+    UNCLASSIFIED,
+)
+from place_store import PlaceClassificationStore, PlaceSearchCache, types_fingerprint
+from result_store import ResultStore
+from single_flight import SingleFlight
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
+# Place types that describe a location rather than a business
+GENERIC_PLACE_TYPES = {"street_address", "subpremise", "premise", "route", "postal_code", "locality", "political"}
+
+@dataclass(frozen=True)
+class NearbySearchPolicy:
+    """
+    How _search_nearby explores around a generic address. Defaults ask for 5
+    places within 50 m; the radius doubles (up to max_radius) only while nothing
+    non-generic is found, and the result count doubles (up to max_result_count)
+    only while no direct Tier 1 match has been seen.
+    """
+    initial_radius: float = 50.0
+    max_radius: float = 200.0
+    initial_result_count: int = 5
+    max_result_count: int = 20
+    max_requests: int = 3
+    stop_on_direct_match: bool = True
+    # Only the fields enrichment reads
+    field_mask: str = "places.id,places.displayName,places.primaryType,places.types,places.formattedAddress"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "initial_radius": self.initial_radius,
+            "max_radius": self.max_radius,
+            "initial_result_count": self.initial_result_count,
+            "max_result_count": self.max_result_count,
+            "max_requests": self.max_requests,
+            "stop_on_direct_match": self.stop_on_direct_match,
+        }
+
+PLACES_BASE_URL = "https://places.googleapis.com/v1"
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Timeouts, connection errors, 408, 429 and 5xx may succeed later; other HTTP
+    errors will not. Errors without a response (e.g. a malformed body) may pass.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return True
+    return response.status_code in (408, 429) or response.status_code >= 500
+
+def coordinate_key(lat: float, lng: float) -> str:
+    """Cache key for a coordinate, rounded to 5 decimal places (about 1 m)."""
+    return f"geo:{lat:.5f},{lng:.5f}"
+
 class BusinessAnzsicLocator:
-    def __init__(self, google_api_key: Optional[str], gemini_api_key: Optional[str] = None):
+    def __init__(
+        self,
+        google_api_key: Optional[str],
+        gemini_api_key: Optional[str] = None,
+        ai_max_items_per_prompt: int = 10,
+        ai_max_concurrency: int = 4,
+        data_path: Optional[str] = None,
+        reload_check_interval: float = 30.0,
+        place_store_ttl: float = 24 * 3600,
+        place_cache_ttl: float = 6 * 3600,
+        place_cache_max_entries: int = 50000,
+        nearby_policy: Optional[NearbySearchPolicy] = None,
+        token_secret: Optional[str] = None,
+        ai_backends: Optional[List[AIBackend]] = None,
+        ai_hedge_ratio: float = 0.1,
+        ai_hedge_delay: float = 3.0,
+        negative_ttls: Optional[Dict[str, float]] = None,
+        places_base_url: str = PLACES_BASE_URL,
+        result_store: Optional[ResultStore] = None,
+    ):
         self.api_key = google_api_key
         self.gemini_api_key = gemini_api_key
-        self.base_url = "https://places.googleapis.com/v1/places:searchText"
-        self.nearby_url = "https://places.googleapis.com/v1/places:searchNearby"
-        self.gemini_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-flash-latest:generateContent"
+        # places_base_url can point at a mirror or the local upstream simulator (scripts/upstream_simulator.py)
+        self.base_url = f"{places_base_url}/places:searchText"
+        self.nearby_url = f"{places_base_url}/places:searchNearby"
+        # AI backends in priority order; later ones only receive hedged or failed-over prompts
+        self.ai_backends = ai_backends or parse_backends(None)
+        self.gemini_url = self.ai_backends[0].url
+        self.nearby_policy = nearby_policy or NearbySearchPolicy()
+
+        # Signs the opaque candidate tokens of lazy AI lookups. Without a configured
+        # secret, tokens are only valid in this process.
+        self._candidate_serializer = URLSafeSerializer(token_secret or os.urandom(32), salt="anzsic-candidate")
         
         # Simple in-memory cache for AI results to save costs and speed up
-        # Format: { "Business Name|Address": { "code": "1234", "title": "Title" } }
+        # Format: { "Business Name|Address": AIClassification }
         self.ai_cache = {}
 
+        # Places text search results keyed by canonical address (see address_normalizer), LRU + TTL
+        # Format: { "AU|VIC|MELBOURNE|WILLIAM ST|45||": <searchText JSON> }
+        self.place_cache = PlaceSearchCache(ttl_seconds=place_cache_ttl, max_entries=place_cache_max_entries)
+        self._text_search_flight = SingleFlight()
+
+        # Use counts of place_cache and ai_cache entries; the hottest go into warm-up snapshots (cache_warmer.py)
+        self.cache_hits = HitCounter()
+
+        # Final classifications keyed by Google place id (TTL + type-change invalidation)
+        self.place_store = PlaceClassificationStore(ttl_seconds=place_store_ttl)
+
+        # Optional columnar log of every fresh classification, for reporting (see result_store.py)
+        self.result_store = result_store
+
+        # Recent failures (no match, AI "Unknown", AI errors) with exponential re-check
+        # Format: { "address:<canonical key>" | "geo:lat,lng" | "ai:Name|Address": NegativeEntry }
+        self.negative_cache = NegativeCache(base_ttls=negative_ttls)
+
         # Load enhanced ANZSIC codes from JSON
-        self.anzsic_codes = []
+        # The data can be refreshed on disk while running (see reload_codes_if_changed)
+        self.data_path = data_path or CODES_PATH
+        self.data_version = read_data_version(self.data_path)
+        self.reload_check_interval = reload_check_interval
+        self._last_reload_check = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self.anzsic_codes: List[AnzsicClass] = []
+        self.anzsic_by_code: Dict[str, AnzsicClass] = {}
         try:
-            json_path = os.path.join(os.path.dirname(__file__), "data", "anzsic_codes.json")
-            if os.path.exists(json_path):
-                with open(json_path, "r") as f:
-                    self.anzsic_codes = json.load(f)
-                logger.info(f"Loaded {len(self.anzsic_codes)} ANZSIC codes from database.")
+            if os.path.exists(self.data_path):
+                self.anzsic_codes = load_codes(self.data_path)
+                self.anzsic_by_code = {c.code: c for c in self.anzsic_codes}
+                logger.info("Loaded %s ANZSIC codes from database (version %s).", len(self.anzsic_codes), self.data_version)
             else:
                 logger.warning("anzsic_codes.json not found. Keyword matching will be limited.")
         except Exception as e:
-            logger.error(f"Error loading ANZSIC JSON: {e}")
+            logger.error("Error loading ANZSIC JSON: %s", e)
+
+        # Tier 3: AI classification, sharing ai_cache and resolving titles from the local DB
+        self.ai_tier = AITier(
+            gemini_api_key,
+            self.ai_backends,
+            codes=self.anzsic_codes,
+            cache=self.ai_cache,
+            max_items_per_prompt=ai_max_items_per_prompt,
+            max_concurrency=ai_max_concurrency,
+            hedge_budget=HedgeBudget(ratio=ai_hedge_ratio),
+            hedge_default_delay=ai_hedge_delay,
+            negative_cache=self.negative_cache,
+        )
 
         # Mapping of Google Place Types to ANZSIC Codes (Fast Tier 1)
-        self.anzsic_map = {
+        self.anzsic_map: Dict[str, Classification] = {
             # Food & Beverage
-            "cafe": {"code": "4511", "title": "Cafes and Restaurants"},
-            "restaurant": {"code": "4511", "title": "Cafes and Restaurants"},
-            "bar": {"code": "4520", "title": "Pubs, Taverns and Bars"},
-            "bakery": {"code": "1174", "title": "Bakery Product Manufacturing (Non-factory based)"},
-            "meal_takeaway": {"code": "4512", "title": "Takeaway Food Services"},
+            "cafe": Classification("4511", "Cafes and Restaurants"),
+            "restaurant": Classification("4511", "Cafes and Restaurants"),
+            "bar": Classification("4520", "Pubs, Taverns and Bars"),
+            "bakery": Classification("1174", "Bakery Product Manufacturing (Non-factory based)"),
+            "meal_takeaway": Classification("4512", "Takeaway Food Services"),
             
             # Retail
-            "clothing_store": {"code": "4251", "title": "Clothing Retailing"},
-            "shoe_store": {"code": "4252", "title": "Footwear Retailing"},
-            "supermarket": {"code": "4110", "title": "Supermarket and Grocery Stores"},
-            "grocery_store": {"code": "4110", "title": "Supermarket and Grocery Stores"},
-            "convenience_store": {"code": "4110", "title": "Supermarket and Grocery Stores"},
-            "furniture_store": {"code": "4211", "title": "Furniture Retailing"},
-            "hardware_store": {"code": "4231", "title": "Hardware and Building Supplies Retailing"},
-            "electronics_store": {"code": "4221", "title": "Electrical, Electronic and Gas Appliance Retailing"},
-            "book_store": {"code": "4244", "title": "Newspaper and Book Retailing"},
-            "florist": {"code": "4274", "title": "Flower Retailing"},
-            "pharmacy": {"code": "4271", "title": "Pharmaceutical, Cosmetic and Toiletry Goods Retailing"},
-            "drugstore": {"code": "4271", "title": "Pharmaceutical, Cosmetic and Toiletry Goods Retailing"},
+            "clothing_store": Classification("4251", "Clothing Retailing"),
+            "shoe_store": Classification("4252", "Footwear Retailing"),
+            "supermarket": Classification("4110", "Supermarket and Grocery Stores"),
+            "grocery_store": Classification("4110", "Supermarket and Grocery Stores"),
+            "convenience_store": Classification("4110", "Supermarket and Grocery Stores"),
+            "furniture_store": Classification("4211", "Furniture Retailing"),
+            "hardware_store": Classification("4231", "Hardware and Building Supplies Retailing"),
+            "electronics_store": Classification("4221", "Electrical, Electronic and Gas Appliance Retailing"),
+            "book_store": Classification("4244", "Newspaper and Book Retailing"),
+            "florist": Classification("4274", "Flower Retailing"),
+            "pharmacy": Classification("4271", "Pharmaceutical, Cosmetic and Toiletry Goods Retailing"),
+            "drugstore": Classification("4271", "Pharmaceutical, Cosmetic and Toiletry Goods Retailing"),
             
             # Services
-            "hair_salon": {"code": "9511", "title": "Hairdressing and Beauty Services"},
-            "beauty_salon": {"code": "9511", "title": "Hairdressing and Beauty Services"},
-            "real_estate_agency": {"code": "6720", "title": "Real Estate Services"},
-            "travel_agency": {"code": "7220", "title": "Travel Agency and Tour Arrangement Services"},
-            "lawyer": {"code": "6931", "title": "Legal Services"},
-            "accounting": {"code": "6932", "title": "Accounting Services"},
-            "bank": {"code": "6221", "title": "Banking"},
-            "gym": {"code": "9111", "title": "Health and Fitness Centres and Gymnasia Operation"},
-            "laundry": {"code": "9531", "title": "Laundry and Dry-Cleaning Services"},
+            "hair_salon": Classification("9511", "Hairdressing and Beauty Services"),
+            "beauty_salon": Classification("9511", "Hairdressing and Beauty Services"),
+            "real_estate_agency": Classification("6720", "Real Estate Services"),
+            "travel_agency": Classification("7220", "Travel Agency and Tour Arrangement Services"),
+            "lawyer": Classification("6931", "Legal Services"),
+            "accounting": Classification("6932", "Accounting Services"),
+            "bank": Classification("6221", "Banking"),
+            "gym": Classification("9111", "Health and Fitness Centres and Gymnasia Operation"),
+            "laundry": Classification("9531", "Laundry and Dry-Cleaning Services"),
             
             # Health
-            "doctor": {"code": "8511", "title": "General Practice Medical Services"},
-            "dentist": {"code": "8531", "title": "Dental Services"},
-            "hospital": {"code": "8401", "title": "Hospitals (Except Psychiatric Hospitals)"},
-            "veterinary_care": {"code": "6970", "title": "Veterinary Services"},
+            "doctor": Classification("8511", "General Practice Medical Services"),
+            "dentist": Classification("8531", "Dental Services"),
+            "hospital": Classification("8401", "Hospitals (Except Psychiatric Hospitals)"),
+            "veterinary_care": Classification("6970", "Veterinary Services"),
             
             # Accommodation
-            "hotel": {"code": "4400", "title": "Accommodation"},
-            "motel": {"code": "4400", "title": "Accommodation"},
-            "lodging": {"code": "4400", "title": "Accommodation"},
+            "hotel": Classification("4400", "Accommodation"),
+            "motel": Classification("4400", "Accommodation"),
+            "lodging": Classification("4400", "Accommodation"),
             
             # Automotive
-            "car_dealer": {"code": "3911", "title": "Car Retailing"},
-            "car_rental": {"code": "6611", "title": "Passenger Car Rental and Hiring"},
-            "car_repair": {"code": "9419", "title": "Other Automotive Repair and Maintenance"},
-            "gas_station": {"code": "4000", "title": "Fuel Retailing"},
+            "car_dealer": Classification("3911", "Car Retailing"),
+            "car_rental": Classification("6611", "Passenger Car Rental and Hiring"),
+            "car_repair": Classification("9419", "Other Automotive Repair and Maintenance"),
+            "gas_station": Classification("4000", "Fuel Retailing"),
             
             # Education
-            "school": {"code": "8021", "title": "Primary Education"},
-            "university": {"code": "8102", "title": "Higher Education"},
+            "school": Classification("8021", "Primary Education"),
+            "university": Classification("8102", "Higher Education"),
             
             # Other
-            "library": {"code": "6010", "title": "Libraries and Archives"},
-            "post_office": {"code": "5101", "title": "Postal Services"},
-            "police": {"code": "7711", "title": "Police Services"},
-            "fire_station": {"code": "7713", "title": "Fire Protection and Other Emergency Services"}
+            "library": Classification("6010", "Libraries and Archives"),
+            "post_office": Classification("5101", "Postal Services"),
+            "police": Classification("7711", "Police Services"),
+            "fire_station": Classification("7713", "Fire Protection and Other Emergency Services")
         }
+        self.anzsic_map = self._retitled_map(self.anzsic_map, self.anzsic_by_code)
 
-    def _batch_ai_classification(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def get_business_details(self, address: str, lazy_ai: bool = False) -> Dict[str, Any]:
         """
-        Sends a single batch request to Gemini to classify multiple businesses.
-        Includes Caching to minimize API calls.
+        Queries Google Places API to find the business at the address.
+        Collects the events from iter_business_details into a single response.
+        With lazy_ai, Tier 2 failures carry a candidate_token instead of being sent
+        to the AI tier; see classify_candidate_tokens.
         """
-        if not self.gemini_api_key:
-            return {}
+        results = []
+        status = "single"
+        search = None
+        for event in self.iter_business_details(address, lazy_ai=lazy_ai):
+            kind = event["event"]
+            if kind == "error":
+                return self._error_response(event)
+            if kind == "candidate":
+                results.append(event["result"])
+            elif kind == "ai_classification":
+                results[event["index"]].ai_classification = event["ai_classification"]
+            elif kind == "done":
+                status = event["status"]
+                search = event.get("search")
 
-        batch_results = {}
-        to_process = []
-        
-        # 1. Check Cache
-        for c in candidates:
-            cache_key = f"{c['name']}|{c['address']}"
-            if cache_key in self.ai_cache:
-                logger.debug(f"Cache hit for: {c['name']}")
-                batch_results[c['name']] = self.ai_cache[cache_key]
-            else:
-                to_process.append(c)
-        
-        if not to_process:
-            return batch_results
-
-        # 2. Process missing items
-        items_str = ""
-        for c in to_process:
-             items_str += f"- Name: {c['name']}, Type: {c['type']}\n"
-             
-        prompt = f"""
-        You are an expert ANZSIC classifier. Analyze the following list of businesses and assign the most appropriate 4-digit ANZSIC 2006 code AND the official ANZSIC Title to each.
-        
-        List:
-        {items_str}
-        
-        You MUST return the result as a strict JSON object where keys are the specific Business Names provided and values are objects containing "code" and "title".
-        
-        CRITICAL: The "title" field MUST be the official ANZSIC industry title corresponding to the code. Do not leave it empty.
-        
-        Example format:
-        {{
-            "Business A": {{ "code": "1234", "title": "Software Publishing" }},
-            "Business B": {{ "code": "5678", "title": "Plumbing Services" }}
-        }}
-        
-        Do not include markdown formatting like ```json. Return only the raw JSON string. If you cannot determine a code, use "Unknown".
+        if status == "multiple":
+            response = {
+                "status": "multiple",
+                "candidates": results
+            }
+            if search:
+                response["search"] = search
+            return response
+        return {"status": "single", "result": results[0]}
+
+    def iter_business_details(self, address: str, lazy_ai: bool = False) -> Iterator[Dict[str, Any]]:
         """
-        
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }]
+        Generator version of get_business_details used by the streaming endpoint.
+
+        Yields events as each stage completes so callers can render early:
+          {"event": "place", "place": {...}}                         resolved text search result
+          {"event": "candidate", "index": i, "result": ClassificationResult}   deterministic classification
+          {"event": "ai_classification", "index": i, "ai_classification": AIClassification}
+          {"event": "done", "status": "single" | "multiple", "count": n, "from_store": bool,
+           "search": {...} | None}                                  nearby search policy and what it did
+          {"event": "error", "error": "...", "negative_cached": bool} terminal, nothing follows;
+                                                                     negative_cached if the address failed
+                                                                     recently and was not looked up again;
+                                                                     "retryable": true if an upstream or
+                                                                     unexpected failure may pass
+        """
+        self.reload_codes_if_changed()
+
+        # DEMO MODE CHECK
+        # If no valid key is provided, we return mock data so the user can test the UI.
+        if self._is_demo_mode():
+            logger.warning("No valid API Key found. Using DEMO/MOCK mode.")
+            result = self._get_mock_response(address)
+            yield {"event": "place", "place": self._place_summary_from_result(result)}
+            yield {"event": "candidate", "index": 0, "result": result}
+            yield {"event": "done", "status": "single", "count": 1, "from_store": False}
+            return
+
+        address_key = canonical_key(address)
+        negative_key = f"address:{address_key}"
+        if self.negative_cache.get(negative_key) is not None:
+            yield {"event": "error", "error": "No business found at this address.", "negative_cached": True}
+            return
+
+        try:
+            data = self._search_text(address)
+        except requests.exceptions.RequestException as e:
+            yield {"event": "error", "error": f"API Request Failed: {str(e)}", "retryable": is_retryable(e)}
+            return
+        except Exception as e:
+            yield {"event": "error", "error": f"An error occurred: {str(e)}", "retryable": True}
+            return
+
+        if not data.get("places"):
+            self.negative_cache.record(negative_key, NO_MATCH)
+            yield {"event": "error", "error": "No business found at this address.", "negative_cached": False}
+            return
+        # Found: an earlier failure of this address no longer counts towards a longer TTL
+        self.negative_cache.clear(negative_key)
+
+        place = data["places"][0]
+
+        # CHECK FOR GENERIC ADDRESS
+        primary_type = place.get("primaryType")
+        is_generic = (primary_type is None) or (primary_type in GENERIC_PLACE_TYPES)
+        place_id = place.get("id")
+
+        yield {
+            "event": "place",
+            "place": {
+                "place_id": place_id,
+                "business_name": place.get("displayName", {}).get("text", "Unknown Business"),
+                "detected_type": primary_type if primary_type else "Unknown",
+                "address": place.get("formattedAddress", "Unknown Address"),
+                "is_generic": is_generic
+            }
         }
-        
-        url = f"{self.gemini_url}?key={self.gemini_api_key}"
-        
+
+        # KNOWN PLACE CHECK
+        # A place we classified recently (under any spelling of its address) skips
+        # nearby search, enrichment and AI; results already include AI classifications.
+        fingerprint = types_fingerprint(place)
+        stored = self.place_store.get(place_id, fingerprint)
+        if stored is not None:
+            logger.info("Place store hit for %s", place_id)
+            self._touch_ai_entries(stored.results)
+            for i, res in enumerate(stored.results):
+                yield {"event": "candidate", "index": i, "result": res}
+            yield from self._iter_resolve_deferred(stored.results, lazy_ai)
+            yield {"event": "done", "status": stored.status, "count": len(stored.results), "from_store": True}
+            return
+
+        candidates = []
+        search = None
+        nearby_error = None
+        if is_generic and "location" in place:
+            logger.info("Generic address result detected (%s). Searching nearby...", primary_type)
+            lat = place["location"]["latitude"]
+            lng = place["location"]["longitude"]
+            candidates, search, nearby_error = self._search_nearby(lat, lng)
+
+        status = "multiple" if candidates else "single"
+        if not candidates:
+            # Single result flow: classify the text search hit itself
+            candidates = [place]
+
         try:
-            response = requests.post(url, json=payload, timeout=20)
-            if response.status_code == 200:
-                result = response.json()
-                try:
-                    text = result["candidates"][0]["content"]["parts"][0]["text"].strip()
-                    clean_text = text.replace("```json", "").replace("```", "").strip()
-                    
-                    api_results = json.loads(clean_text)
-                    
-                    # Merge and Cache
-                    for name, info in api_results.items():
-                        # Validate Title - If missing, fallback to the business type from input if possible, or generic
-                        final_title = info.get("title")
-                        if not final_title or final_title == "AI Classified Industry":
-                             # Try to derive a better fallback from our input "type" if possible, but here we just enforce non-empty
-                             final_title = "Industry Classification" 
-                        
-                        info["title"] = final_title
-                        
-                        # Update Batch Results
-                        batch_results[name] = info 
-                        
-                        # Update Cache (Find address for key)
-                        for c in to_process:
-                            if c['name'] == name:
-                                cache_key = f"{name}|{c['address']}"
-                                self.ai_cache[cache_key] = info
-                                break
-                                
-                except (KeyError, IndexError, json.JSONDecodeError) as e:
-                    logger.error(f"Batch Parsing Failed: {e}")
-                    logger.debug(f"Raw: {text}")
-            else:
-                logger.error(f"AI Batch Error: {response.status_code} - {response.text}")
+            results, complete = yield from self._iter_classify_candidates(candidates, lazy_ai, place_id, address_key)
         except Exception as e:
-             logger.error(f"Batch Request Failed: {e}")
-             
-        return batch_results
+            yield {"event": "error", "error": f"An error occurred: {str(e)}", "retryable": True}
+            return
+
+        # After a failed nearby request the answer may be a stand-in (the bare address): do not keep it
+        if complete and nearby_error is None:
+            self.place_store.put(place_id, fingerprint, status, results)
+        self._record_results(address_key, candidates, results)
 
-    def get_business_details(self, address: str) -> Dict[str, Any]:
+        yield {"event": "done", "status": status, "count": len(candidates), "from_store": False, "search": search}
+
+    def get_business_details_by_location(self, lat: float, lng: float, lazy_ai: bool = False) -> Dict[str, Any]:
         """
-        Queries Google Places API to find the business at the address.
+        Classifies the businesses around a coordinate. Skips the Places text search
+        and goes straight to nearby search plus deterministic and AI enrichment.
         """
-        # DEMO MODE CHECK
-        # If no valid key is provided, we return mock data so the user can test the UI.
-        if not self.api_key or self.api_key == "your_api_key_here":
+        results = []
+        search = None
+        for event in self.iter_business_details_by_location(lat, lng, lazy_ai=lazy_ai):
+            kind = event["event"]
+            if kind == "error":
+                return self._error_response(event)
+            if kind == "candidate":
+                results.append(event["result"])
+            elif kind == "ai_classification":
+                results[event["index"]].ai_classification = event["ai_classification"]
+            elif kind == "done":
+                search = event.get("search")
+
+        response = {
+            "status": "multiple",
+            "candidates": results
+        }
+        if search:
+            response["search"] = search
+        return response
+
+    def iter_business_details_by_location(self, lat: float, lng: float, lazy_ai: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Generator version of get_business_details_by_location; yields the same
+        events as iter_business_details except "place".
+        Results are kept in the place store under the rounded coordinate.
+        """
+        self.reload_codes_if_changed()
+
+        if self._is_demo_mode():
             logger.warning("No valid API Key found. Using DEMO/MOCK mode.")
-            return self._get_mock_response(address)
+            yield {"event": "candidate", "index": 0, "result": self._get_mock_response(f"{lat},{lng}")}
+            yield {"event": "done", "status": "multiple", "count": 1, "from_store": False}
+            return
 
-        headers = {
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": self.api_key,
-            # Requesting display name, primary type, multiple types, address AND location
-            "X-Goog-FieldMask": "places.displayName,places.primaryType,places.types,places.formattedAddress,places.location"
+        location_key = coordinate_key(lat, lng)
+        stored = self.place_store.get(location_key, ())
+        if stored is not None:
+            logger.info("Place store hit for %s", location_key)
+            self._touch_ai_entries(stored.results)
+            for i, res in enumerate(stored.results):
+                yield {"event": "candidate", "index": i, "result": res}
+            yield from self._iter_resolve_deferred(stored.results, lazy_ai)
+            yield {"event": "done", "status": stored.status, "count": len(stored.results), "from_store": True}
+            return
+
+        if self.negative_cache.get(location_key) is not None:
+            yield {"event": "error", "error": "No business found near this location.", "negative_cached": True}
+            return
+
+        candidates, search, error = self._search_nearby(lat, lng)
+        if not candidates:
+            if error is not None:
+                yield {"event": "error", "error": f"API Request Failed: {str(error)}", "retryable": is_retryable(error)}
+                return
+            self.negative_cache.record(location_key, NO_MATCH)
+            yield {"event": "error", "error": "No business found near this location.", "negative_cached": False}
+            return
+        self.negative_cache.clear(location_key)
+
+        try:
+            results, complete = yield from self._iter_classify_candidates(candidates, lazy_ai, location_key, location_key)
+        except Exception as e:
+            yield {"event": "error", "error": f"An error occurred: {str(e)}", "retryable": True}
+            return
+
+        # A failed nearby request may have left businesses out: do not keep the partial list
+        if complete and error is None:
+            self.place_store.put(location_key, (), "multiple", results)
+        self._record_results(location_key, candidates, results)
+
+        yield {"event": "done", "status": "multiple", "count": len(candidates), "from_store": False, "search": search}
+
+    def get_business_details_by_location_batch(self, locations: List[Tuple[float, float]], max_workers: int = 4,
+                                               lazy_ai: bool = False) -> List[Dict[str, Any]]:
+        """
+        Classifies many (lat, lng) pairs, looking up each rounded coordinate only once.
+        Returns one response per input location, in input order.
+        """
+        unique: Dict[str, Tuple[float, float]] = {}
+        keys = []
+        for lat, lng in locations:
+            key = coordinate_key(lat, lng)
+            keys.append(key)
+            unique.setdefault(key, (lat, lng))
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, self.get_business_details_by_location, *loc, lazy_ai=lazy_ai)
+                for key, loc in unique.items()
+            }
+            by_key = {key: future.result() for key, future in futures.items()}
+
+        return [by_key[key] for key in keys]
+
+    def _iter_classify_candidates(self, candidates: List[Dict[str, Any]], lazy_ai: bool = False,
+                                  store_key: Optional[str] = None, address_key: str = ""):
+        """
+        Deterministic enrichment then AI for a list of Places results, yielding
+        "candidate" and "ai_classification" events. Returns (results, complete) where
+        complete is False if any Tier 2 failure is still without an AI classification
+        (or, with lazy_ai, without one or a candidate token).
+
+        With lazy_ai, cached AI answers are attached straight away and the remaining
+        failures get a candidate_token for classify_candidate_tokens instead; the
+        token names the place store entry (store_key) and result store rows
+        (address_key) its answer is written back to.
+        Businesses the AI tier failed on recently are flagged ai_negative_cached
+        and not sent (or tokenised) again.
+        """
+        # 1. Deterministic Enrichment (Fast) - emitted one by one
+        results: List[ClassificationResult] = []
+        ai_candidates = []
+        for i, c in enumerate(candidates):
+            res = self._enrich_deterministic(c)
+            results.append(res)
+
+            # 2. Identify candidates needing AI
+            source = res.source_intelligence
+            if source.match_method == "failed":
+                ai_candidate = {
+                    "index": i,
+                    "name": source.business_name,
+                    "address": source.address,
+                    "type": source.detected_type
+                }
+                self.cache_hits.touch(AI_PREFIX + ai_cache_key(ai_candidate))
+                if self.negative_cache.get(ai_negative_key(ai_candidate)) is not None:
+                    res.ai_negative_cached = True
+                else:
+                    if lazy_ai:
+                        res.ai_classification = self.ai_cache.get(ai_cache_key(ai_candidate))
+                        if res.ai_classification is None:
+                            res.candidate_token = self._candidate_serializer.dumps([
+                                ai_candidate["name"], ai_candidate["type"], ai_candidate["address"],
+                                store_key or "", i, c.get("id") or "", address_key,
+                            ])
+                    ai_candidates.append(ai_candidate)
+            yield {"event": "candidate", "index": i, "result": res}
+
+        # Negatively cached failures stay unclassified, so the place is not stored as complete
+        complete = not any(r.ai_negative_cached for r in results)
+        if lazy_ai or not ai_candidates:
+            return results, complete
+
+        # 3. Batch AI Classification (Chunked + Caching), merged as each prompt completes
+        logger.info("Batch processing %s businesses via AI...", len(ai_candidates))
+        for n, ai_classification in self.ai_tier.iter_classify(ai_candidates):
+            item = ai_candidates[n]
+            if ai_classification:
+                results[item["index"]].ai_classification = ai_classification
+                yield {
+                    "event": "ai_classification",
+                    "index": item["index"],
+                    "ai_classification": ai_classification
+                }
+            else:
+                complete = False
+        return results, complete
+
+    def _iter_resolve_deferred(self, results: List[ClassificationResult], lazy_ai: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Stored results of a lazy lookup may still carry a candidate_token. AI answers
+        cached since are attached; an eager lookup also asks the AI tier for the
+        rest. Yields "ai_classification" events.
+        """
+        deferred = []
+        for i, res in enumerate(results):
+            if res.candidate_token and res.ai_classification is None:
+                target = self._load_candidate_token(res.candidate_token)
+                if target is not None:
+                    deferred.append((i, res, target))
+        if not deferred:
+            return
+
+        candidates = [target["candidate"] for _, _, target in deferred]
+        if lazy_ai:
+            answers = ((n, self.ai_cache.get(ai_cache_key(c))) for n, c in enumerate(candidates))
+        else:
+            logger.info("Classifying %s deferred candidates via AI...", len(candidates))
+            answers = self.ai_tier.iter_classify(candidates)
+        for n, ai_classification in answers:
+            i, res, target = deferred[n]
+            if ai_classification is None:
+                continue
+            self._store_ai_answer(target, ai_classification, res)
+            yield {"event": "ai_classification", "index": i, "ai_classification": ai_classification}
+
+    def _load_candidate_token(self, token: str) -> Optional[Dict[str, Any]]:
+        """The candidate and write-back target behind a candidate_token; None if the token is invalid."""
+        try:
+            fields = self._candidate_serializer.loads(token)
+            name, place_type, address = fields[:3]
+            store_key, index, place_id, address_key = fields[3:] if len(fields) == 7 else ("", -1, "", "")
+        except (BadData, TypeError, ValueError):
+            return None
+        return {
+            "candidate": {"name": name, "type": place_type, "address": address},
+            "store_key": store_key,
+            "index": index,
+            "place_id": place_id,
+            "address_key": address_key,
         }
-        
-        payload = {
-            "textQuery": address,
-            "maxResultCount": 1
+
+    def _store_ai_answer(self, target: Dict[str, Any], ai_classification: AIClassification,
+                         result: Optional[ClassificationResult] = None) -> None:
+        """
+        Writes the AI answer for a candidate deferred by a lazy lookup back to the
+        place store entry holding it and to the result store, where it replaces
+        the "Unknown" row recorded when the token was issued.
+        """
+        candidate = target["candidate"]
+        if result is None:
+            result = self.place_store.result_at(target["store_key"], target["index"], candidate["name"])
+        if result is not None:
+            result.ai_classification = ai_classification
+            result.candidate_token = None
+        elif self.result_store is None:
+            return
+        else:
+            # The stored place expired meanwhile; the token holds what the row needs
+            result = ClassificationResult(
+                SourceIntelligence(candidate["name"], candidate["type"], candidate["address"], (), "failed"),
+                UNCLASSIFIED,
+                ai_classification,
+            )
+        if target["store_key"] or target["address_key"]:
+            self._write_rows([self._result_row(target["place_id"], target["address_key"], result, time.time())],
+                             supersede=True)
+
+    def _touch_ai_entries(self, results: List[ClassificationResult]) -> None:
+        """A place store hit reuses the AI answers behind it; count them as used."""
+        for res in results:
+            if res.ai_classification is not None:
+                source = res.source_intelligence
+                self.cache_hits.touch(AI_PREFIX + ai_cache_key({"name": source.business_name, "address": source.address}))
+
+    def _record_results(self, address_key: str, places: List[Dict[str, Any]], results: List[ClassificationResult]) -> None:
+        """Appends fresh classifications to the result store, one row per business."""
+        if self.result_store is None:
+            return
+        now = time.time()
+        self._write_rows([self._result_row(place.get("id") or "", address_key, res, now) for place, res in zip(places, results)])
+
+    def _result_row(self, place_id: str, address_key: str, res: ClassificationResult, now: float) -> Dict[str, Any]:
+        """
+        One result store row. The reported code is the recommended one, or the AI
+        answer when Tiers 1-2 failed.
+        """
+        source = res.source_intelligence
+        chosen = res.recommended_classification
+        code_source = source.match_method
+        if chosen.code == UNCLASSIFIED.code and res.ai_classification is not None:
+            chosen, code_source = res.ai_classification, "ai"
+        hierarchy = self.anzsic_by_code.get(chosen.code)
+        return {
+            "place_id": place_id,
+            "address_key": address_key,
+            "address": source.address,
+            "business_name": source.business_name,
+            "detected_type": source.detected_type,
+            "code": chosen.code,
+            "code_title": chosen.title,
+            "division": hierarchy.division if hierarchy else "",
+            "division_title": hierarchy.division_title if hierarchy else "",
+            "subdivision": hierarchy.subdivision if hierarchy else "",
+            "subdivision_title": hierarchy.subdivision_title if hierarchy else "",
+            "group": hierarchy.group if hierarchy else "",
+            "group_title": hierarchy.group_title if hierarchy else "",
+            "code_source": code_source,
+            "classified_at": now,
         }
-        
+
+    def _write_rows(self, rows: List[Dict[str, Any]], supersede: bool = False) -> None:
+        """Appends rows (or, with supersede, replaces the placeholder rows of the same businesses)."""
+        if self.result_store is None:
+            return
+        try:
+            if supersede:
+                for row in rows:
+                    self.result_store.supersede(row)
+            else:
+                self.result_store.append(rows)
+        except OSError as e:
+            # Reporting must never fail a lookup
+            logger.error("Result store append failed: %s", e)
+
+    def reload_codes_if_changed(self, force: bool = False) -> bool:
+        """
+        Hot-swaps the ANZSIC tables when the data version on disk has been bumped
+        by scripts/update_anzsic_from_abs.py. Checks at most every reload_check_interval
+        seconds unless forced. Requests already running keep the tables they started
+        with; the Tier 1 mapping is retitled, and AI cache and place store entries
+        for added, removed or retitled codes are dropped.
+        Returns True if new data was loaded.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < self.reload_check_interval:
+            return False
+        if not self._reload_lock.acquire(blocking=False):
+            return False  # Another request is already reloading
         try:
-            response = requests.post(self.base_url, headers=headers, json=payload, timeout=10)
+            self._last_reload_check = now
+            version = read_data_version(self.data_path)
+            if version == self.data_version and not force:
+                return False
+
+            new_codes = load_codes(self.data_path)
+            changed = changed_codes(self.anzsic_codes, new_codes)
+
+            # Swap references; each assignment is atomic so readers never see a partial table
+            self.ai_tier.set_codes(new_codes)
+            self.anzsic_codes = new_codes
+            self.anzsic_by_code = {c.code: c for c in new_codes}
+            self.anzsic_map = self._retitled_map(self.anzsic_map, self.anzsic_by_code)
+            self.data_version = version
+
+            stale = [key for key, info in list(self.ai_cache.items()) if info.code in changed]
+            for key in stale:
+                self.ai_cache.pop(key, None)
+            stale_places = self.place_store.invalidate_codes(changed)
+            if changed:
+                # New or retitled classes may give the AI tier an answer it lacked before
+                self.negative_cache.invalidate_prefix("ai:")
+
+            logger.info(
+                "Reloaded %s ANZSIC codes (version %s): %s changed codes, %s AI cache entries and "
+                "%s stored places invalidated.",
+                len(new_codes), version, len(changed), len(stale), stale_places,
+            )
+            return True
+        except Exception as e:
+            logger.error("ANZSIC data reload failed: %s", e)
+            return False
+        finally:
+            self._reload_lock.release()
+
+    @staticmethod
+    def _retitled_map(anzsic_map: Dict[str, Classification], by_code: Dict[str, AnzsicClass]) -> Dict[str, Classification]:
+        """Tier 1 mapping with each title taken from the loaded ANZSIC data; codes it lacks keep their title."""
+        return {
+            place_type: Classification(c.code, by_code[c.code].title) if c.code in by_code else c
+            for place_type, c in anzsic_map.items()
+        }
+
+    def _search_text(self, address: str) -> Dict[str, Any]:
+        """
+        Places text search, cached and single-flighted on the canonical address key
+        so spelling variants of one address share a single upstream call.
+        """
+        key = canonical_key(address)
+        self.cache_hits.touch(PLACE_PREFIX + key)
+        cached = self.place_cache.get(key)
+        if cached is not None:
+            logger.debug("Place cache hit for: %s", key)
+            return cached
+
+        def fetch() -> Dict[str, Any]:
+            headers = {
+                "Content-Type": "application/json",
+                "X-Goog-Api-Key": self.api_key,
+                # Requesting the stable place id, display name, primary type, multiple types, address AND location
+                "X-Goog-FieldMask": "places.id,places.displayName,places.primaryType,places.types,places.formattedAddress,places.location"
+            }
+
+            payload = {
+                "textQuery": address,
+                "maxResultCount": 1
+            }
+
+            with upstream_call("places.searchText") as call:
+                response = requests.post(self.base_url, headers=headers, json=payload, timeout=10)
+                call["status"] = response.status_code
             response.raise_for_status() # Raise exception for 4xx/5xx errors
-            
+
             data = response.json()
-            
-            if not data.get("places"):
-                return {"error": "No business found at this address."}
-                
-            place = data["places"][0]
+            if data.get("places"):
+                self.place_cache.put(key, data)
+            return data
 
-            # CHECK FOR GENERIC ADDRESS
-            primary_type = place.get("primaryType")
-            generic_types = {"street_address", "subpremise", "premise", "route", "postal_code", "locality", "political"}
-            is_generic = (primary_type is None) or (primary_type in generic_types)
-            
-            candidates = []
-            
-            if is_generic and "location" in place:
-                logger.info(f"Generic address result detected ({primary_type}). Searching nearby...")
-                lat = place["location"]["latitude"]
-                lng = place["location"]["longitude"]
-                candidates = self._search_nearby(lat, lng)
-
-            if candidates:
-                # 1. Deterministic Enrichment (Fast)
-                enriched_results = [self._enrich_deterministic(c) for c in candidates]
-                
-                # 2. Identify candidates needing AI
-                ai_candidates = []
-                for i, res in enumerate(enriched_results):
-                    if res["source_intelligence"]["match_method"] == "failed":
-                        ai_candidates.append({
-                            "index": i,
-                            "name": res["source_intelligence"]["business_name"],
-                            "address": res["source_intelligence"]["address"],
-                            "type": res["source_intelligence"]["detected_type"]
-                        })
-                
-                # 3. Batch AI Classification (One HTTP Call + Caching)
-                if ai_candidates:
-                    logger.info(f"Batch processing {len(ai_candidates)} businesses via AI...")
-                    ai_results = self._batch_ai_classification(ai_candidates)
-                    
-                    # 4. Merge results
-                    for item in ai_candidates:
-                        idx = item["index"]
-                        # ai_results is now a dict of {name: {"code": "...", "title": "..."}} OR just {name: "code"}
-                        ai_info = ai_results.get(item["name"]) 
-                        
-                        if ai_info:
-                            code = "Unknown"
-                            title = "AI Classified Industry"
-                            
-                            if isinstance(ai_info, dict):
-                                code = ai_info.get("code", "Unknown")
-                                title_from_ai = ai_info.get("title", "AI Classified Industry")
-                            elif isinstance(ai_info, str):
-                                code = ai_info
-                                title_from_ai = "AI Classified Industry"
-                            
-                            if code != "Unknown":
-                                # 1. Try to find OFFICIAL title in local DB first (Source of Truth)
-                                found_in_db = False
-                                for db_item in self.anzsic_codes:
-                                    if db_item["code"] == str(code):
-                                        title = db_item["title"]
-                                        found_in_db = True
-                                        break
-                                
-                                # 2. If not in DB, use the title AI gave us
-                                if not found_in_db and isinstance(ai_info, dict):
-                                     title = title_from_ai
-
-                                # STORE SEPARATELY.
-                                enriched_results[idx]["ai_classification"] = {
-                                    "code": code,
-                                    "title": title
-                                }
-
-                return {
-                    "status": "multiple",
-                    "candidates": enriched_results
-                }
-            else:
-                # Single result flow
-                result = self._enrich_deterministic(place)
-                # Ensure structure exists
-                result["ai_classification"] = None
-                
-                if result["source_intelligence"]["match_method"] == "failed":
-                     # Fallback to AI (Use Batch Logic for Consistency & Caching)
-                     # We wrap this single item as a "candidate"
-                     candidate = {
-                        "name": result["source_intelligence"]["business_name"],
-                        "address": result["source_intelligence"]["address"],
-                        "type": result["source_intelligence"]["detected_type"]
-                     }
-                     
-                     
-                     
-                     # Re-use the batch method (which handles Caching & Object parsing)
-                     ai_results = self._batch_ai_classification([candidate])
-                     ai_info = ai_results.get(candidate["name"])
-                     
-                     if ai_info:
-                        code = "Unknown"
-                        title = "AI Classified Industry"
-                        
-                        if isinstance(ai_info, dict):
-                            code = ai_info.get("code", "Unknown")
-                            title_from_ai = ai_info.get("title", "AI Classified Industry")
-                        elif isinstance(ai_info, str):
-                            code = ai_info
-                            title_from_ai = "AI Classified Industry"
-                            
-                        if code != "Unknown":
-                            # 1. Try to find OFFICIAL title in local DB first
-                            found_in_db = False
-                            for db_item in self.anzsic_codes:
-                                if db_item["code"] == str(code):
-                                    title = db_item["title"]
-                                    found_in_db = True
-                                    break
-                            
-                            # 2. If not in DB, use title from AI
-                            if not found_in_db and isinstance(ai_info, dict):
-                                    title = title_from_ai
-
-                            result["ai_classification"] = {
-                                "code": code,
-                                "title": title
-                            }
-
-                return {"status": "single", "result": result}
-            
-        except requests.exceptions.RequestException as e:
-            return {"error": f"API Request Failed: {str(e)}"}
-        except Exception as e:
-            return {"error": f"An error occurred: {str(e)}"}
+        return self._text_search_flight.do(key, fetch)
 
-    def _search_nearby(self, lat: float, lng: float) -> List[Dict[str, Any]]:
+    def get_business_details_batch(self, addresses: List[str], max_workers: int = 4,
+                                   lazy_ai: bool = False) -> List[Dict[str, Any]]:
         """
-        Searches for businesses within a small radius of the coordinate.
+        Classifies many addresses, looking up each canonical address only once.
+        Returns one response per input address, in input order.
         """
+        unique: Dict[str, str] = {}
+        keys = []
+        for address in addresses:
+            key = canonical_key(address)
+            keys.append(key)
+            unique.setdefault(key, address)
+
+        logger.info("Batch of %s addresses has %s unique canonical addresses", len(addresses), len(unique))
+
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, self.get_business_details, address, lazy_ai=lazy_ai)
+                for key, address in unique.items()
+            }
+            by_key = {key: future.result() for key, future in futures.items()}
+
+        return [by_key[key] for key in keys]
+
+    def _batch_ai_classification(self, candidates: List[Dict[str, Any]]) -> List[Optional[AIClassification]]:
+        """
+        Classifies Tier 2 failures via the AI tier (chunked, concurrent, cached).
+        Returns one entry per candidate, in order; None where no code was found.
+        """
+        return self.ai_tier.classify(candidates)
+
+    def classify_candidate_tokens(self, tokens: List[str]) -> List[Dict[str, Any]]:
+        """
+        Runs AI classification for candidate tokens handed out by a lazy_ai lookup.
+        All valid tokens go to the AI tier together (cache + chunked batching), and
+        answers are written back to the place store and result store.
+        Returns one {"ai_classification"} or {"error"} entry per token, in order.
+        """
+        responses: List[Dict[str, Any]] = []
+        targets = []
+        positions = []
+        for i, token in enumerate(tokens):
+            target = self._load_candidate_token(token)
+            if target is None:
+                responses.append({"error": "Invalid candidate token"})
+                continue
+            candidate = target["candidate"]
+            self.cache_hits.touch(AI_PREFIX + ai_cache_key(candidate))
+            if self.negative_cache.get(ai_negative_key(candidate)) is not None:
+                responses.append({"ai_classification": None, "negative_cached": True})
+                continue
+            responses.append({})
+            targets.append(target)
+            positions.append(i)
+
+        if targets:
+            logger.info("Classifying %s requested candidates via AI...", len(targets))
+            answers = self._batch_ai_classification([target["candidate"] for target in targets])
+            for i, target, ai_classification in zip(positions, targets, answers):
+                responses[i] = {"ai_classification": ai_classification}
+                if ai_classification is not None:
+                    self._store_ai_answer(target, ai_classification)
+        return responses
+
+    @staticmethod
+    def _error_response(event: Dict[str, Any]) -> Dict[str, Any]:
+        response = {"error": event["error"]}
+        for flag in ("negative_cached", "retryable"):
+            if event.get(flag):
+                response[flag] = True
+        return response
+
+    def _is_demo_mode(self) -> bool:
+        return not self.api_key or self.api_key == "your_api_key_here"
+
+    @staticmethod
+    def _place_summary_from_result(result: ClassificationResult) -> Dict[str, Any]:
+        source = result.source_intelligence
+        return {
+            "business_name": source.business_name,
+            "detected_type": source.detected_type,
+            "address": source.address,
+            "is_generic": False
+        }
+
+    def _search_nearby(self, lat: float, lng: float) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Optional[Exception]]:
+        """
+        Searches for businesses around the coordinate following self.nearby_policy:
+        start with a few results in a small radius, widen the radius only while
+        nothing non-generic is found, ask for more results only while there is no
+        direct (Tier 1) match. Returns (non-generic places, search metadata, error)
+        where error is the failure of a request, if one failed: the places found
+        until then may be incomplete, and no places does not mean there are none.
+        """
+        policy = self.nearby_policy
+        radius = policy.initial_radius
+        count = policy.initial_result_count
+        valid_places: List[Dict[str, Any]] = []
+        requests_made = 0
+        stopped_early = False
+        error: Optional[Exception] = None
+
+        while requests_made < policy.max_requests:
+            requests_made += 1
+            try:
+                places = self._nearby_request(lat, lng, radius, count)
+            except Exception as e:
+                logger.error("Nearby search failed: %s", e)
+                error = e
+                break  # Keep whatever we had
+
+            # Filter out generic places from the nearby results
+            valid_places = [p for p in places if p.get("primaryType") and p["primaryType"] not in GENERIC_PLACE_TYPES]
+
+            if not valid_places:
+                if radius >= policy.max_radius:
+                    break
+                radius = min(radius * 2, policy.max_radius)
+                continue
+
+            if policy.stop_on_direct_match and any(self._has_direct_match(p) for p in valid_places):
+                stopped_early = count < policy.max_result_count
+                break
+
+            # Fewer results than asked for means there is nothing more to fetch
+            if len(places) < count or count >= policy.max_result_count:
+                break
+            count = min(count * 2, policy.max_result_count)
+
+        search = {
+            "policy": policy.to_dict(),
+            "radius": radius,
+            "max_result_count": count,
+            "requests": requests_made,
+            "stopped_early": stopped_early,
+            "failed": error is not None,
+        }
+        return valid_places, search, error
+
+    def _nearby_request(self, lat: float, lng: float, radius: float, count: int) -> List[Dict[str, Any]]:
+        """One searchNearby call; raises requests' HTTPError for a non-200 response."""
         headers = {
             "Content-Type": "application/json",
             "X-Goog-Api-Key": self.api_key,
-            "X-Goog-FieldMask": "places.displayName,places.primaryType,places.types,places.formattedAddress"
+            "X-Goog-FieldMask": self.nearby_policy.field_mask
         }
         
         payload = {
@@ -369,35 +913,27 @@ class BusinessAnzsicLocator:
                         "latitude": lat,
                         "longitude": lng
                     },
-                    "radius": 50.0 # 50 meters
+                    "radius": radius
                 }
             },
-            "maxResultCount": 20,
+            "maxResultCount": count,
             "rankPreference": "DISTANCE"
         }
         
-        try:
+        with upstream_call("places.searchNearby") as call:
             response = requests.post(self.nearby_url, headers=headers, json=payload, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                places = data.get("places", [])
-                
-                # Filter out generic places from the nearby results
-                valid_places = []
-                generic_types = {"street_address", "subpremise", "premise", "route", "postal_code", "locality", "political"}
-                
-                for p in places:
-                    p_type = p.get("primaryType")
-                    if p_type and p_type not in generic_types:
-                        valid_places.append(p)
-                        
-                return valid_places
-        except Exception as e:
-            logger.error(f"Nearby search failed: {e}")
-            
-        return []
+            call["status"] = response.status_code
+        if response.status_code != 200:
+            raise requests.exceptions.HTTPError(
+                f"Nearby search error: {response.status_code} - {response.text}", response=response)
+        return response.json().get("places", [])
+
+    def _has_direct_match(self, place: Dict[str, Any]) -> bool:
+        """True if Tier 1 alone would classify the place (a high-confidence match)."""
+        types = [place.get("primaryType") or ""] + place.get("types", [])
+        return any(t.lower() in self.anzsic_map for t in types)
 
-    def _get_mock_response(self, address: str) -> Dict[str, Any]:
+    def _get_mock_response(self, address: str) -> ClassificationResult:
         """
         Returns a mock response for testing purposes based on keywords in the address.
         """
@@ -424,10 +960,10 @@ class BusinessAnzsicLocator:
         
         result = self._enrich_deterministic(place) # Changed from _enrich_with_anzsic
         # Tag it as MOCK data for the UI to know (optional, but good for clarity)
-        result["source_intelligence"]["business_name"] += " (MOCK DATA)"
+        result.source_intelligence.business_name += " (MOCK DATA)"
         return result
 
-    def _enrich_deterministic(self, place_data: Dict[str, Any]) -> Dict[str, Any]:
+    def _enrich_deterministic(self, place_data: Dict[str, Any]) -> ClassificationResult:
         """
         Maps the Google Place data to a recommended ANZSIC code using Tiers 1 & 2 only (No AI).
         """
@@ -459,7 +995,7 @@ class BusinessAnzsicLocator:
             best_match = None
             
             for item in self.anzsic_codes:
-                title_lower = item["title"].lower()
+                title_lower = item.title.lower()
                 stopwords = {"and", "or", "the", "services", "retailing", "manufacturing", "other", "not", "elsewhere", "classified", "n.e.c.", "goods", "shop", "store", "centre"}
                 title_words = [w for w in title_lower.split() if w not in stopwords and len(w) > 3]
                 
@@ -477,76 +1013,17 @@ class BusinessAnzsicLocator:
 
         # --- Fallback ---
         if not anzsic_info:
-            anzsic_info = {"code": "Unknown", "title": "Classification Not Found"}
+            anzsic_info = UNCLASSIFIED
             match_method = "failed" # This triggers the AI batch later
 
-        return {
-            "source_intelligence": {
-                "business_name": business_name,
-                "detected_type": primary_type if primary_type else "Unknown",
-                "address": address,
-                "raw_types": types,
-                "match_method": match_method 
-            },
-            "recommended_classification": anzsic_info,
-            "ai_classification": None # Default to None, filled later if needed
-        }
-
-    def _batch_ai_classification(self, candidates: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """
-        Sends a single batch request to Gemini to classify multiple businesses.
-        """
-        if not self.gemini_api_key:
-            return {}
-
-        # Construct the batch prompt
-        # We start with specific instructions including example of desired JSON format.
-        # JSON output Mode is supported by Gemini Flash but raw text parsing works if simple.
-        
-        items_str = ""
-        for c in candidates:
-             items_str += f"- Name: {c['name']}, Type: {c['type']}\n"
-             
-        prompt = f"""
-        You are an expert ANZSIC classifier. Analyze the following list of businesses and assign the most appropriate 4-digit ANZSIC code to each.
-        
-        List:
-        {items_str}
-        
-        You MUST return the result as a strict JSON object where keys are the specific Business Names provided and values are the 4-digit code strings.
-        Example format:
-        {{
-            "Business A": "1234",
-            "Business B": "5678"
-        }}
-        
-        Do not include markdown formatting like ```json. Return only the raw JSON string. If you cannot determine a code, use "9999".
-        """
-        
-        payload = {
-            "contents": [{
-                "parts": [{"text": prompt}]
-            }]
-        }
-        
-        url = f"{self.gemini_url}?key={self.gemini_api_key}"
-        
-        try:
-            response = requests.post(url, json=payload, timeout=15) # Longer timeout for batch
-            if response.status_code == 200:
-                result = response.json()
-                try:
-                    text = result["candidates"][0]["content"]["parts"][0]["text"].strip()
-                    clean_text = text.replace("```json", "").replace("```", "").strip()
-                    
-                    batch_results = json.loads(clean_text)
-                    return batch_results
-                except (KeyError, IndexError, json.JSONDecodeError) as e:
-                    logger.error(f"Batch Parsing Failed: {e}")
-                    logger.debug(f"Raw: {text}")
-            else:
-                logger.error(f"AI Batch Error: {response.status_code} - {response.text}")
-        except Exception as e:
-             logger.error(f"Batch Request Failed: {e}")
-             
-        return {}
+        return ClassificationResult(
+            source_intelligence=SourceIntelligence(
+                business_name=business_name,
+                detected_type=sys.intern(primary_type) if primary_type else "Unknown",
+                address=address,
+                raw_types=SourceIntelligence.intern_types(types),
+                match_method=match_method
+            ),
+            recommended_classification=anzsic_info,
+            ai_classification=None # Default to None, filled later if needed
+        )
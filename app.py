@@ -1,42 +1,83 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, make_response, render_template, request, jsonify, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from anzsic_mapper import BusinessAnzsicLocator
+from werkzeug.exceptions import RequestEntityTooLarge
+from address_normalizer import canonical_key, validate_and_sanitize_address
+from auth import AdminAuth
+from cache_warmer import CacheWarmer
+from compression import init_compression
+from config import locator_from_env
+from job_queue import DEFAULT_DB_PATH, JobQueue, read_addresses, validate_addresses
+from profiling import RequestProfiler
+from static_assets import init_assets
+from structured_logging import configure_logging, request_context, request_id_from_header, request_id_var
+from contextlib import ExitStack
+from functools import wraps
+import atexit
 import os
-import re
+import secrets
 import logging
 from dotenv import load_dotenv
-from html import escape
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure logging (StreamHandler only — Vercel has a read-only filesystem)
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler()
-    ]
+# Configure logging: JSON lines written from a background thread (stderr only — Vercel
+# has a read-only filesystem). LOG_SAMPLE_RATE keeps that share of requests' info/debug logs.
+configure_logging(
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+    fmt=os.getenv('LOG_FORMAT', 'json').lower(),
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 1.0)),
 )
 logger = logging.getLogger(__name__)
 
+class RecordJSONProvider(DefaultJSONProvider):
+    """Serializes the locator's record types (models.py) - the only place they become dicts."""
+
+    @staticmethod
+    def default(o):
+        if hasattr(o, "to_dict"):
+            return o.to_dict()
+        return DefaultJSONProvider.default(o)
+
 app = Flask(__name__)
+app.json = RecordJSONProvider(app)
+# Request bodies larger than this are rejected with 413 (job uploads have their own limit)
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 2 * 1024 * 1024))
+# Rate limits can be switched off for load tests against the upstream simulator
+app.config['RATELIMIT_ENABLED'] = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+
+# Precompiled, fingerprinted CSS/JS from scripts/build_assets.py (see static_assets.py)
+asset_manifest = init_assets(app)
+
+# Compress JSON/text responses of COMPRESS_MIN_BYTES or more (gzip, or brotli when installed)
+init_compression(app, min_size=int(os.getenv('COMPRESS_MIN_BYTES', 1024)))
 
 # Security: Add security headers with Flask-Talisman
-# Note: For development, we allow unsafe-inline for scripts/styles due to Tailwind CDN
-# In production, you should use a proper CSP with local assets
-talisman = Talisman(
-    app,
-    force_https=False,  # Set to True in production
-    content_security_policy={
+if asset_manifest:
+    # Built assets are all served from here: no inline code, no CDNs
+    content_security_policy = {
+        'default-src': ["'self'"],
+        'script-src': ["'self'"],
+        'style-src': ["'self'"],
+        'font-src': ["'self'"],
+        'img-src': ["'self'", "data:"]
+    }
+else:
+    # Development without a build: the Tailwind CDN runtime injects inline styles
+    content_security_policy = {
         'default-src': ["'self'"],
-        'script-src': ["'self'", "'unsafe-inline'", "https://cdn.tailwindcss.com"],
+        'script-src': ["'self'", "https://cdn.tailwindcss.com"],
         'style-src': ["'self'", "'unsafe-inline'", "https://fonts.googleapis.com"],
         'font-src': ["'self'", "https://fonts.gstatic.com"],
         'img-src': ["'self'", "data:"]
-    },
+    }
+talisman = Talisman(
+    app,
+    force_https=False,  # Set to True in production
+    content_security_policy=content_security_policy,
     content_security_policy_nonce_in=[],
 )
 
@@ -48,46 +89,120 @@ limiter = Limiter(
     storage_uri="memory://"
 )
 
-# Initialize the locator with the API keys
+# Initialize the locator with the API keys and tuning settings (see config.py)
 google_api_key = os.getenv("GOOGLE_API_KEY")
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-locator = BusinessAnzsicLocator(google_api_key, gemini_api_key)
+locator = locator_from_env()
 
-# Input validation function
-def validate_and_sanitize_address(address: str) -> str:
-    """
-    Validates and sanitizes the address input.
+# Warm-up: CACHE_SNAPSHOT_PATH is preloaded in the background at startup (requests are served
+# meanwhile) and can be re-exported or reloaded through the admin endpoints.
+cache_warmer = CacheWarmer(
+    locator,
+    os.getenv('CACHE_SNAPSHOT_PATH'),
+    max_places=int(os.getenv('CACHE_SNAPSHOT_MAX_PLACES', 5000)),
+    max_ai=int(os.getenv('CACHE_SNAPSHOT_MAX_AI', 20000)),
+)
+cache_warmer.start()
+if os.getenv('CACHE_SNAPSHOT_ON_EXIT', 'false').lower() == 'true' and cache_warmer.snapshot_path:
+    atexit.register(cache_warmer.export)
 
-    Args:
-        address: Raw address string from user input
+# "eager" sends Tier 2 failures to AI before responding; "lazy" returns candidate
+# tokens for /api/identify/ai instead. Requests may override with {"ai": "..."}.
+DEFAULT_AI_MODE = os.getenv('AI_MODE', 'eager').lower()
 
-    Returns:
-        Sanitized address string
+if DEFAULT_AI_MODE == 'lazy' and not os.getenv('SECRET_KEY'):
+    logger.warning("AI_MODE=lazy without SECRET_KEY: candidate tokens only work in the worker that issued them")
 
-    Raises:
-        ValueError: If address is invalid
+def wants_lazy_ai(data: dict) -> bool:
+    return str(data.get('ai') or DEFAULT_AI_MODE).lower() == 'lazy'
+
+# Admin endpoints, job access and on-demand profiling all check ADMIN_TOKEN (see auth.py)
+admin_auth = AdminAuth(os.getenv('ADMIN_TOKEN'))
+
+# Opt-in request profiling: send "X-Profile: <ADMIN_TOKEN>" or sample PROFILE_SAMPLE_RATE
+# of requests. Reports are read from /api/admin/profiles with "X-Admin-Token: <ADMIN_TOKEN>".
+profiler = RequestProfiler(
+    auth=admin_auth,
+    sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0)),
+    max_reports=int(os.getenv('PROFILE_MAX_REPORTS', 50)),
+)
+
+@app.before_request
+def assign_request_id():
+    """Every log record of the request carries its id (the caller's X-Request-ID, or a new one)."""
+    g.request_id = request_id_from_header(request.headers.get('X-Request-ID'))
+    g.request_id_token = request_id_var.set(g.request_id)
+
+@app.after_request
+def add_request_id_header(response):
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    return response
+
+@app.teardown_request
+def clear_request_id(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id_var.reset(token)
+
+def profiled(view):
+    """
+    Profiles the request when asked to (see RequestProfiler.trigger); adds an X-Profile-Id header.
+    A streamed body is produced after the view returns, so its profile ends when the stream is closed.
     """
-    if not address:
-        raise ValueError("Address is required")
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        trigger = profiler.trigger(request.headers.get('X-Profile'))
+        if trigger is None:
+            return view(*args, **kwargs)
 
-    # Remove leading/trailing whitespace
-    address = address.strip()
+        data = request.get_json(silent=True)
+        subject = data.get('address') if isinstance(data, dict) else None
+        label = f"{request.method} {request.path}" + (f" {str(subject)[:100]}" if subject else "")
+        with ExitStack() as stack:
+            report = stack.enter_context(profiler.profile(label, trigger))
+            response = make_response(view(*args, **kwargs))
+            if response.is_streamed:
+                response.call_on_close(stack.pop_all().close)
+        response.headers['X-Profile-Id'] = str(report.id)
+        return response
+    return wrapper
 
-    # Check length
-    if len(address) < 3:
-        raise ValueError("Address is too short")
-    if len(address) > 500:
-        raise ValueError("Address is too long (max 500 characters)")
+def admin_required(view):
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and require it in X-Admin-Token."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not admin_auth.enabled:
+            return jsonify({"error": "Not found"}), 404
+        if not admin_auth.is_admin(request.headers.get('X-Admin-Token')):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
 
-    # Basic pattern validation - allow alphanumeric, spaces, commas, hyphens, periods
-    if not re.match(r'^[\w\s,.\-#/]+$', address):
-        raise ValueError("Address contains invalid characters")
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": f"Request body exceeds {request.max_content_length} bytes"}), 413
 
-    # Escape HTML to prevent XSS
-    address = escape(address)
+def validate_coordinates(lat, lng) -> tuple:
+    """
+    Validates a latitude/longitude pair.
+
+    Returns:
+        (lat, lng) as floats
 
-    logger.info(f"Validated address input: {address[:50]}...")
-    return address
+    Raises:
+        ValueError: If either value is missing, not a number or out of range
+    """
+    if isinstance(lat, bool) or isinstance(lng, bool):
+        raise ValueError("Latitude and longitude must be numbers")
+    try:
+        lat, lng = float(lat), float(lng)
+    except (TypeError, ValueError):
+        raise ValueError("Latitude and longitude must be numbers")
+    if not -90.0 <= lat <= 90.0:
+        raise ValueError("Latitude must be between -90 and 90")
+    if not -180.0 <= lng <= 180.0:
+        raise ValueError("Longitude must be between -180 and 180")
+    return lat, lng
 
 @app.route('/')
 def index():
@@ -101,6 +216,7 @@ def visualizer():
 
 @app.route('/api/identify', methods=['POST'])
 @limiter.limit("10 per minute")  # Stricter rate limit for API endpoint
+@profiled
 def identify_business():
     """API endpoint to identify business and ANZSIC code from address."""
     try:
@@ -114,7 +230,7 @@ def identify_business():
         try:
             address = validate_and_sanitize_address(data['address'])
         except ValueError as e:
-            logger.warning(f"Invalid address input: {str(e)}")
+            logger.warning("Invalid address input: %s", e)
             return jsonify({"error": str(e)}), 400
 
         # Check API key configuration
@@ -123,20 +239,409 @@ def identify_business():
             return jsonify({"error": "Server configuration error: Google API Key missing"}), 500
 
         # Get business details
-        logger.info(f"Processing request for address: {address[:50]}...")
-        result = locator.get_business_details(address)
+        logger.info("Processing request for address: %s...", address[:50])
+        result = locator.get_business_details(address, lazy_ai=wants_lazy_ai(data))
 
         if "error" in result:
-            logger.warning(f"Business lookup failed: {result['error']}")
+            logger.warning("Business lookup failed: %s", result['error'])
             return jsonify(result), 400
 
         logger.info("Successfully processed business identification request")
         return jsonify(result)
 
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in identify_business: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@app.route('/api/identify/stream', methods=['POST'])
+@limiter.limit("10 per minute")  # Same budget as /api/identify
+@profiled
+def identify_business_stream():
+    """
+    Streaming variant of /api/identify.
+
+    Returns newline-delimited JSON (application/x-ndjson): the resolved place first,
+    then each candidate's deterministic classification, then AI classifications
+    as they arrive, and finally a "done" event. See BusinessAnzsicLocator.iter_business_details.
+    """
+    data = request.get_json(silent=True)
+
+    if not data or 'address' not in data:
+        logger.warning("Stream request missing address field")
+        return jsonify({"error": "Address is required"}), 400
+
+    try:
+        address = validate_and_sanitize_address(data['address'])
+    except ValueError as e:
+        logger.warning("Invalid address input: %s", e)
+        return jsonify({"error": str(e)}), 400
+
+    if not google_api_key:
+        logger.error("Google API Key not configured")
+        return jsonify({"error": "Server configuration error: Google API Key missing"}), 500
+
+    request_id = g.request_id
+
+    def generate():
+        # The body is produced after the view returns; keep logging under this request's id
+        with request_context(request_id):
+            try:
+                for event in locator.iter_business_details(address, lazy_ai=wants_lazy_ai(data)):
+                    yield app.json.dumps(event) + "\n"
+            except Exception as e:
+                logger.error("Unexpected error in identify_business_stream: %s", e, exc_info=True)
+                yield app.json.dumps({"event": "error", "error": "An unexpected error occurred"}) + "\n"
+
+    logger.info("Streaming request for address: %s...", address[:50])
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Disable proxy buffering so each line reaches the client immediately
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# Upper bound on addresses per /api/identify/batch request
+MAX_BATCH_ADDRESSES = int(os.getenv('MAX_BATCH_ADDRESSES', 100))
+
+@app.route('/api/identify/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+@profiled
+def identify_business_batch():
+    """
+    Classifies a list of addresses. Near-duplicate addresses (same canonical key)
+    are looked up once and share the result.
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('addresses'), list):
+            logger.warning("Batch request missing addresses list")
+            return jsonify({"error": "A list of addresses is required"}), 400
+
+        if len(data['addresses']) > MAX_BATCH_ADDRESSES:
+            return jsonify({"error": f"Too many addresses (max {MAX_BATCH_ADDRESSES})"}), 400
+
+        if not google_api_key:
+            logger.error("Google API Key not configured")
+            return jsonify({"error": "Server configuration error: Google API Key missing"}), 500
+
+        # Validate each address; invalid ones get an inline error instead of failing the batch
+        items = []
+        valid = []
+        for raw in data['addresses']:
+            try:
+                address = validate_and_sanitize_address(raw if isinstance(raw, str) else "")
+                items.append({"address": raw, "canonical_key": canonical_key(address)})
+                valid.append(address)
+            except ValueError as e:
+                items.append({"address": raw, "canonical_key": None, "response": {"error": str(e)}})
+
+        responses = iter(locator.get_business_details_batch(valid, lazy_ai=wants_lazy_ai(data)))
+        for item in items:
+            if "response" not in item:
+                item["response"] = next(responses)
+
+        unique = len({item["canonical_key"] for item in items if item["canonical_key"]})
+        logger.info("Processed batch of %s addresses (%s unique)", len(items), unique)
+        return jsonify({"count": len(items), "unique_addresses": unique, "results": items})
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in identify_business_batch: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@app.route('/api/identify/location', methods=['POST'])
+@limiter.limit("10 per minute")
+@profiled
+def identify_business_by_location():
+    """
+    Classifies the businesses at a coordinate, skipping the address text search.
+    Accepts {"latitude", "longitude"} or {"locations": [{"latitude", "longitude"}, ...]}.
+    """
+    try:
+        data = request.get_json()
+
+        if not data:
+            return jsonify({"error": "Coordinates are required"}), 400
+
+        if not google_api_key:
+            logger.error("Google API Key not configured")
+            return jsonify({"error": "Server configuration error: Google API Key missing"}), 500
+
+        # Bulk form
+        if 'locations' in data:
+            if not isinstance(data['locations'], list):
+                return jsonify({"error": "locations must be a list"}), 400
+            if len(data['locations']) > MAX_BATCH_ADDRESSES:
+                return jsonify({"error": f"Too many locations (max {MAX_BATCH_ADDRESSES})"}), 400
+
+            items = []
+            valid = []
+            for loc in data['locations']:
+                loc = loc if isinstance(loc, dict) else {}
+                item = {"latitude": loc.get('latitude'), "longitude": loc.get('longitude')}
+                try:
+                    valid.append(validate_coordinates(item["latitude"], item["longitude"]))
+                except ValueError as e:
+                    item["response"] = {"error": str(e)}
+                items.append(item)
+
+            responses = iter(locator.get_business_details_by_location_batch(valid, lazy_ai=wants_lazy_ai(data)))
+            for item in items:
+                if "response" not in item:
+                    item["response"] = next(responses)
+
+            logger.info("Processed location batch of %s coordinates", len(items))
+            return jsonify({"count": len(items), "results": items})
+
+        # Single form
+        try:
+            lat, lng = validate_coordinates(data.get('latitude'), data.get('longitude'))
+        except ValueError as e:
+            logger.warning("Invalid coordinate input: %s", e)
+            return jsonify({"error": str(e)}), 400
+
+        logger.info("Processing request for location: %.5f,%.5f", lat, lng)
+        result = locator.get_business_details_by_location(lat, lng, lazy_ai=wants_lazy_ai(data))
+
+        if "error" in result:
+            logger.warning("Location lookup failed: %s", result['error'])
+            return jsonify(result), 400
+
+        return jsonify(result)
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in identify_business_by_location: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+@app.route('/api/identify/ai', methods=['POST'])
+@limiter.limit("30 per minute")
+def classify_candidates_ai():
+    """
+    AI classification on demand for candidates returned by a lazy lookup.
+    Accepts {"tokens": ["<candidate_token>", ...]}.
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not isinstance(data.get('tokens'), list) or not data['tokens']:
+            return jsonify({"error": "A list of candidate tokens is required"}), 400
+
+        if len(data['tokens']) > MAX_BATCH_ADDRESSES:
+            return jsonify({"error": f"Too many tokens (max {MAX_BATCH_ADDRESSES})"}), 400
+
+        tokens = [t if isinstance(t, str) else "" for t in data['tokens']]
+        responses = locator.classify_candidate_tokens(tokens)
+        results = [dict(response, candidate_token=token) for token, response in zip(tokens, responses)]
+        return jsonify({"results": results})
+
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in classify_candidates_ai: %s", e, exc_info=True)
+        return jsonify({"error": "An unexpected error occurred"}), 500
+
+# Upper bound on addresses per job (see job_queue.py / job_worker.py), and on the size of its upload
+MAX_JOB_ADDRESSES = int(os.getenv('MAX_JOB_ADDRESSES', 500000))
+MAX_JOB_UPLOAD_BYTES = int(os.getenv('MAX_JOB_UPLOAD_BYTES', 64 * 1024 * 1024))
+# Rejected addresses listed in the job creation response (all are counted)
+MAX_REPORTED_REJECTIONS = 100
+
+_job_queue = None
+
+def get_job_queue() -> JobQueue:
+    """Opened on first use, so deployments without job support never create the file."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(DEFAULT_DB_PATH)
+    return _job_queue
+
+def job_access_required(view):
+    """
+    A job's progress and results are readable with the admin token or with the
+    job's own token ("Authorization: Bearer <job_token>", returned when it was
+    created). Anyone else gets the same 404 as for an unknown job.
+    """
+    @wraps(view)
+    def wrapper(job_id, *args, **kwargs):
+        if not admin_auth.is_admin(request.headers.get('X-Admin-Token')):
+            scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() != 'bearer' or not get_job_queue().check_token(job_id, token.strip()):
+                return jsonify({"error": "Job not found"}), 404
+        return view(job_id, *args, **kwargs)
+    return wrapper
+
+@app.route('/api/jobs', methods=['POST'])
+@limiter.limit("10 per minute")
+@admin_required
+def create_job():
+    """
+    Queues a large classification run for the job workers.
+    Accepts a multipart upload ("file": CSV with an "address" column, or one
+    address per line) or JSON {"addresses": [...], "name": "..."}.
+    The response carries a job_token that grants access to this job only.
+    """
+    request.max_content_length = MAX_JOB_UPLOAD_BYTES
+    try:
+        if 'file' in request.files:
+            upload = request.files['file']
+            addresses = read_addresses(upload.read().decode('utf-8-sig', errors='replace'))
+            name = request.form.get('name') or upload.filename
+        else:
+            data = request.get_json(silent=True) or {}
+            if not isinstance(data.get('addresses'), list):
+                return jsonify({"error": "A file upload or a list of addresses is required"}), 400
+            addresses = data['addresses']
+            name = data.get('name')
+
+        if not addresses:
+            return jsonify({"error": "No addresses found"}), 400
+        if len(addresses) > MAX_JOB_ADDRESSES:
+            return jsonify({"error": f"Too many addresses (max {MAX_JOB_ADDRESSES})"}), 400
+
+        # Invalid rows are reported (by position) and left out of the job
+        valid, rejected = validate_addresses(addresses)
+        if not valid:
+            return jsonify({"error": "No valid addresses", "rejected": rejected[:MAX_REPORTED_REJECTIONS]}), 400
+
+        job_token = secrets.token_urlsafe(32)
+        job_id = get_job_queue().create_job(valid, name=str(name) if name else None, token=job_token)
+        logger.info("Created job %s with %s addresses (%s rejected)", job_id, len(valid), len(rejected))
+        return jsonify({
+            "job_id": job_id,
+            "job_token": job_token,
+            "total": len(valid),
+            "rejected_count": len(rejected),
+            "rejected": rejected[:MAX_REPORTED_REJECTIONS],
+        }), 202
+
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
-        logger.error(f"Unexpected error in identify_business: {str(e)}", exc_info=True)
+        logger.error("Unexpected error in create_job: %s", e, exc_info=True)
         return jsonify({"error": "An unexpected error occurred"}), 500
 
+@app.route('/api/jobs', methods=['GET'])
+@limiter.limit("60 per minute")
+@admin_required
+def list_jobs():
+    """Most recent jobs with their progress."""
+    return jsonify({"jobs": get_job_queue().list_jobs()})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@limiter.limit("60 per minute")
+@job_access_required
+def job_progress(job_id):
+    """Counts per item state, throughput over the last minute and an ETA."""
+    progress = get_job_queue().progress(job_id)
+    if progress is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(progress)
+
+@app.route('/api/jobs/<job_id>/results', methods=['GET'])
+@limiter.limit("60 per minute")
+@job_access_required
+def job_results(job_id):
+    """Finished items in input order; page with ?after=<last seq>&limit=N (max 1000)."""
+    queue = get_job_queue()
+    if not queue.exists(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        after = int(request.args.get('after', -1))
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "after and limit must be integers"}), 400
+
+    results = queue.results(job_id, after=after, limit=limit)
+    return jsonify({
+        "job_id": job_id,
+        "results": results,
+        "next_after": results[-1]["seq"] if len(results) == limit else None,
+    })
+
+@app.route('/api/admin/profiles', methods=['GET'])
+@admin_required
+def list_profiles():
+    """Summaries of the retained profile reports, newest first."""
+    return jsonify({"profiles": profiler.reports()})
+
+@app.route('/api/admin/profiles/<int:report_id>', methods=['GET'])
+@admin_required
+def get_profile(report_id):
+    """One report: upstream call timings and the cProfile listing (top functions by cumulative time)."""
+    report = profiler.get(report_id)
+    if report is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return jsonify(report)
+
+@app.route('/api/admin/cache/warm', methods=['GET'])
+@admin_required
+def cache_warm_status():
+    """State of the latest warm-up (idle, running, done or failed) and what it loaded."""
+    return jsonify({**cache_warmer.status(), "place_cache": len(locator.place_cache), "ai_cache": len(locator.ai_cache)})
+
+@app.route('/api/admin/cache/warm', methods=['POST'])
+@admin_required
+def cache_warm():
+    """Reloads the snapshot in the background; returns 202 straight away."""
+    if not cache_warmer.snapshot_path:
+        return jsonify({"error": "No cache snapshot configured (set CACHE_SNAPSHOT_PATH)"}), 404
+    if not cache_warmer.start():
+        status = cache_warmer.status()
+        if status.get("state") == "running":
+            return jsonify({"error": "A warm-up is already running", **status}), 409
+        return jsonify({"error": "Cache snapshot file not found"}), 404
+    return jsonify(cache_warmer.status()), 202
+
+@app.route('/api/admin/cache/snapshot', methods=['POST'])
+@admin_required
+def cache_snapshot():
+    """Writes the hottest place and AI cache entries to CACHE_SNAPSHOT_PATH."""
+    if not cache_warmer.snapshot_path:
+        return jsonify({"error": "No cache snapshot configured (set CACHE_SNAPSHOT_PATH)"}), 404
+    try:
+        exported = cache_warmer.export()
+    except OSError as e:
+        logger.error("Cache snapshot export failed: %s", e)
+        return jsonify({"error": "Could not write the cache snapshot"}), 500
+    return jsonify({"path": cache_warmer.snapshot_path, "exported": exported})
+
+@app.route('/api/results/counts', methods=['GET'])
+@admin_required
+def result_counts():
+    """Classified businesses per ANZSIC level (?level=division|subdivision|group|code), from the result store."""
+    if locator.result_store is None:
+        return jsonify({"error": "Result store is not enabled (set RESULT_STORE_PATH)"}), 404
+    level = request.args.get('level', 'division')
+    try:
+        counts = locator.result_store.count_by(level)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"level": level, "counts": counts})
+
+@app.route('/api/results/lookup', methods=['GET'])
+@admin_required
+def result_lookup():
+    """Stored classifications for ?place_id= or ?address= (matched on its canonical form), newest first."""
+    if locator.result_store is None:
+        return jsonify({"error": "Result store is not enabled (set RESULT_STORE_PATH)"}), 404
+    place_id = request.args.get('place_id', '').strip()
+    address = request.args.get('address', '').strip()
+    if not place_id and not address:
+        return jsonify({"error": "place_id or address is required"}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 100)), 1000))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    address_key = canonical_key(address) if address else None
+    rows = locator.result_store.lookup(place_id=place_id or None, address_key=address_key, limit=limit)
+    return jsonify({"results": rows})
+
 if __name__ == '__main__':
     # Use environment variable for debug mode (default: False)
     debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -147,5 +652,5 @@ if __name__ == '__main__':
     # Use port 5001 to avoid conflict with macOS AirPlay receiver on port 5000
     port = int(os.getenv('PORT', 5001))
 
-    logger.info(f"Starting ANZSIC Identifier on port {port}")
+    logger.info("Starting ANZSIC Identifier on port %s", port)
     app.run(debug=debug_mode, port=port, host='0.0.0.0')
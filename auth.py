@@ -0,0 +1,20 @@
+"""
+The admin token (ADMIN_TOKEN) that guards the admin endpoints, job access and
+on-demand profiling. Without a token, nothing is treated as admin.
+"""
+
+import hmac
+from typing import Optional
+
+
+class AdminAuth:
+    def __init__(self, token: Optional[str] = None):
+        self.token = token or None
+
+    @property
+    def enabled(self) -> bool:
+        return self.token is not None
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        """Constant-time comparison against the configured token."""
+        return bool(self.token and token and hmac.compare_digest(token, self.token))
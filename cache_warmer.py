@@ -0,0 +1,185 @@
+"""
+Cache snapshots for warm starts.
+
+A fresh process starts with empty caches, so the first hours after a deploy
+pay full Places and Gemini cost and latency. The locator counts how often
+each Places text-search entry (place_cache) and AI classification (ai_cache)
+is used. export_snapshot writes the most used entries to a JSON file
+(gzip-compressed when the name ends in .gz). load_snapshot puts them back
+into a running locator. CacheWarmer runs the load on a background thread,
+so the service answers requests (from cold caches) while it fills.
+
+The place-id store is not part of the snapshot. It is rebuilt from the warmed
+places and AI answers on first use without upstream calls. Generic addresses
+still run one nearby search.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from models import AIClassification
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+PLACE_PREFIX = "place:"
+AI_PREFIX = "ai:"
+
+
+class HitCounter:
+    """Use counts per cache key. Past max_keys, only the most used half is kept."""
+
+    def __init__(self, max_keys: int = 200000):
+        self.max_keys = max_keys
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def touch(self, key: str, count: int = 1) -> None:
+        with self._lock:
+            self._counts[key] += count
+            if len(self._counts) > self.max_keys:
+                self._counts = Counter(dict(self._counts.most_common(self.max_keys // 2)))
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._counts.get(key, 0)
+
+
+def _open(path: str, mode: str, compressed: bool):
+    if compressed:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def export_snapshot(locator, path: str, max_places: int = 5000, max_ai: int = 20000) -> Dict[str, int]:
+    """
+    Writes the most used place_cache and ai_cache entries to path (replaced
+    atomically). Returns the number of entries written per kind.
+    """
+    hits = locator.cache_hits
+    places = sorted(locator.place_cache.entries(), key=lambda entry: -hits.get(PLACE_PREFIX + entry[0]))[:max_places]
+    ai = sorted(list(locator.ai_cache.items()), key=lambda kv: -hits.get(AI_PREFIX + kv[0]))[:max_ai]
+
+    snapshot = {
+        "format": SNAPSHOT_FORMAT,
+        "created_at": time.time(),
+        "data_version": locator.data_version,
+        "places": [
+            {"key": key, "hits": hits.get(PLACE_PREFIX + key), "stored_at": stored_at, "data": data}
+            for key, data, stored_at in places
+        ],
+        "ai": [
+            {"key": key, "hits": hits.get(AI_PREFIX + key), "code": info.code, "title": info.title, "official": info.official}
+            for key, info in ai
+        ],
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with _open(tmp, "w", compressed=path.endswith(".gz")) as f:
+        json.dump(snapshot, f)
+    os.replace(tmp, path)
+    counts = {"places": len(places), "ai": len(ai)}
+    logger.info("Exported cache snapshot to %s: %s places, %s AI classifications", path, counts["places"], counts["ai"])
+    return counts
+
+
+def load_snapshot(locator, path: str) -> Dict[str, int]:
+    """
+    Adds the snapshot's entries to the locator's caches; entries already
+    cached are kept. AI answers naming a code the current ANZSIC data does
+    not have are skipped, and titles are taken from the current data.
+    """
+    with _open(path, "r", compressed=path.endswith(".gz")) as f:
+        snapshot = json.load(f)
+    if snapshot.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported cache snapshot format: {snapshot.get('format')}")
+
+    loaded = {"places": 0, "ai": 0, "skipped": 0}
+    for entry in snapshot.get("places", []):
+        key, data = entry.get("key"), entry.get("data")
+        if not key or not isinstance(data, dict) or not data.get("places"):
+            loaded["skipped"] += 1
+            continue
+        # Entries keep their original age, so a snapshot cannot extend the place cache TTL
+        stored_at = float(entry.get("stored_at") or snapshot.get("created_at") or time.time())
+        if time.time() - stored_at > locator.place_cache.ttl_seconds:
+            loaded["skipped"] += 1
+            continue
+        if locator.place_cache.setdefault(key, data, stored_at=stored_at) is data:
+            loaded["places"] += 1
+        locator.cache_hits.touch(PLACE_PREFIX + key, int(entry.get("hits") or 0))
+
+    official_titles = locator.ai_tier.official_titles
+    for entry in snapshot.get("ai", []):
+        key, code = entry.get("key"), entry.get("code")
+        if not key or code not in official_titles:
+            loaded["skipped"] += 1
+            continue
+        if key not in locator.ai_cache:
+            locator.ai_cache[key] = AIClassification(code=code, title=official_titles[code], official=True)
+            loaded["ai"] += 1
+        locator.cache_hits.touch(AI_PREFIX + key, int(entry.get("hits") or 0))
+
+    logger.info("Loaded cache snapshot %s: %s places, %s AI classifications, %s skipped",
+                path, loaded["places"], loaded["ai"], loaded["skipped"])
+    return loaded
+
+
+class CacheWarmer:
+    """Loads a snapshot into a locator on a background thread; one load at a time."""
+
+    def __init__(self, locator, snapshot_path: Optional[str], max_places: int = 5000, max_ai: int = 20000):
+        self.locator = locator
+        self.snapshot_path = snapshot_path
+        self.max_places = max_places
+        self.max_ai = max_ai
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._status: Dict[str, Any] = {"state": "idle"}
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._status)
+
+    def start(self) -> bool:
+        """Starts a background load. False when no snapshot is configured, it is missing, or a load is running."""
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return False
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._status = {"state": "running", "path": self.snapshot_path, "started_at": time.time()}
+            self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self) -> None:
+        try:
+            loaded = load_snapshot(self.locator, self.snapshot_path)
+            update = {"state": "done", "loaded": loaded}
+        except Exception as e:
+            logger.error("Cache warm-up from %s failed: %s", self.snapshot_path, e)
+            update = {"state": "failed", "error": str(e)}
+        with self._lock:
+            self._status.update(update, finished_at=time.time())
+
+    def export(self) -> Dict[str, int]:
+        if not self.snapshot_path:
+            raise ValueError("No cache snapshot path configured")
+        return export_snapshot(self.locator, self.snapshot_path, self.max_places, self.max_ai)
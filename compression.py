@@ -0,0 +1,76 @@
+"""
+gzip / brotli compression of API responses.
+
+JSON from /api/identify with many candidates is several KB of repetitive
+text that compresses 5-10x. Responses are compressed after the view has run
+when the client accepts it, the body is at least min_size bytes and the type
+is textual. Brotli is used when the optional brotli package is installed and
+the client prefers or allows it; otherwise gzip.
+
+Streamed responses (the NDJSON stream) and file responses are left alone:
+compressing them here would buffer the stream, and built static files already
+have precompressed copies (static_assets.py).
+"""
+
+import gzip
+from typing import Optional
+
+from flask import Flask, Response, request
+
+from static_assets import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+}
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """br or gzip (whichever the client ranks higher; br on a tie), or None."""
+    accepted = accepted_encodings(accept_encoding)
+    options = [("br", accepted.get("br", 0.0) if brotli else 0.0), ("gzip", accepted.get("gzip", 0.0))]
+    if "*" in accepted:
+        options = [(coding, q or accepted["*"]) for coding, q in options if coding != "br" or brotli]
+    coding, q = max(options, key=lambda option: option[1])
+    return coding if q > 0 else None
+
+
+def compress(data: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=gzip_level, mtime=0)
+
+
+def init_compression(app: Flask, min_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+    """Compresses eligible responses of this app (see module docstring)."""
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype.startswith("text/") or response.mimetype in COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+
+        response.set_data(compress(data, encoding, gzip_level, brotli_quality))
+        response.headers["Content-Encoding"] = encoding
+        return response
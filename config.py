@@ -0,0 +1,61 @@
+"""
+Builds the BusinessAnzsicLocator from environment variables (and .env).
+
+Shared by the web app and the job worker processes (job_worker.py) so every
+process classifies with the same keys, limits and AI backends.
+"""
+
+import os
+
+from dotenv import load_dotenv
+
+from anzsic_mapper import PLACES_BASE_URL, BusinessAnzsicLocator, NearbySearchPolicy
+from hedging import parse_backends
+from negative_cache import AI_ERROR, AI_UNKNOWN, NO_MATCH
+from result_store import ResultStore
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+def result_store_from_env():
+    """The columnar result store when RESULT_STORE_PATH is set (off by default; Vercel is read-only)."""
+    path = os.getenv('RESULT_STORE_PATH')
+    if not path:
+        return None
+    return ResultStore(
+        path,
+        flush_rows=int(os.getenv('RESULT_STORE_FLUSH_ROWS', 10000)),
+        flush_interval=float(os.getenv('RESULT_STORE_FLUSH_SECONDS', 300)),
+        compact_segments=int(os.getenv('RESULT_STORE_COMPACT_SEGMENTS', 8)),
+    )
+
+
+def locator_from_env() -> BusinessAnzsicLocator:
+    return BusinessAnzsicLocator(
+        os.getenv("GOOGLE_API_KEY"),
+        os.getenv("GEMINI_API_KEY"),
+        ai_max_items_per_prompt=int(os.getenv('AI_MAX_ITEMS_PER_PROMPT', 10)),
+        ai_max_concurrency=int(os.getenv('AI_MAX_CONCURRENCY', 4)),
+        place_store_ttl=float(os.getenv('PLACE_STORE_TTL_SECONDS', 24 * 3600)),
+        place_cache_ttl=float(os.getenv('PLACE_CACHE_TTL_SECONDS', 6 * 3600)),
+        place_cache_max_entries=int(os.getenv('PLACE_CACHE_MAX_ENTRIES', 50000)),
+        nearby_policy=NearbySearchPolicy(
+            initial_radius=float(os.getenv('NEARBY_INITIAL_RADIUS_M', 50)),
+            max_radius=float(os.getenv('NEARBY_MAX_RADIUS_M', 200)),
+            initial_result_count=int(os.getenv('NEARBY_INITIAL_RESULTS', 5)),
+            max_result_count=int(os.getenv('NEARBY_MAX_RESULTS', 20)),
+            max_requests=int(os.getenv('NEARBY_MAX_REQUESTS', 3)),
+        ),
+        token_secret=os.getenv('SECRET_KEY'),
+        ai_backends=parse_backends(os.getenv('AI_BACKENDS'), timeout=float(os.getenv('AI_TIMEOUT_SECONDS', 20))),
+        ai_hedge_ratio=float(os.getenv('AI_HEDGE_RATIO', 0.1)),
+        ai_hedge_delay=float(os.getenv('AI_HEDGE_DELAY_SECONDS', 3)),
+        negative_ttls={
+            NO_MATCH: float(os.getenv('NEGATIVE_TTL_NO_MATCH_SECONDS', 15 * 60)),
+            AI_UNKNOWN: float(os.getenv('NEGATIVE_TTL_AI_UNKNOWN_SECONDS', 60 * 60)),
+            AI_ERROR: float(os.getenv('NEGATIVE_TTL_AI_ERROR_SECONDS', 60)),
+        },
+        places_base_url=os.getenv('PLACES_API_BASE_URL', PLACES_BASE_URL),
+        result_store=result_store_from_env(),
+    )
@@ -0,0 +1,208 @@
+"""
+Hedged requests across an ordered list of AI backends.
+
+The primary backend is called first. If it has not produced a usable answer
+within its hedge delay (the observed p95 latency, or a fixed default until
+enough samples exist), the same request is sent to the next backend and the
+first valid answer wins. A failed answer hands over to the next backend
+straight away. Duplicate requests are paid for from a budget that refills by
+a fixed fraction of each primary request, so hedging can never more than
+add that fraction to upstream spend; failing over is always allowed.
+
+Every attempt runs on its own thread, started when the attempt is launched.
+A shared pool would make attempts queue behind losers still waiting for
+their HTTP timeout, and that queueing would count towards the hedge delay.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+GEMINI_MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent"
+DEFAULT_MODELS = ("gemini-flash-latest", "gemini-flash-lite-latest")
+
+
+@dataclass(frozen=True)
+class AIBackend:
+    """One generateContent endpoint (a Gemini model, or any compatible server)."""
+    __slots__ = ("name", "url", "timeout")
+    name: str
+    url: str
+    timeout: float
+
+
+def parse_backends(spec: Optional[str], timeout: float = 20) -> List[AIBackend]:
+    """
+    Backends from a comma-separated list of Gemini model names and/or full URLs,
+    in priority order, e.g. "gemini-flash-latest,http://127.0.0.1:9000/generate".
+    """
+    entries = [e.strip() for e in (spec or "").split(",") if e.strip()] or list(DEFAULT_MODELS)
+    backends = []
+    for entry in entries:
+        if entry.startswith(("http://", "https://")):
+            backends.append(AIBackend(name=entry, url=entry, timeout=timeout))
+        else:
+            backends.append(AIBackend(name=entry, url=GEMINI_MODEL_URL.format(model=entry), timeout=timeout))
+    return backends
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies for one backend."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q-th percentile (0-100) of the window, or None until min_samples are recorded."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class HedgeBudget:
+    """Token bucket: each primary request adds `ratio` tokens (up to `burst`); each duplicate costs one."""
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def on_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class Hedger:
+    def __init__(
+        self,
+        backends: List[AIBackend],
+        budget: Optional[HedgeBudget] = None,
+        default_delay: float = 3.0,
+        percentile: float = 95,
+    ):
+        if not backends:
+            raise ValueError("At least one AI backend is required")
+        self.backends = list(backends)
+        self.budget = budget or HedgeBudget()
+        self.default_delay = default_delay
+        self.percentile = percentile
+        self.latency: Dict[str, LatencyTracker] = {b.name: LatencyTracker() for b in self.backends}
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "hedged": 0, "failovers": 0, "budget_denied": 0, "wins": {}}
+
+    def hedge_delay(self, backend: AIBackend) -> float:
+        observed = self.latency[backend.name].percentile(self.percentile)
+        return self.default_delay if observed is None else observed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {**self._stats, "wins": dict(self._stats["wins"])}
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self._stats[key] += 1
+
+    def _launch(self, timed: Callable[[AIBackend], Any], backend: AIBackend) -> Future:
+        """Starts one attempt on a new daemon thread, in a copy of the caller's context (request profiling follows it)."""
+        future: Future = Future()
+        context = contextvars.copy_context()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(context.run(timed, backend))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"ai-hedge-{backend.name}", daemon=True).start()
+        return future
+
+    def call(self, fn: Callable[[AIBackend], Optional[T]]) -> Optional[T]:
+        """
+        Runs fn(backend) on the primary and hedges to later backends as described
+        above. fn returns None for an unusable answer and must not raise. Returns
+        the first non-None answer, or None when every launched attempt failed.
+        Losing attempts are left to finish (or time out) in the background.
+        """
+        self._count("requests")
+        self.budget.on_request()
+
+        def timed(backend: AIBackend):
+            started = time.monotonic()
+            result = fn(backend)
+            if result is not None:
+                self.latency[backend.name].record(time.monotonic() - started)
+            return backend, result
+
+        def launch(backend: AIBackend) -> float:
+            running.add(self._launch(timed, backend))
+            return time.monotonic() + self.hedge_delay(backend)
+
+        running = set()
+        next_index = 1
+        hedging_allowed = True
+        # The hedge delay counts from the moment the latest attempt started
+        hedge_at = launch(self.backends[0])
+
+        while running:
+            can_hedge = hedging_allowed and next_index < len(self.backends)
+            timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+            done, running = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                backend, result = future.result()
+                if result is not None:
+                    with self._stats_lock:
+                        wins = self._stats["wins"]
+                        wins[backend.name] = wins.get(backend.name, 0) + 1
+                    return result
+                logger.warning("AI backend %s returned no usable answer", backend.name)
+
+            if next_index >= len(self.backends):
+                continue
+
+            if done and not running:
+                # Everything in flight failed: fail over without waiting for a delay
+                self._count("failovers")
+            elif not done:
+                # Still waiting past the hedge delay: duplicate only if the budget allows
+                if not self.budget.try_spend():
+                    self._count("budget_denied")
+                    # No more hedges this call; a failure still fails over
+                    hedging_allowed = False
+                    continue
+                self._count("hedged")
+            else:
+                continue
+
+            backend = self.backends[next_index]
+            next_index += 1
+            logger.info("AI hedge: sending to %s", backend.name)
+            hedge_at = launch(backend)
+
+        return None
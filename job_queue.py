@@ -0,0 +1,297 @@
+"""
+Durable queue for large classification runs, stored in a local SQLite file.
+
+A job is a list of addresses; every address is one row in job_items. Worker
+processes (job_worker.py) lease small batches of rows, classify them and
+write each result back as it finishes, so a crash or restart only repeats
+the batches that were in flight: their leases expire and another worker
+picks them up. Finished rows are never handed out again.
+
+The file is opened in WAL mode, which SQLite supports only on a local disk:
+all workers must run on the machine that holds the file. It must not be
+shared over NFS/SMB.
+"""
+
+import csv
+import hashlib
+import hmac
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from address_normalizer import validate_and_sanitize_address
+
+DEFAULT_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(__file__), "data", "jobs.sqlite3"))
+
+# Item states
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+# Window for the "recent" throughput figure in job progress
+THROUGHPUT_WINDOW_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    created_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    token_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    finished_at REAL,
+    retry_at REAL,
+    PRIMARY KEY (job_id, seq)
+);
+CREATE INDEX IF NOT EXISTS job_items_state ON job_items (state);
+CREATE INDEX IF NOT EXISTS job_items_finished ON job_items (job_id, finished_at);
+"""
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class LeasedItem:
+    __slots__ = ("job_id", "seq", "address", "attempts")
+
+    def __init__(self, job_id: str, seq: int, address: str, attempts: int):
+        self.job_id = job_id
+        self.seq = seq
+        self.address = address
+        self.attempts = attempts
+
+
+def read_addresses(text: str) -> List[str]:
+    """
+    Addresses from an uploaded file: a CSV with an "address" column, or
+    otherwise one address per line (commas are part of the address).
+    """
+    lines = text.splitlines()
+    if not lines:
+        return []
+    header = next(csv.reader([lines[0]]))
+    columns = [h.strip().lower() for h in header]
+    if "address" in columns:
+        column = columns.index("address")
+        rows = csv.reader(io.StringIO("\n".join(lines[1:])))
+        return [row[column].strip() for row in rows if len(row) > column and row[column].strip()]
+    return [line.strip() for line in lines if line.strip()]
+
+
+def validate_addresses(addresses: Iterable[Any]) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """
+    Sanitized addresses, and the rejected ones as {"position", "error"}
+    (position is the 0-based index in the input).
+    """
+    valid: List[str] = []
+    rejected: List[Dict[str, Any]] = []
+    for position, raw in enumerate(addresses):
+        try:
+            valid.append(validate_and_sanitize_address(raw if isinstance(raw, str) else ""))
+        except ValueError as e:
+            rejected.append({"position": position, "error": str(e)})
+    return valid, rejected
+
+
+class JobQueue:
+    def __init__(self, db_path: str, busy_timeout: float = 30.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Queue files created before retry backoff / job tokens lack these columns
+        for table, column in (("job_items", "retry_at REAL"), ("jobs", "token_hash TEXT")):
+            if column.split()[0] not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode; writes use explicit transactions."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout, isolation_level=None)
+            # WAL lets progress queries read while workers write
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def create_job(self, addresses: Iterable[str], name: Optional[str] = None, token: Optional[str] = None) -> str:
+        """Queues the addresses; a token (stored hashed) later grants access to this job only (see check_token)."""
+        job_id = uuid.uuid4().hex
+        rows = [(job_id, seq, address) for seq, address in enumerate(addresses)]
+        token_hash = _hash_token(token) if token else None
+
+        def insert(conn):
+            conn.execute("INSERT INTO jobs (id, name, created_at, total, token_hash) VALUES (?, ?, ?, ?, ?)",
+                         (job_id, name, time.time(), len(rows), token_hash))
+            conn.executemany("INSERT INTO job_items (job_id, seq, address) VALUES (?, ?, ?)", rows)
+
+        self._transaction(insert)
+        return job_id
+
+    def lease(self, worker_id: str, limit: int, lease_seconds: float, max_attempts: int = 3) -> List[LeasedItem]:
+        """
+        Claims up to `limit` items whose lease has expired, then pending items
+        that are not backing off after a failure, oldest job first. The claim is
+        atomic across processes. An expired item that has already used
+        max_attempts (e.g. it keeps crashing workers) is marked failed instead.
+        """
+        def claim(conn):
+            now = time.time()
+            conn.execute(
+                "UPDATE job_items SET state = ?, error = ?, finished_at = ?, lease_owner = NULL, lease_until = NULL "
+                "WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, "Lease expired too many times", now, LEASED, now, max_attempts),
+            )
+            # Two indexed queries rather than one OR, so finished rows are never scanned
+            rows = conn.execute(
+                "SELECT job_id, seq, address, attempts FROM job_items "
+                "WHERE state = ? AND lease_until < ? LIMIT ?",
+                (LEASED, now, limit),
+            ).fetchall()
+            if len(rows) < limit:
+                rows += conn.execute(
+                    "SELECT job_id, seq, address, attempts FROM job_items "
+                    "WHERE state = ? AND (retry_at IS NULL OR retry_at <= ?) ORDER BY rowid LIMIT ?",
+                    (PENDING, now, limit - len(rows)),
+                ).fetchall()
+            conn.executemany(
+                "UPDATE job_items SET state = ?, lease_owner = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE job_id = ? AND seq = ?",
+                [(LEASED, worker_id, now + lease_seconds, job_id, seq) for job_id, seq, _, _ in rows],
+            )
+            return [LeasedItem(job_id, seq, address, attempts + 1) for job_id, seq, address, attempts in rows]
+
+        return self._transaction(claim)
+
+    def complete(self, worker_id: str, results: List[Tuple[LeasedItem, str]]) -> int:
+        """
+        Checkpoints (item, result JSON) pairs in one transaction. Items whose lease
+        was lost to another worker are skipped. Returns the count recorded.
+        """
+        def write(conn):
+            now = time.time()
+            recorded = 0
+            for item, result in results:
+                cursor = conn.execute(
+                    "UPDATE job_items SET state = ?, result = ?, error = NULL, finished_at = ?, "
+                    "lease_owner = NULL, lease_until = NULL "
+                    "WHERE job_id = ? AND seq = ? AND state = ? AND lease_owner = ?",
+                    (DONE, result, now, item.job_id, item.seq, LEASED, worker_id),
+                )
+                recorded += cursor.rowcount
+            return recorded
+
+        return self._transaction(write)
+
+    def fail(self, worker_id: str, item: LeasedItem, error: str, max_attempts: int, retry_delay: float = 0) -> None:
+        """Returns the item to the queue (not leased again for retry_delay seconds), or marks it failed after max_attempts."""
+        now = time.time()
+        state = FAILED if item.attempts >= max_attempts else PENDING
+        finished_at = now if state == FAILED else None
+        retry_at = now + retry_delay if state == PENDING and retry_delay > 0 else None
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE job_items SET state = ?, error = ?, finished_at = ?, retry_at = ?, lease_owner = NULL, lease_until = NULL "
+            "WHERE job_id = ? AND seq = ? AND state = ? AND lease_owner = ?",
+            (state, error, finished_at, retry_at, item.job_id, item.seq, LEASED, worker_id),
+        ))
+
+    def check_token(self, job_id: str, token: Optional[str]) -> bool:
+        """True if token is the one the job was created with."""
+        if not token:
+            return False
+        row = self._conn().execute("SELECT token_hash FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0] and hmac.compare_digest(row[0], _hash_token(token)))
+
+    def exists(self, job_id: str) -> bool:
+        return self._conn().execute("SELECT 1 FROM jobs WHERE id = ?", (job_id,)).fetchone() is not None
+
+    def progress(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Counts per state, recent throughput and an ETA; None for an unknown job."""
+        conn = self._conn()
+        job = conn.execute("SELECT name, created_at, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        name, created_at, total = job
+
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        for state, count in conn.execute(
+                "SELECT state, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY state", (job_id,)):
+            counts[state] = count
+
+        now = time.time()
+        recent = conn.execute(
+            "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND finished_at >= ?",
+            (job_id, now - THROUGHPUT_WINDOW_SECONDS),
+        ).fetchone()[0]
+        items_per_second = recent / THROUGHPUT_WINDOW_SECONDS
+        remaining = counts[PENDING] + counts[LEASED]
+
+        if remaining == 0:
+            status = "completed"
+        elif counts[DONE] or counts[FAILED] or counts[LEASED]:
+            status = "running"
+        else:
+            status = "queued"
+
+        return {
+            "job_id": job_id,
+            "name": name,
+            "status": status,
+            "created_at": created_at,
+            "total": total,
+            **counts,
+            "items_per_second": round(items_per_second, 2),
+            "eta_seconds": round(remaining / items_per_second) if remaining and items_per_second else None,
+        }
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = self._conn().execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self.progress(job_id) for (job_id,) in rows]
+
+    def results(self, job_id: str, after: int = -1, limit: int = 100) -> List[Dict[str, Any]]:
+        """Finished items with seq > after, in input order (page with the last seq returned)."""
+        rows = self._conn().execute(
+            "SELECT seq, address, state, result, error FROM job_items "
+            "WHERE job_id = ? AND seq > ? AND state IN (?, ?) ORDER BY seq LIMIT ?",
+            (job_id, after, DONE, FAILED, limit),
+        ).fetchall()
+        return [
+            {
+                "seq": seq,
+                "address": address,
+                "state": state,
+                "response": json.loads(result) if result else None,
+                "error": error,
+            }
+            for seq, address, state, result, error in rows
+        ]
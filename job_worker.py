@@ -0,0 +1,168 @@
+"""
+Worker processes for the durable job queue (job_queue.py).
+
+Each worker leases a batch of addresses, classifies them with its own
+BusinessAnzsicLocator (near-duplicates in a batch share one lookup) and
+checkpoints the results before leasing the next batch. Start as many
+workers as the upstream quotas allow, all on the machine that holds the
+queue file (it is opened in WAL mode, which needs a local disk).
+
+Usage:
+    python job_worker.py [--db PATH] [--processes N] [--batch-size N] [--exit-when-idle]
+    python job_worker.py --db PATH --submit addresses.csv [--name NAME]
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Any, Optional
+
+from cache_warmer import CacheWarmer
+from job_queue import DEFAULT_DB_PATH, JobQueue, read_addresses, validate_addresses
+from structured_logging import configure_logging, new_request_id, request_context
+
+logger = logging.getLogger(__name__)
+
+
+def to_json(response: Any) -> str:
+    """Serializes a locator response; record types become dicts as at the Flask boundary."""
+    def default(o):
+        if hasattr(o, "to_dict"):
+            return o.to_dict()
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+    return json.dumps(response, default=default)
+
+
+def retry_delay(attempts: int, base: float, cap: float = 600.0) -> float:
+    """Exponential backoff before the next attempt: base, 2 * base, 4 * base, ... up to cap."""
+    return min(cap, base * 2 ** max(0, attempts - 1))
+
+
+def run_worker(
+    queue: JobQueue,
+    locator,
+    worker_id: Optional[str] = None,
+    batch_size: int = 20,
+    lease_seconds: float = 300,
+    max_attempts: int = 3,
+    max_workers: int = 4,
+    poll_interval: float = 2.0,
+    exit_when_idle: bool = False,
+    stop_event: Optional[threading.Event] = None,
+    retry_base_seconds: float = 30.0,
+) -> int:
+    """
+    Processes leased batches until stopped (or, with exit_when_idle, until the
+    queue is empty). Returns the number of items checkpointed.
+
+    Only definitive answers are checkpointed: a classification, or "no business
+    found". Retryable errors (upstream timeouts, 429s and 5xx, unexpected
+    failures) send the item back to the queue with exponential backoff, up to
+    max_attempts.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    while not (stop_event and stop_event.is_set()):
+        items = queue.lease(worker_id, batch_size, lease_seconds, max_attempts)
+        if not items:
+            if exit_when_idle:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        def retry(item, error: str) -> None:
+            logger.warning("Worker %s: item %s/%s failed (attempt %s): %s", worker_id, item.job_id, item.seq,
+                           item.attempts, error)
+            queue.fail(worker_id, item, error, max_attempts, retry_delay(item.attempts, retry_base_seconds))
+
+        # Each leased batch is one "request" for log correlation
+        with request_context(new_request_id()):
+            try:
+                responses = locator.get_business_details_batch([item.address for item in items], max_workers=max_workers)
+            except Exception as e:
+                # Retry one by one so a single bad address does not fail the whole batch
+                logger.warning("Worker %s: batch failed (%s); retrying items individually", worker_id, e)
+                responses = []
+                for item in items:
+                    try:
+                        responses.append(locator.get_business_details(item.address))
+                    except Exception as item_error:
+                        responses.append({"error": str(item_error), "retryable": True})
+
+            results = []
+            for item, response in zip(items, responses):
+                if isinstance(response, dict) and response.get("retryable"):
+                    retry(item, response["error"])
+                else:
+                    results.append((item, to_json(response)))
+
+            processed += queue.complete(worker_id, results)
+            logger.info("Worker %s: checkpointed %s items of job(s) %s (%s total)", worker_id, len(results),
+                        ",".join(sorted({item.job_id for item in items})), processed)
+    return processed
+
+
+def _worker_process(db_path: str, options: dict) -> None:
+    from config import locator_from_env
+
+    configure_logging(
+        level=os.getenv('LOG_LEVEL', 'INFO'),
+        fmt=os.getenv('LOG_FORMAT', 'json').lower(),
+        sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 1.0)),
+    )
+    locator = locator_from_env()
+    # Start from the web service's snapshot of hot places and AI answers, if there is one
+    CacheWarmer(locator, os.getenv('CACHE_SNAPSHOT_PATH')).start()
+    run_worker(JobQueue(db_path), locator, **options)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run classification job workers or submit a job.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Path of the SQLite job queue")
+    parser.add_argument("--submit", metavar="FILE", help="Create a job from a CSV / one-address-per-line file and exit")
+    parser.add_argument("--name", help="Name of the submitted job")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes to start")
+    parser.add_argument("--batch-size", type=int, default=20, help="Items leased per batch")
+    parser.add_argument("--lease-seconds", type=float, default=300, help="Lease length before a batch is re-queued")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before an item is marked failed")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Stop once the queue is empty")
+    args = parser.parse_args(argv)
+
+    queue = JobQueue(args.db)
+    if args.submit:
+        with open(args.submit, "r", encoding="utf-8-sig") as f:
+            addresses, rejected = validate_addresses(read_addresses(f.read()))
+        for row in rejected:
+            print(f"Skipped address {row['position']}: {row['error']}", file=sys.stderr)
+        if not addresses:
+            print("No valid addresses to submit", file=sys.stderr)
+            return 1
+        job_id = queue.create_job(addresses, name=args.name or os.path.basename(args.submit))
+        print(f"Created job {job_id} with {len(addresses)} addresses ({len(rejected)} rejected)")
+        return 0
+
+    options = {
+        "batch_size": args.batch_size,
+        "lease_seconds": args.lease_seconds,
+        "max_attempts": args.max_attempts,
+        "exit_when_idle": args.exit_when_idle,
+    }
+    processes = [
+        multiprocessing.Process(target=_worker_process, args=(args.db, options), daemon=False)
+        for _ in range(max(1, args.processes))
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
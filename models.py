@@ -0,0 +1,148 @@
+"""
+Compact record types for ANZSIC classes and classification results.
+
+All records use __slots__ (no per-instance __dict__), and repeated strings
+(hierarchy titles, Google place types) are interned so that thousands of
+rows or cached results share one copy. Records stay as Python objects inside
+the service; to_dict() is only called when serializing at the Flask boundary.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(str(value or ""))
+
+
+@dataclass(frozen=True)
+class Classification:
+    """A code/title pair, e.g. an entry of the direct Google type mapping."""
+    __slots__ = ("code", "title")
+    code: str
+    title: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"code": self.code, "title": self.title}
+
+
+@dataclass(frozen=True)
+class AnzsicClass:
+    """One 4-digit ANZSIC 2006 class with its division, subdivision and group."""
+    __slots__ = ("code", "title", "division", "division_title",
+                 "subdivision", "subdivision_title", "group", "group_title")
+    code: str
+    title: str
+    division: str
+    division_title: str
+    subdivision: str
+    subdivision_title: str
+    group: str
+    group_title: str
+
+    @classmethod
+    def from_dict(cls, row: Dict[str, Any]) -> "AnzsicClass":
+        return cls(
+            code=_intern(row.get("code")),
+            title=str(row.get("title") or ""),
+            division=_intern(row.get("division")),
+            division_title=_intern(row.get("division_title")),
+            subdivision=_intern(row.get("subdivision")),
+            subdivision_title=_intern(row.get("subdivision_title")),
+            group=_intern(row.get("group")),
+            group_title=_intern(row.get("group_title")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "code": self.code,
+            "title": self.title,
+            "division": self.division,
+            "division_title": self.division_title,
+            "subdivision": self.subdivision,
+            "subdivision_title": self.subdivision_title,
+            "group": self.group,
+            "group_title": self.group_title,
+        }
+
+
+@dataclass(frozen=True)
+class AIClassification:
+    """Tier 3 answer; official is True when the title came from the local ANZSIC database."""
+    __slots__ = ("code", "title", "official")
+    code: str
+    title: str
+    official: bool
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"code": self.code, "title": self.title}
+
+
+# Tier 1 yields a Classification, Tier 2 the matched AnzsicClass row itself
+RecommendedClassification = Union[Classification, AnzsicClass]
+
+UNCLASSIFIED = Classification(code="Unknown", title="Classification Not Found")
+
+
+@dataclass
+class SourceIntelligence:
+    """What Google Places told us about the business."""
+    __slots__ = ("business_name", "detected_type", "address", "raw_types", "match_method")
+    business_name: str
+    detected_type: str
+    address: str
+    raw_types: Tuple[str, ...]
+    match_method: str
+
+    @staticmethod
+    def intern_types(types: Iterable[str]) -> Tuple[str, ...]:
+        return tuple(sys.intern(t) for t in types)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "business_name": self.business_name,
+            "detected_type": self.detected_type,
+            "address": self.address,
+            "raw_types": list(self.raw_types),
+            "match_method": self.match_method,
+        }
+
+
+@dataclass(init=False)
+class ClassificationResult:
+    """
+    One classified business. ai_classification is filled in after the fact by
+    the AI tier, so this record is mutable; the classifications it points to are not.
+    candidate_token is set instead when AI classification was deferred (lazy mode),
+    and ai_negative_cached when the AI tier recently failed on this business and
+    was not asked again.
+    """
+    __slots__ = ("source_intelligence", "recommended_classification", "ai_classification",
+                 "candidate_token", "ai_negative_cached")
+    source_intelligence: SourceIntelligence
+    recommended_classification: RecommendedClassification
+    ai_classification: Optional[AIClassification]
+    candidate_token: Optional[str]
+    ai_negative_cached: bool
+
+    def __init__(self, source_intelligence: SourceIntelligence, recommended_classification: RecommendedClassification,
+                 ai_classification: Optional[AIClassification] = None, candidate_token: Optional[str] = None,
+                 ai_negative_cached: bool = False):
+        self.source_intelligence = source_intelligence
+        self.recommended_classification = recommended_classification
+        self.ai_classification = ai_classification
+        self.candidate_token = candidate_token
+        self.ai_negative_cached = ai_negative_cached
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "source_intelligence": self.source_intelligence.to_dict(),
+            "recommended_classification": self.recommended_classification.to_dict(),
+            "ai_classification": self.ai_classification.to_dict() if self.ai_classification else None,
+        }
+        if self.candidate_token:
+            data["candidate_token"] = self.candidate_token
+        if self.ai_negative_cached:
+            data["ai_negative_cached"] = True
+        return data
@@ -0,0 +1,83 @@
+"""
+Short-lived memory of lookups that failed, so retries do not re-pay upstream.
+
+Each failure class has its own base TTL. Every consecutive failure of the same
+key doubles the re-check interval (up to max_ttl), and a success clears the key.
+Expired entries keep their failure count so a key that keeps failing is
+re-checked less and less often.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# Failure classes and their first re-check interval, in seconds
+NO_MATCH = "no_match"        # Places found no business at the address / location
+AI_UNKNOWN = "ai_unknown"    # The model answered "Unknown", "9999" or "none of the options"
+AI_ERROR = "ai_error"        # No backend returned a parseable answer
+
+DEFAULT_BASE_TTLS: Dict[str, float] = {
+    NO_MATCH: 15 * 60,
+    AI_UNKNOWN: 60 * 60,
+    AI_ERROR: 60,
+}
+
+
+class NegativeEntry:
+    __slots__ = ("failure_class", "failures", "until")
+
+    def __init__(self, failure_class: str, failures: int, until: float):
+        self.failure_class = failure_class
+        self.failures = failures
+        self.until = until
+
+
+class NegativeCache:
+    def __init__(
+        self,
+        base_ttls: Optional[Dict[str, float]] = None,
+        max_ttl: float = 24 * 3600,
+        max_entries: int = 50000,
+    ):
+        self.base_ttls = {**DEFAULT_BASE_TTLS, **(base_ttls or {})}
+        self.max_ttl = max_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, NegativeEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[NegativeEntry]:
+        """The entry if the key failed recently and is not yet due for a re-check."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() >= entry.until:
+                return None
+            return entry
+
+    def record(self, key: str, failure_class: str) -> NegativeEntry:
+        """Remembers a failure; the TTL doubles with each consecutive failure of the key."""
+        base = self.base_ttls.get(failure_class, 0)
+        with self._lock:
+            previous = self._entries.get(key)
+            failures = previous.failures + 1 if previous is not None else 1
+            ttl = min(self.max_ttl, base * 2 ** (failures - 1))
+            entry = self._entries[key] = NegativeEntry(failure_class, failures, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # Least recently failed
+            return entry
+
+    def clear(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drops every key starting with prefix. Returns the count removed."""
+        with self._lock:
+            stale = [key for key in self._entries if key.startswith(prefix)]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
@@ -0,0 +1,154 @@
+"""
+Classification results keyed by Google place id.
+
+Different spellings of an address resolve to the same place id, so a hit here
+lets the locator skip nearby search, enrichment and AI entirely. Entries expire
+after a TTL and are dropped as soon as Google reports different types for the
+place (a new tenant, a re-categorised business).
+
+Text search responses are cached separately (PlaceSearchCache), also bounded
+and with a TTL: the types compared above come from that response, so a
+response cached forever would hide every type change.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from models import ClassificationResult
+
+
+def types_fingerprint(place: Dict[str, Any]) -> Tuple[str, ...]:
+    """Primary type followed by the sorted type list; changes when Google re-categorises a place."""
+    return (place.get("primaryType") or "",) + tuple(sorted(place.get("types", [])))
+
+
+class StoredClassification:
+    __slots__ = ("fingerprint", "status", "results", "stored_at")
+
+    def __init__(self, fingerprint: Tuple[str, ...], status: str, results: List[ClassificationResult], stored_at: float):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.results = results
+        self.stored_at = stored_at
+
+
+class PlaceClassificationStore:
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, StoredClassification]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, place_id: str, fingerprint: Tuple[str, ...]) -> Optional[StoredClassification]:
+        """Returns the stored entry if it is fresh and the place types are unchanged."""
+        if not place_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(place_id)
+            if entry is None:
+                return None
+            if time.time() - entry.stored_at > self.ttl_seconds or entry.fingerprint != fingerprint:
+                del self._entries[place_id]
+                return None
+            self._entries.move_to_end(place_id)
+            return entry
+
+    def put(self, place_id: str, fingerprint: Tuple[str, ...], status: str, results: List[ClassificationResult]) -> None:
+        if not place_id:
+            return
+        with self._lock:
+            self._entries[place_id] = StoredClassification(fingerprint, status, list(results), time.time())
+            self._entries.move_to_end(place_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)  # Least recently used
+
+    def result_at(self, place_id: str, index: int, business_name: str) -> Optional[ClassificationResult]:
+        """
+        The index-th result of a fresh entry, if it is still for business_name;
+        used to attach answers to stored results (types are not checked).
+        """
+        if not place_id:
+            return None
+        with self._lock:
+            entry = self._entries.get(place_id)
+            if entry is None or time.time() - entry.stored_at > self.ttl_seconds or not 0 <= index < len(entry.results):
+                return None
+            result = entry.results[index]
+            return result if result.source_intelligence.business_name == business_name else None
+
+    def invalidate_codes(self, codes: Iterable[str]) -> int:
+        """Drops entries whose classifications use any of the given codes. Returns the count removed."""
+        codes = set(codes)
+        with self._lock:
+            stale = [
+                place_id for place_id, entry in self._entries.items()
+                if any(
+                    r.recommended_classification.code in codes
+                    or (r.ai_classification is not None and r.ai_classification.code in codes)
+                    for r in entry.results
+                )
+            ]
+            for place_id in stale:
+                del self._entries[place_id]
+        return len(stale)
+
+
+class PlaceSearchCache:
+    """Places text search responses keyed by canonical address: an LRU of at most max_entries, each kept for ttl_seconds."""
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_entries: int = 50000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._get(key)
+
+    def put(self, key: str, data: Dict[str, Any], stored_at: Optional[float] = None) -> None:
+        with self._lock:
+            self._put(key, data, stored_at)
+
+    def setdefault(self, key: str, data: Dict[str, Any], stored_at: Optional[float] = None) -> Dict[str, Any]:
+        """Stores data unless a fresh entry exists; returns the entry now cached."""
+        with self._lock:
+            cached = self._get(key)
+            if cached is None:
+                self._put(key, data, stored_at)
+                return data
+            return cached
+
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Fresh entries, least recently used first."""
+        return [(key, data) for key, data, _ in self.entries()]
+
+    def entries(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Fresh entries as (key, data, stored_at), least recently used first."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            return [(key, data, stored_at) for key, (data, stored_at) in self._entries.items() if stored_at >= cutoff]
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[1] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: str, data: Dict[str, Any], stored_at: Optional[float]) -> None:
+        self._entries[key] = (data, time.time() if stored_at is None else stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)  # Least recently used
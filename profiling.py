@@ -0,0 +1,140 @@
+"""
+Opt-in profiling of individual requests under real traffic.
+
+A request is profiled when it carries the admin token in the X-Profile header,
+or when it is picked by random sampling (sample_rate). It then runs under
+cProfile, and every upstream call made on its behalf (Places, AI backends,
+including calls made from worker threads) is timed. The reports are kept in a
+bounded ring buffer for the admin endpoints.
+
+Upstream calls are attributed through a context variable. Code that hands
+work to a thread pool submits it with contextvars.copy_context().run so the
+timings follow the request. Outside a profiled request, upstream_call() costs
+one context variable lookup.
+"""
+
+import contextvars
+import cProfile
+import io
+import itertools
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from auth import AdminAuth
+
+_current: contextvars.ContextVar[Optional["ProfileReport"]] = contextvars.ContextVar("profile_report", default=None)
+
+
+class ProfileReport:
+    __slots__ = ("id", "label", "trigger", "started_at", "duration_ms", "upstream", "profile", "_lock")
+
+    def __init__(self, report_id: int, label: str, trigger: str):
+        self.id = report_id
+        self.label = label
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.upstream: List[Dict[str, Any]] = []
+        self.profile: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def add_upstream(self, name: str, duration_ms: float, status: Any) -> None:
+        with self._lock:
+            self.upstream.append({"name": name, "duration_ms": round(duration_ms, 1), "status": status})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "upstream_calls": len(self.upstream),
+            "upstream_ms": round(sum(u["duration_ms"] for u in self.upstream), 1),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**self.summary(), "upstream": list(self.upstream), "profile": self.profile}
+
+
+@contextmanager
+def upstream_call(name: str) -> Iterator[Dict[str, Any]]:
+    """
+    Times one upstream request for the current profiled request, if any.
+    The caller may set info["status"] (e.g. the HTTP status code).
+    """
+    report = _current.get()
+    info: Dict[str, Any] = {"status": None}
+    if report is None:
+        yield info
+        return
+    started = time.perf_counter()
+    try:
+        yield info
+    except BaseException as e:
+        info["status"] = type(e).__name__
+        raise
+    finally:
+        report.add_upstream(name, (time.perf_counter() - started) * 1000, info["status"])
+
+
+class RequestProfiler:
+    def __init__(self, auth: Optional[AdminAuth] = None, sample_rate: float = 0.0,
+                 max_reports: int = 50, top_functions: int = 30):
+        self.auth = auth or AdminAuth()
+        self.sample_rate = sample_rate
+        self.top_functions = top_functions
+        self._reports: "deque[ProfileReport]" = deque(maxlen=max_reports)
+        self._reports_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        # Only one cProfile may run at a time (Python 3.12+ has a single profiler slot)
+        self._cprofile_lock = threading.Lock()
+
+    def trigger(self, header_token: Optional[str]) -> Optional[str]:
+        """Why this request should be profiled ("header" or "sampled"), or None."""
+        if self.auth.is_admin(header_token):
+            return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    @contextmanager
+    def profile(self, label: str, trigger: str) -> Iterator[ProfileReport]:
+        report = ProfileReport(next(self._ids), label, trigger)
+        token = _current.set(report)
+        profiler = cProfile.Profile() if self._cprofile_lock.acquire(blocking=False) else None
+        started = time.perf_counter()
+        try:
+            if profiler is not None:
+                profiler.enable()
+            yield report
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_lock.release()
+                report.profile = self._format(profiler)
+            else:
+                report.profile = "cProfile was busy with another request; only upstream timings were captured."
+            report.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+            _current.reset(token)
+            with self._reports_lock:
+                self._reports.append(report)
+
+    def _format(self, profiler: cProfile.Profile) -> str:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(self.top_functions)
+        return out.getvalue()
+
+    def reports(self) -> List[Dict[str, Any]]:
+        """Summaries, newest first."""
+        with self._reports_lock:
+            return [r.summary() for r in reversed(self._reports)]
+
+    def get(self, report_id: int) -> Optional[ProfileReport]:
+        with self._reports_lock:
+            return next((r for r in self._reports if r.id == report_id), None)
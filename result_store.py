@@ -0,0 +1,603 @@
+"""
+Append-only columnar store of classification results, for reporting.
+
+Rows are buffered in memory and written as immutable segments (one directory
+per flush). Each column is its own file:
+  - dictionary-encoded columns (code, division, subdivision, group,
+    code_source): one uint16 (or uint32) per row, with the dictionary of
+    (value, title) pairs in the segment's meta.json;
+  - string columns: uint64 offsets plus the UTF-8 bytes;
+  - classified_at: float64.
+place_id and address_key also get a sorted (hash, row) index file.
+
+Readers memory-map the files, so counts by division / subdivision / group /
+code only touch one small column, and lookups by place or address binary
+search the index and decode just the matching rows. Segments are written
+to a temporary directory and renamed into place, so readers never see a
+partial segment and several processes can append to the same store.
+
+Segments are written by a background thread, never by the request that
+appended the rows. After each write the same thread merges the newest
+segments once compact_segments of them are of similar total size (size
+tiers, like an LSM tree): small recent segments are merged often, large old
+ones rarely, so each row is rewritten about log(rows) times rather than on
+every compaction. Merging streams column by column from the mapped files,
+one process at a time (under a lock file). A merged segment's maps are
+closed as soon as no read is using them.
+"""
+
+import array
+import atexit
+import hashlib
+import heapq
+import json
+import logging
+import mmap
+import os
+import shutil
+import struct
+import sys
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: compaction is not coordinated between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+STRING_COLUMNS = ("place_id", "address_key", "address", "business_name", "detected_type")
+DICT_COLUMNS = ("code", "division", "subdivision", "group", "code_source")
+INDEXED_COLUMNS = ("place_id", "address_key")
+LEVELS = ("code", "division", "subdivision", "group")
+
+_INDEX_ENTRY = struct.Struct("<QI")  # key hash, row
+
+# code_source of rows for businesses no tier classified; a later row for the same business supersedes them
+PLACEHOLDER_SOURCE = "failed"
+
+COMPACT_LOCK_NAME = ".compact.lock"
+
+# Rows copied per step when merging segments
+_MERGE_CHUNK_ROWS = 65536
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "little")
+
+
+IDENTITY_COLUMNS = ("place_id", "address_key", "business_name", "address")
+
+
+def _identity(row: Dict[str, Any]) -> Tuple[str, ...]:
+    """The business a row is about."""
+    return tuple(row.get(column) or "" for column in IDENTITY_COLUMNS)
+
+
+class _Segment:
+    """
+    One sealed segment. All its files are mapped when it is opened, so it stays
+    readable after another process compacts it away and deletes the files.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        if self.meta.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Segment {path} was written on a {self.meta.get('byteorder')}-endian machine")
+        self.rows: int = self.meta["rows"]
+        self.dictionaries: Dict[str, List[List[str]]] = self.meta["dictionaries"]
+        self._maps: Dict[str, Any] = {}
+        try:
+            for filename in os.listdir(path):
+                if filename != "meta.json":
+                    self._maps[filename] = self._open_map(os.path.join(path, filename))
+        except OSError:
+            self.close()
+            raise
+
+    @staticmethod
+    def _open_map(path: str):
+        with open(path, "rb") as f:
+            # An empty file (e.g. a column of empty strings) cannot be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _map(self, filename: str):
+        return self._maps[filename]
+
+    def codes(self, column: str) -> memoryview:
+        return memoryview(self._map(f"{column}.dict")).cast(self.meta["typecodes"][column])
+
+    def dict_value(self, column: str, row: int) -> Tuple[str, str]:
+        value, title = self.dictionaries[column][self.codes(column)[row]]
+        return value, title
+
+    def string(self, column: str, row: int) -> str:
+        offsets = memoryview(self._map(f"{column}.off")).cast("Q")
+        return self._map(f"{column}.dat")[offsets[row]:offsets[row + 1]].decode()
+
+    def classified_at(self, row: int) -> float:
+        return memoryview(self._map("classified_at.f64")).cast("d")[row]
+
+    def find(self, column: str, value: str) -> List[int]:
+        """Rows whose indexed column equals value (binary search on the hash index)."""
+        index = self._map(f"{column}.idx")
+        target = _hash(value)
+        lo, hi = 0, self.rows
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _INDEX_ENTRY.unpack_from(index, mid * _INDEX_ENTRY.size)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        rows = []
+        while lo < self.rows:
+            key_hash, row = _INDEX_ENTRY.unpack_from(index, lo * _INDEX_ENTRY.size)
+            if key_hash != target:
+                break
+            if self.string(column, row) == value:
+                rows.append(row)
+            lo += 1
+        return sorted(rows)
+
+    def identity(self, row: int) -> Tuple[str, ...]:
+        return tuple(self.string(column, row) for column in IDENTITY_COLUMNS)
+
+    def placeholder_rows(self) -> List[int]:
+        entries = self.dictionaries["code_source"]
+        position = next((n for n, (value, _) in enumerate(entries) if value == PLACEHOLDER_SOURCE), None)
+        if position is None:
+            return []
+        return [row for row, code in enumerate(self.codes("code_source")) if code == position]
+
+    def row(self, row: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = {column: self.string(column, row) for column in STRING_COLUMNS}
+        for column in DICT_COLUMNS:
+            value, title = self.dict_value(column, row)
+            record[column] = value
+            if column in LEVELS:
+                record[f"{column}_title"] = title
+        record["classified_at"] = self.classified_at(row)
+        return record
+
+    def close(self) -> None:
+        for mapped in self._maps.values():
+            try:
+                if isinstance(mapped, mmap.mmap):
+                    mapped.close()
+            except BufferError:
+                pass  # A caller still holds a view; the map is released with it
+        self._maps.clear()
+
+
+def _segment_time(name: str) -> int:
+    return int(name.split("-")[1])
+
+
+def _new_segment_dir(directory: str, time_ns: Optional[int]) -> Tuple[str, str]:
+    """(temporary path, final name) of a new segment; segments sort by time_ns (default now), oldest first."""
+    name = f"seg-{time.time_ns() if time_ns is None else time_ns:020d}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    tmp = os.path.join(directory, f".tmp-{name}")
+    os.makedirs(tmp)
+    return tmp, name
+
+
+def _seal_segment(directory: str, tmp: str, name: str, meta: Dict[str, Any]) -> str:
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    final = os.path.join(directory, name)
+    os.rename(tmp, final)
+    return final
+
+
+def _write_segment(directory: str, rows: List[Dict[str, Any]], time_ns: Optional[int] = None) -> str:
+    """Writes rows as a new segment; returns its path. The rename makes it visible atomically."""
+    tmp, name = _new_segment_dir(directory, time_ns)
+
+    for column in STRING_COLUMNS:
+        offsets = array.array("Q", [0])
+        with open(os.path.join(tmp, f"{column}.dat"), "wb") as f:
+            for r in rows:
+                data = (r.get(column) or "").encode()
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+        with open(os.path.join(tmp, f"{column}.off"), "wb") as f:
+            offsets.tofile(f)
+
+    dictionaries: Dict[str, List[List[str]]] = {}
+    typecodes: Dict[str, str] = {}
+    for column in DICT_COLUMNS:
+        positions: Dict[str, int] = {}
+        entries: List[List[str]] = []
+        encoded = []
+        for r in rows:
+            value = r.get(column) or ""
+            position = positions.get(value)
+            if position is None:
+                position = positions[value] = len(entries)
+                entries.append([value, r.get(f"{column}_title") or ""])
+            encoded.append(position)
+        typecodes[column] = "H" if len(entries) <= 0xFFFF else "I"
+        with open(os.path.join(tmp, f"{column}.dict"), "wb") as f:
+            array.array(typecodes[column], encoded).tofile(f)
+        dictionaries[column] = entries
+
+    with open(os.path.join(tmp, "classified_at.f64"), "wb") as f:
+        array.array("d", (float(r.get("classified_at") or 0.0) for r in rows)).tofile(f)
+
+    for column in INDEXED_COLUMNS:
+        entries = sorted((_hash(r.get(column) or ""), row) for row, r in enumerate(rows))
+        with open(os.path.join(tmp, f"{column}.idx"), "wb") as f:
+            for key_hash, row in entries:
+                f.write(_INDEX_ENTRY.pack(key_hash, row))
+
+    return _seal_segment(directory, tmp, name, {
+        "format": FORMAT_VERSION,
+        "rows": len(rows),
+        "byteorder": sys.byteorder,
+        "typecodes": typecodes,
+        "dictionaries": dictionaries,
+    })
+
+
+def _kept_runs(rows: int, dropped: List[int]) -> Iterator[Tuple[int, int]]:
+    """[start, end) ranges of rows, in chunks of at most _MERGE_CHUNK_ROWS, skipping the sorted dropped rows."""
+    start = 0
+    for end in dropped + [rows]:
+        for chunk in range(start, end, _MERGE_CHUNK_ROWS):
+            yield chunk, min(end, chunk + _MERGE_CHUNK_ROWS)
+        start = end + 1
+
+
+def _merge_segments(directory: str, segments: List[_Segment], dropped: List[Set[int]], time_ns: int) -> str:
+    """
+    Writes the rows of segments, in order and without each one's dropped rows,
+    as one new segment. Streams each column from the mapped files, so memory
+    does not grow with the number of rows. Returns the new segment's path.
+    """
+    tmp, name = _new_segment_dir(directory, time_ns)
+    dropped_rows = [sorted(d) for d in dropped]
+    total = sum(segment.rows - len(d) for segment, d in zip(segments, dropped_rows))
+
+    for column in STRING_COLUMNS:
+        written = 0
+        with open(os.path.join(tmp, f"{column}.dat"), "wb") as dat, open(os.path.join(tmp, f"{column}.off"), "wb") as off:
+            array.array("Q", [0]).tofile(off)
+            for segment, d in zip(segments, dropped_rows):
+                offsets = memoryview(segment._map(f"{column}.off")).cast("Q")
+                data = memoryview(segment._map(f"{column}.dat"))
+                for start, end in _kept_runs(segment.rows, d):
+                    dat.write(data[offsets[start]:offsets[end]])
+                    shift = written - offsets[start]
+                    array.array("Q", (o + shift for o in offsets[start + 1:end + 1])).tofile(off)
+                    written += offsets[end] - offsets[start]
+
+    dictionaries: Dict[str, List[List[str]]] = {}
+    typecodes: Dict[str, str] = {}
+    for column in DICT_COLUMNS:
+        positions: Dict[str, int] = {}
+        entries: List[List[str]] = []
+        translations = []
+        for segment in segments:
+            translation = []
+            for value, title in segment.dictionaries[column]:
+                position = positions.get(value)
+                if position is None:
+                    position = positions[value] = len(entries)
+                    entries.append([value, title])
+                translation.append(position)
+            translations.append(translation)
+        typecodes[column] = "H" if len(entries) <= 0xFFFF else "I"
+        with open(os.path.join(tmp, f"{column}.dict"), "wb") as f:
+            for segment, d, translation in zip(segments, dropped_rows, translations):
+                codes = segment.codes(column)
+                for start, end in _kept_runs(segment.rows, d):
+                    array.array(typecodes[column], (translation[c] for c in codes[start:end])).tofile(f)
+        dictionaries[column] = entries
+
+    with open(os.path.join(tmp, "classified_at.f64"), "wb") as f:
+        for segment, d in zip(segments, dropped_rows):
+            data = memoryview(segment._map("classified_at.f64"))
+            for start, end in _kept_runs(segment.rows, d):
+                f.write(data[start * 8:end * 8])
+
+    for column in INDEXED_COLUMNS:
+        # Each segment's index is sorted already: merge them, renumbering the rows
+        streams = []
+        base = 0
+        for segment, d in zip(segments, dropped_rows):
+            streams.append(_index_entries(segment, column, d, base))
+            base += segment.rows - len(d)
+        with open(os.path.join(tmp, f"{column}.idx"), "wb") as f:
+            for key_hash, row in heapq.merge(*streams):
+                f.write(_INDEX_ENTRY.pack(key_hash, row))
+
+    return _seal_segment(directory, tmp, name, {
+        "format": FORMAT_VERSION,
+        "rows": total,
+        "byteorder": sys.byteorder,
+        "typecodes": typecodes,
+        "dictionaries": dictionaries,
+    })
+
+
+def _index_entries(segment: _Segment, column: str, dropped: List[int], base: int) -> Iterator[Tuple[int, int]]:
+    """The segment's (hash, row) index entries without dropped rows, numbered from base in the merged segment."""
+    skip = set(dropped)
+    for key_hash, row in _INDEX_ENTRY.iter_unpack(memoryview(segment._map(f"{column}.idx"))):
+        if row not in skip:
+            yield key_hash, base + row - bisect_left(dropped, row)
+
+
+def _superseded(segments: List[_Segment]) -> List[Set[int]]:
+    """
+    Per segment, its placeholder rows for which a later row (in the same or a
+    newer segment) answers the same business. Found through the indexes, so
+    the cost grows with the number of placeholders, not of rows.
+    """
+    superseded: List[Set[int]] = [set() for _ in segments]
+    for si, segment in enumerate(segments):
+        for row in segment.placeholder_rows():
+            identity = segment.identity(row)
+            column, value = ("place_id", identity[0]) if identity[0] else ("address_key", identity[1])
+            for sj in range(si, len(segments)):
+                later = segments[sj]
+                if any(
+                    (sj > si or other > row)
+                    and later.dict_value("code_source", other)[0] != PLACEHOLDER_SOURCE
+                    and later.identity(other) == identity
+                    for other in later.find(column, value)
+                ):
+                    superseded[si].add(row)
+                    break
+    return superseded
+
+
+def _tiered_run(sizes: List[int], min_segments: int) -> int:
+    """
+    Start of the newest segments to merge, or len(sizes) for none: the newest
+    run in which no segment is larger than all newer ones in the run together,
+    once it has min_segments segments. Large old segments stay out of it.
+    """
+    start = len(sizes)
+    total = 0
+    while start > 0 and (start == len(sizes) or sizes[start - 1] <= total):
+        start -= 1
+        total += sizes[start]
+    return start if len(sizes) - start >= max(2, min_segments) else len(sizes)
+
+
+@contextmanager
+def _compaction_lock(directory: str) -> Iterator[bool]:
+    """Yields whether this process may compact now (no other process is compacting the store)."""
+    if fcntl is None:
+        yield True
+        return
+    with open(os.path.join(directory, COMPACT_LOCK_NAME), "a") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class ResultStore:
+    def __init__(self, path: str, flush_rows: int = 10000, flush_interval: float = 300.0,
+                 compact_segments: int = 8):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        # Newest segments of similar total size merged after a background flush (0 = never; see _tiered_run)
+        self.compact_segments = compact_segments
+        os.makedirs(path, exist_ok=True)
+        self._buffer: List[Dict[str, Any]] = []
+        self._write_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_due = threading.Event()
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._segments: Dict[str, _Segment] = {}
+        self._segments_lock = threading.Lock()
+        # Segments replaced by a compaction; closed once no read is using them
+        self._retired: List[_Segment] = []
+        self._readers = 0
+        # Superseded placeholder rows of the last segment list seen by count_by (segments never change)
+        self._superseded: Tuple[Tuple[str, ...], List[Set[int]]] = ((), [])
+        atexit.register(self.close)
+
+    # --- Writing ---
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Buffers rows. The flush thread writes a segment once flush_rows are
+        buffered, and every flush_interval seconds.
+        """
+        if not rows:
+            return
+        with self._write_lock:
+            self._buffer.extend(rows)
+            if self._flusher is None and not self._closed.is_set():
+                self._flusher = threading.Thread(target=self._flush_loop, name="result-store-flush", daemon=True)
+                self._flusher.start()
+            if len(self._buffer) >= self.flush_rows:
+                self._flush_due.set()
+
+    def _flush_loop(self) -> None:
+        while not self._closed.is_set():
+            self._flush_due.wait(self.flush_interval)
+            self._flush_due.clear()
+            if self._closed.is_set():
+                return  # close() writes what is left
+            try:
+                self.flush()
+                if self.compact_segments and self._segment_count() >= self.compact_segments:
+                    self.compact(min_segments=self.compact_segments)
+            except Exception as e:
+                logger.error("Result store flush failed: %s", e, exc_info=True)
+
+    def supersede(self, row: Dict[str, Any]) -> None:
+        """
+        Records row in place of the placeholder row of the same business (an
+        answer that arrived later, e.g. on-demand AI). A placeholder still
+        buffered is replaced directly; one already written is left out of
+        count_by and dropped when its segment is merged, and until then lookups
+        return the newer row first.
+        """
+        identity = _identity(row)
+        with self._write_lock:
+            for n, buffered in enumerate(self._buffer):
+                if buffered.get("code_source") == PLACEHOLDER_SOURCE and _identity(buffered) == identity:
+                    self._buffer[n] = row
+                    return
+        self.append([row])
+
+    def flush(self) -> Optional[str]:
+        # Appends only wait for the buffer swap, not for the segment write
+        with self._flush_lock:
+            with self._write_lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return None
+            return _write_segment(self.path, rows)
+
+    def close(self) -> None:
+        """Stops the flush thread, writes the buffered rows and unmaps every segment."""
+        self._closed.set()
+        self._flush_due.set()
+        if self._flusher is not None:
+            self._flusher.join(timeout=30)
+        self.flush()
+        with self._segments_lock:
+            self._retire(list(self._segments.values()))
+            self._segments.clear()
+
+    def compact(self, min_segments: Optional[int] = None) -> Optional[str]:
+        """
+        Merges segments into one, leaving out superseded placeholder rows. With
+        min_segments, only the newest run of similar-sized segments, once it has
+        that many (see _tiered_run); without, every segment (offline use).
+        Segments added meanwhile are kept. Returns None when there was nothing
+        to merge or another process is compacting.
+        """
+        with _compaction_lock(self.path) as locked:
+            if not locked:
+                return None
+            with self._reading() as segments:
+                if min_segments is not None:
+                    segments = segments[_tiered_run([segment.rows for segment in segments], min_segments):]
+                if len(segments) < 2:
+                    return None
+                # Sorts where the newest merged segment was, before segments written since
+                merged = _merge_segments(self.path, segments, _superseded(segments),
+                                         _segment_time(os.path.basename(segments[-1].path)))
+                with self._segments_lock:
+                    for segment in segments:
+                        shutil.rmtree(segment.path, ignore_errors=True)
+                        self._segments.pop(os.path.basename(segment.path), None)
+                    self._retire(segments)
+            return merged
+
+    # --- Reading ---
+
+    def _retire(self, segments: List[_Segment]) -> None:
+        """Closes segments no longer listed, now or after the last running read. Caller holds _segments_lock."""
+        self._retired.extend(segments)
+        if not self._readers:
+            for segment in self._retired:
+                segment.close()
+            self._retired.clear()
+
+    @contextmanager
+    def _reading(self) -> Iterator[List[_Segment]]:
+        """Current segments, kept open (even if compacted away meanwhile) until the block exits."""
+        with self._segments_lock:
+            self._readers += 1
+        try:
+            yield self._open_segments()
+        finally:
+            with self._segments_lock:
+                self._readers -= 1
+                self._retire([])
+
+    def _segment_names(self) -> List[str]:
+        return sorted(n for n in os.listdir(self.path) if n.startswith("seg-"))
+
+    def _segment_count(self) -> int:
+        return len(self._segment_names())
+
+    def _open_segments(self) -> List[_Segment]:
+        """Sealed segments, oldest first; newly appeared ones are opened, removed ones retired."""
+        names = self._segment_names()
+        with self._segments_lock:
+            self._retire([self._segments.pop(gone) for gone in set(self._segments) - set(names)])
+            for name in names:
+                if name not in self._segments:
+                    try:
+                        self._segments[name] = _Segment(os.path.join(self.path, name))
+                    except FileNotFoundError:
+                        pass  # Compacted away by another process since the listing
+            return [self._segments[name] for name in names if name in self._segments]
+
+    def _superseded_rows(self, segments: List[_Segment]) -> List[Set[int]]:
+        names = tuple(os.path.basename(segment.path) for segment in segments)
+        cached_names, superseded = self._superseded
+        if cached_names != names:
+            superseded = _superseded(segments)
+            self._superseded = (names, superseded)
+        return superseded
+
+    def __len__(self) -> int:
+        with self._reading() as segments:
+            return sum(segment.rows for segment in segments)
+
+    def count_by(self, level: str) -> List[Dict[str, Any]]:
+        """
+        Row counts per code / division / subdivision / group, largest first.
+        Placeholder rows answered by a later row are not counted.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"level must be one of {', '.join(LEVELS)}")
+        totals: Counter = Counter()
+        titles: Dict[str, str] = {}
+        with self._reading() as segments:
+            for segment, superseded in zip(segments, self._superseded_rows(segments)):
+                dictionary = segment.dictionaries[level]
+                codes = segment.codes(level)
+                counts = Counter(codes)
+                counts.subtract(codes[row] for row in superseded)
+                for position, count in counts.items():
+                    if count:
+                        value, title = dictionary[position]
+                        totals[value] += count
+                        titles.setdefault(value, title)
+        return [{level: value, "title": titles[value], "count": count} for value, count in totals.most_common()]
+
+    def lookup(self, place_id: Optional[str] = None, address_key: Optional[str] = None,
+               limit: int = 100) -> List[Dict[str, Any]]:
+        """Rows for a place id or canonical address key, newest first."""
+        column, value = ("place_id", place_id) if place_id else ("address_key", address_key)
+        if not value:
+            return []
+        found: List[Dict[str, Any]] = []
+        with self._reading() as segments:
+            for segment in reversed(segments):
+                for row in reversed(segment.find(column, value)):
+                    found.append(segment.row(row))
+                    if len(found) >= limit:
+                        return found
+        return found
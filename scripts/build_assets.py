@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Builds precompiled, fingerprinted static assets.
+
+Compiles every static/src/css/*.css with the Tailwind CLI (only the utility
+classes used in templates/ and static/src/js/ are emitted, minified) and
+minifies every static/src/js/*.js. Each output is written to static/dist/
+under a content-hashed name (css/index.3f9c2a61d0.css), with .gz (and .br
+when the brotli package is installed) copies next to it, and
+static/dist/manifest.json maps source to built names. The app serves these
+with immutable caching once the manifest exists (see static_assets.py).
+
+The Tailwind CLI is taken from --tailwind, $TAILWIND_CLI, a `tailwindcss`
+standalone binary on PATH, or `npx tailwindcss@3` (which needs Node.js).
+
+Usage:
+    python scripts/build_assets.py [--tailwind "npx --yes tailwindcss@3.4.17"]
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+from typing import Callable, Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # Optional dependency; .gz copies only
+    brotli = None
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SRC_DIR = os.path.join(REPO_ROOT, "static", "src")
+DIST_DIR = os.path.join(REPO_ROOT, "static", "dist")
+TAILWIND_CONFIG = os.path.join(REPO_ROOT, "tailwind.config.js")
+NPX_TAILWIND = "npx --yes tailwindcss@3.4.17"
+
+# After these characters (or keywords) a "/" starts a regular expression, not a division
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                   "void", "throw", "instanceof", "yield", "await"}
+# A line break after these can be dropped without changing automatic semicolon insertion
+_BREAK_DROPPABLE = set("{;,([")
+_WORD = re.compile(r"[A-Za-z0-9_$]")
+
+
+def _is_word(ch: str) -> bool:
+    return bool(ch) and bool(_WORD.match(ch))
+
+
+def minify_js(source: str) -> str:
+    """
+    Conservative JS minifier: drops comments, indentation and blank lines and
+    collapses whitespace, copying strings, template literals and regular
+    expressions verbatim. Line breaks are kept wherever automatic semicolon
+    insertion could depend on them.
+    """
+    out: List[str] = []
+    i, n = 0, len(source)
+    pending_space = pending_break = False
+
+    def last_significant() -> str:
+        for chunk in reversed(out):
+            stripped = chunk.rstrip()
+            if stripped:
+                return stripped[-1]
+        return ""
+
+    def last_word() -> str:
+        text = "".join(out[-3:])
+        match = re.search(r"([A-Za-z_$][A-Za-z0-9_$]*)\s*$", text)
+        return match.group(1) if match else ""
+
+    def emit(token: str) -> None:
+        nonlocal pending_space, pending_break
+        prev = last_significant()
+        if out:
+            if pending_break and prev not in _BREAK_DROPPABLE:
+                out.append("\n")
+            elif (pending_space or pending_break) and (
+                (_is_word(prev) and _is_word(token[0])) or (prev in "+-" and token[0] == prev)
+            ):
+                out.append(" ")
+        pending_space = pending_break = False
+        out.append(token)
+
+    def read_quoted(start: int, quote: str) -> int:
+        j = start + 1
+        while j < n and source[j] != quote:
+            j += 2 if source[j] == "\\" else 1
+        return j + 1
+
+    def read_template(start: int) -> int:
+        j = start + 1
+        while j < n and source[j] != "`":
+            if source[j] == "\\":
+                j += 2
+            elif source.startswith("${", j):
+                j = read_braced(j + 2)
+            else:
+                j += 1
+        return j + 1
+
+    def read_braced(start: int) -> int:
+        # Expression inside ${...}: skip nested strings/templates until the closing brace
+        depth, j = 1, start
+        while j < n and depth:
+            ch = source[j]
+            if ch in "'\"":
+                j = read_quoted(j, ch)
+                continue
+            if ch == "`":
+                j = read_template(j)
+                continue
+            depth += 1 if ch == "{" else -1 if ch == "}" else 0
+            j += 1
+        return j
+
+    def read_regex(start: int) -> int:
+        j, in_class = start + 1, False
+        while j < n:
+            ch = source[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "[":
+                in_class = True
+            elif ch == "]":
+                in_class = False
+            elif ch == "/" and not in_class:
+                return j + 1
+            elif ch == "\n":
+                break
+            j += 1
+        return j
+
+    while i < n:
+        ch = source[i]
+        if ch in " \t\r\n":
+            if ch == "\n":
+                pending_break = True
+            else:
+                pending_space = True
+            i += 1
+        elif source.startswith("//", i):
+            end = source.find("\n", i)
+            i = n if end < 0 else end
+        elif source.startswith("/*", i):
+            end = source.find("*/", i + 2)
+            comment = source[i:n if end < 0 else end + 2]
+            pending_break = pending_break or "\n" in comment
+            pending_space = True
+            i = n if end < 0 else end + 2
+        elif ch in "'\"":
+            end = read_quoted(i, ch)
+            emit(source[i:end])
+            i = end
+        elif ch == "`":
+            end = read_template(i)
+            emit(source[i:end])
+            i = end
+        elif ch == "/" and (last_significant() in _REGEX_PRECEDERS or not out or last_word() in _REGEX_KEYWORDS):
+            end = read_regex(i)
+            emit(source[i:end])
+            i = end
+        else:
+            j = i + 1
+            if _is_word(ch):
+                while j < n and _is_word(source[j]):
+                    j += 1
+            emit(source[i:j])
+            i = j
+    return "".join(out).strip() + "\n"
+
+
+def fingerprinted_name(name: str, data: bytes) -> str:
+    """css/index.css -> css/index.<first 10 hex of sha256>.css"""
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def tailwind_command(explicit: Optional[str] = None) -> List[str]:
+    command = explicit or os.getenv("TAILWIND_CLI") or ("tailwindcss" if shutil.which("tailwindcss") else NPX_TAILWIND)
+    return shlex.split(command)
+
+
+def tailwind_compiler(command: List[str]) -> Callable[[str], bytes]:
+    def compile_css(path: str) -> bytes:
+        result = subprocess.run(
+            command + ["-c", TAILWIND_CONFIG, "-i", path, "--minify"],
+            cwd=REPO_ROOT, capture_output=True, check=False,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Tailwind failed on {path}: {result.stderr.decode(errors='replace').strip()}")
+        return result.stdout
+    return compile_css
+
+
+def write_asset(dist_dir: str, name: str, data: bytes) -> str:
+    built = fingerprinted_name(name, data)
+    path = os.path.join(dist_dir, built)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+    return built
+
+
+def build(compile_css: Callable[[str], bytes], src_dir: str = SRC_DIR, dist_dir: str = DIST_DIR) -> Dict[str, str]:
+    """Rebuilds dist_dir from src_dir; the manifest is written last. Returns the manifest."""
+    sources = []
+    for kind in ("css", "js"):
+        folder = os.path.join(src_dir, kind)
+        if os.path.isdir(folder):
+            sources += [f"{kind}/{name}" for name in sorted(os.listdir(folder)) if name.endswith(f".{kind}")]
+
+    outputs = {}
+    for name in sources:
+        path = os.path.join(src_dir, name)
+        if name.startswith("css/"):
+            outputs[name] = compile_css(path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                outputs[name] = minify_js(f.read()).encode("utf-8")
+
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+    manifest = {name: write_asset(dist_dir, name, data) for name, data in outputs.items()}
+    with open(os.path.join(dist_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build fingerprinted CSS/JS into static/dist.")
+    parser.add_argument("--tailwind", help=f"Tailwind CLI command (default: $TAILWIND_CLI, tailwindcss or {NPX_TAILWIND})")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = build(tailwind_compiler(tailwind_command(args.tailwind)))
+    except (OSError, RuntimeError) as e:
+        print(f"Asset build failed: {e}", file=sys.stderr)
+        return 1
+    for name, built in manifest.items():
+        size = os.path.getsize(os.path.join(DIST_DIR, built))
+        print(f"{name} -> {built} ({size} bytes)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
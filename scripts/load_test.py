@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Load generator for the identify API.
+
+Drives an endpoint at increasing concurrency, one stage per level, and
+reports throughput, latency percentiles and error rate per stage. Only
+200s and the app's "No business found" 400s count as answers; other 400s are
+upstream failures the app passed on, counted and listed by error message. The
+saturation point is the first level where throughput grows by less than
+--min-gain over the previous level; past it, extra concurrency only queues.
+
+With --spawn, it starts the upstream simulator (upstream_simulator.py) and
+app.py under gunicorn pointed at it, so the full code path is measured
+without upstream cost; otherwise it targets --target as is.
+
+Usage:
+    python scripts/load_test.py --spawn [--workers 4] [--threads 8] [--stages 1,2,4,8,16,32]
+        [--duration 20] [--repeat-ratio 0.3] [--ai-latency-ms 1500] [--json report.json]
+    python scripts/load_test.py --target http://127.0.0.1:5000 [--endpoint /api/identify]
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+import requests
+
+import upstream_simulator
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+STREETS = ["George St", "Pitt St", "King St", "Elizabeth St", "Collins St", "Queen St", "Hunter St",
+           "Bourke St", "Flinders St", "Oxford St", "Crown St", "Park Rd", "Victoria Rd", "Church St"]
+SUBURBS = ["Sydney NSW 2000", "Melbourne VIC 3000", "Brisbane QLD 4000", "Parramatta NSW 2150",
+           "Newtown NSW 2042", "Fitzroy VIC 3065", "Perth WA 6000", "Adelaide SA 5000"]
+
+# 400s that are a valid answer rather than a failure (see BusinessAnzsicLocator.iter_business_details)
+EXPECTED_400_ERRORS = ("No business found",)
+# Distinct failure messages listed per stage
+MAX_REPORTED_FAILURES = 5
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+def classify_response(status_code: int, body: Any) -> Optional[str]:
+    """None for an answer, otherwise the failure: "upstream: <error>" for a 400 the app passed on, or "<status> <error>"."""
+    if status_code == 200:
+        return None
+    message = body.get("error") if isinstance(body, dict) else None
+    message = str(message)[:120] if message else ""
+    if status_code == 400:
+        if message.startswith(EXPECTED_400_ERRORS):
+            return None
+        return f"upstream: {message}"
+    return f"{status_code} {message}".strip()
+
+
+def summarize(concurrency: int, elapsed: float, latencies: List[float], failures: Sequence[str] = ()) -> Dict[str, Any]:
+    total = len(latencies) + len(failures)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(len(failures) / total, 4) if total else 0.0,
+        "upstream_errors": sum(1 for f in failures if f.startswith("upstream: ")),
+        "top_failures": Counter(failures).most_common(MAX_REPORTED_FAILURES),
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def find_saturation(stages: List[Dict[str, Any]], min_gain: float = 0.1) -> Optional[int]:
+    """Concurrency of the first stage whose throughput grew by less than min_gain over the previous one."""
+    for previous, stage in zip(stages, stages[1:]):
+        if stage["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return stage["concurrency"]
+    return None
+
+
+class AddressPool:
+    """Random Australian-looking addresses; repeat_ratio of requests reuse an earlier one (cache hits)."""
+
+    def __init__(self, repeat_ratio: float, seed: Optional[int] = None):
+        self.repeat_ratio = repeat_ratio
+        self._random = random.Random(seed)
+        self._seen: List[str] = []
+        self._lock = threading.Lock()
+
+    def next(self) -> str:
+        with self._lock:
+            if self._seen and self._random.random() < self.repeat_ratio:
+                return self._random.choice(self._seen)
+            address = f"{self._random.randint(1, 999)} {self._random.choice(STREETS)}, {self._random.choice(SUBURBS)}"
+            self._seen.append(address)
+            return address
+
+
+def run_stage(url: str, concurrency: int, duration: float, addresses: AddressPool, timeout: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failures: List[str] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client():
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                response = session.post(url, json={"address": addresses.next()}, timeout=timeout)
+                try:
+                    body = response.json()
+                except ValueError:
+                    body = None
+                failure = classify_response(response.status_code, body)
+            except requests.RequestException as e:
+                failure = type(e).__name__
+            elapsed = time.monotonic() - started
+            with lock:
+                if failure is None:
+                    latencies.append(elapsed)
+                else:
+                    failures.append(failure)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return summarize(concurrency, time.monotonic() - started, latencies, failures)
+
+
+def wait_until_up(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            requests.get(base_url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service at {base_url} did not come up within {timeout}s")
+
+
+def spawn_service(args, sim_server) -> subprocess.Popen:
+    env = dict(os.environ, **upstream_simulator.service_env(sim_server), RATELIMIT_ENABLED="false")
+    command = [
+        "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{args.port}",
+        "--workers", str(args.workers),
+        "--threads", str(args.threads),
+        "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=REPO_ROOT, env=env)
+
+
+def print_report(stages: List[Dict[str, Any]], saturation: Optional[int]) -> None:
+    print(f"{'conc':>5} {'reqs':>7} {'rps':>8} {'err%':>6} {'upstr':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for s in stages:
+        print(f"{s['concurrency']:>5} {s['requests']:>7} {s['throughput_rps']:>8} {s['error_rate'] * 100:>6.2f} "
+              f"{s['upstream_errors']:>6} {s['p50_ms'] or '-':>8} {s['p95_ms'] or '-':>8} {s['p99_ms'] or '-':>8}")
+    for s in stages:
+        for failure, count in s["top_failures"]:
+            print(f"  concurrency {s['concurrency']}: {count} x {failure}")
+    if saturation:
+        print(f"Saturation at concurrency {saturation} (throughput stopped growing)")
+    else:
+        print("No saturation within the tested concurrency levels")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the identify API.")
+    parser.add_argument("--target", default=None, help="Base URL of a running service")
+    parser.add_argument("--spawn", action="store_true", help="Start the simulator and gunicorn locally")
+    parser.add_argument("--endpoint", default="/api/identify")
+    parser.add_argument("--stages", default="1,2,4,8,16,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds per stage")
+    parser.add_argument("--repeat-ratio", type=float, default=0.3, help="Share of requests repeating an address")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Throughput gain below which a stage saturates")
+    parser.add_argument("--json", dest="json_path", help="Also write the report to this file")
+    parser.add_argument("--seed", type=int, default=None)
+    spawn = parser.add_argument_group("with --spawn")
+    spawn.add_argument("--port", type=int, default=5055)
+    spawn.add_argument("--workers", type=int, default=4, help="gunicorn worker processes")
+    spawn.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    spawn.add_argument("--places-latency-ms", type=float, default=120)
+    spawn.add_argument("--ai-latency-ms", type=float, default=1500)
+    spawn.add_argument("--latency-sigma", type=float, default=0.5)
+    spawn.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    if not args.spawn and not args.target:
+        parser.error("either --spawn or --target is required")
+
+    sim_server = service = None
+    try:
+        if args.spawn:
+            sim = upstream_simulator.Simulation(args.places_latency_ms, args.ai_latency_ms, args.latency_sigma,
+                                                args.error_rate, seed=args.seed)
+            sim_server = upstream_simulator.start_simulator(sim)
+            service = spawn_service(args, sim_server)
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_until_up(base_url)
+        else:
+            base_url = args.target.rstrip("/")
+
+        url = base_url + args.endpoint
+        addresses = AddressPool(args.repeat_ratio, args.seed)
+        stages = []
+        for concurrency in [int(c) for c in args.stages.split(",") if c.strip()]:
+            stage = run_stage(url, concurrency, args.duration, addresses, args.timeout)
+            stages.append(stage)
+            print(f"concurrency {concurrency}: {stage['throughput_rps']} req/s, p99 {stage['p99_ms']} ms", flush=True)
+
+        saturation = find_saturation(stages, args.min_gain)
+        print()
+        print_report(stages, saturation)
+        if args.json_path:
+            report = {"target": url, "stages": stages, "saturation_concurrency": saturation}
+            if args.spawn:
+                report["upstream_requests"] = sim.requests
+            with open(args.json_path, "w") as f:
+                json.dump(report, f, indent=2)
+        return 0
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait(timeout=10)
+        if sim_server is not None:
+            sim_server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
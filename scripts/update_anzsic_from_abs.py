@@ -3,30 +3,100 @@
 Fetches the official ANZSIC 2006 classification from the ABS Data API
 and regenerates data/anzsic_codes.json with full hierarchy information.
 
+The refresh is incremental:
+  - The request is conditional (If-None-Match / If-Modified-Since), using the
+    validators saved from the previous run, so an unchanged codelist is a 304.
+  - The new classes are diffed against the current file (added, removed,
+    retitled). Nothing is written when there is no difference.
+  - Files are replaced atomically, then "version" in data/anzsic_codes.meta.json
+    is bumped. Running servers watch that version and hot-reload.
+
 ABS Data API: https://data.api.abs.gov.au
 Codelist: CL_ANZSIC_2006
 
 Usage:
-    python scripts/update_anzsic_from_abs.py
+    python scripts/update_anzsic_from_abs.py [--url URL] [--output PATH] [--force]
 """
 
+import argparse
 import json
 import os
 import sys
+import tempfile
 import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from typing import Optional, Tuple
 import requests
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from anzsic_data import meta_path_for  # noqa: E402
+
 ABS_API_URL = "https://data.api.abs.gov.au/rest/codelist/ABS/CL_ANZSIC_2006"
 OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "anzsic_codes.json")
 
 
-def fetch_codelist() -> str:
-    """Fetch the ANZSIC 2006 codelist XML from the ABS API."""
-    print(f"Fetching codelist from {ABS_API_URL} ...")
-    resp = requests.get(ABS_API_URL, timeout=30)
+def load_json(path: str, default):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def write_json_atomic(path: str, data) -> None:
+    """Write to a temp file in the same directory, then rename over the target."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def fetch_codelist(url: str = ABS_API_URL, meta: Optional[dict] = None) -> Tuple[Optional[str], dict]:
+    """
+    Fetch the ANZSIC 2006 codelist XML from the ABS API.
+    Returns (xml_text, validators); xml_text is None when the server answered 304.
+    """
+    meta = meta or {}
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    print(f"Fetching codelist from {url} ...")
+    resp = requests.get(url, headers=headers, timeout=30)
+    if resp.status_code == 304:
+        print("  Not modified since last update")
+        return None, {}
     resp.raise_for_status()
     print(f"  Received {len(resp.text):,} bytes")
-    return resp.text
+    validators = {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+    }
+    return resp.text, validators
+
+
+def diff_entries(old: list, new: list) -> dict:
+    """Codes added, removed and retitled between two enriched entry lists."""
+    old_titles = {e["code"]: e["title"] for e in old}
+    new_titles = {e["code"]: e["title"] for e in new}
+    return {
+        "added": sorted(new_titles.keys() - old_titles.keys()),
+        "removed": sorted(old_titles.keys() - new_titles.keys()),
+        "retitled": sorted(
+            code for code in old_titles.keys() & new_titles.keys()
+            if old_titles[code] != new_titles[code]
+        ),
+    }
 
 
 def parse_codes(xml_text: str) -> list:
@@ -131,8 +201,21 @@ def _build_subdivision_division_map(divisions: dict, all_codes: list) -> dict:
     return mapping
 
 
-def main():
-    xml_text = fetch_codelist()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh data/anzsic_codes.json from the ABS Data API.")
+    parser.add_argument("--url", default=ABS_API_URL, help="Codelist URL (e.g. a local fixture server)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Path of the anzsic_codes.json to update")
+    parser.add_argument("--force", action="store_true", help="Ignore saved validators and always download")
+    args = parser.parse_args(argv)
+
+    output = os.path.normpath(args.output)
+    meta_path = meta_path_for(output)
+    meta = load_json(meta_path, {})
+
+    xml_text, validators = fetch_codelist(args.url, {} if args.force else meta)
+    if xml_text is None:
+        return 0
+
     all_codes = parse_codes(xml_text)
 
     # Stats
@@ -154,12 +237,30 @@ def main():
         for m in missing_div[:5]:
             print(f"    {m['code']}: {m['title']}")
 
-    # Write output
-    output = os.path.normpath(OUTPUT_PATH)
-    with open(output, "w") as f:
-        json.dump(enriched, f, indent=4, ensure_ascii=False)
-
-    print(f"\nWrote {len(enriched)} entries to {output}")
+    # Diff against the current file
+    current = load_json(output, [])
+    diff = diff_entries(current, enriched)
+    print(f"  Diff: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+          f"{len(diff['retitled'])} retitled")
+
+    meta.update({k: v for k, v in validators.items() if v})
+    meta["source"] = args.url
+    meta["checked_at"] = datetime.now(timezone.utc).isoformat()
+
+    if current == enriched:
+        # Content unchanged - keep the version, just remember the new validators
+        write_json_atomic(meta_path, meta)
+        print("\nNo changes; data version unchanged")
+        return 0
+
+    # Write output, then bump the version so servers only see complete data
+    write_json_atomic(output, enriched)
+    meta["version"] = int(meta.get("version", 0)) + 1
+    meta["updated_at"] = meta["checked_at"]
+    meta["last_diff"] = diff
+    write_json_atomic(meta_path, meta)
+
+    print(f"\nWrote {len(enriched)} entries to {output} (data version {meta['version']})")
     return 0
 
 
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Places API (New) and Gemini generateContent.
+
+Serves POST .../places:searchText, .../places:searchNearby and
+.../models/<model>:generateContent with realistic payloads, so the whole
+classification path (text search, nearby search, deterministic tiers,
+shortlisted AI prompts, hedging) runs without upstream cost. Latency is drawn
+from a log-normal distribution per endpoint and a configurable share of
+requests fail with 503, so load tests see tail latency and error handling.
+
+Places are generated deterministically from the query (same address, same
+business), with a mix of directly mapped types, types only the keyword tier
+or the AI tier can place, and generic addresses that trigger nearby search.
+
+Usage:
+    python scripts/upstream_simulator.py [--port 8081] [--places-latency-ms 120]
+        [--ai-latency-ms 1500] [--latency-sigma 0.5] [--error-rate 0.01]
+
+Point the service at it with:
+    PLACES_API_BASE_URL=http://127.0.0.1:8081/v1
+    AI_BACKENDS=http://127.0.0.1:8081/v1beta/models/sim:generateContent
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+# (name template, primaryType, types); the share of each kind roughly follows real traffic
+BUSINESS_TEMPLATES = [
+    ("{word} Cafe", "cafe", ["cafe", "restaurant", "food", "point_of_interest", "establishment"]),
+    ("{word} Kitchen", "restaurant", ["restaurant", "food", "point_of_interest", "establishment"]),
+    ("{word} Fitness", "gym", ["gym", "health", "point_of_interest", "establishment"]),
+    ("{word} Pharmacy", "pharmacy", ["pharmacy", "health", "store", "point_of_interest", "establishment"]),
+    ("{word} Dental", "dentist", ["dentist", "health", "point_of_interest", "establishment"]),
+    ("{word} Plumbing", "plumber", ["plumber", "point_of_interest", "establishment"]),
+    ("{word} Software", "corporate_office", ["corporate_office", "point_of_interest", "establishment"]),
+    ("{word} Holdings", "corporate_office", ["corporate_office", "point_of_interest", "establishment"]),
+    ("{word} Legal", "lawyer", ["lawyer", "point_of_interest", "establishment"]),
+    ("{word} Bakery", "bakery", ["bakery", "food", "store", "point_of_interest", "establishment"]),
+]
+GENERIC_TYPES = ["street_address", "premise", "subpremise"]
+WORDS = ["Harbour", "Parkside", "Summit", "Wattle", "Coastal", "Granite", "Southern", "Bluegum",
+         "Redfern", "Ironbark", "Banksia", "Meridian", "Kestrel", "Lakeside", "Acacia", "Northgate"]
+
+ITEM_PATTERN = re.compile(r"^(\d+)\. .*$")
+OPTIONS_PATTERN = re.compile(r"^\s+Options: (.*)$")
+FALLBACK_CODES = ["6931", "5420", "6932", "Unknown"]
+
+
+class Simulation:
+    """Latency, error and payload settings shared by all handler threads."""
+
+    def __init__(self, places_latency_ms: float = 120, ai_latency_ms: float = 1500,
+                 latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 generic_ratio: float = 0.3, seed: Optional[int] = None):
+        self.places_latency_ms = places_latency_ms
+        self.ai_latency_ms = ai_latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.generic_ratio = generic_ratio
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = {"searchText": 0, "searchNearby": 0, "generateContent": 0, "errors": 0}
+
+    def delay(self, median_ms: float) -> float:
+        """Seconds to wait: log-normal around median_ms (sigma 0 gives a fixed delay)."""
+        with self._lock:
+            factor = math.exp(self._random.gauss(0, self.latency_sigma)) if self.latency_sigma else 1.0
+        return median_ms * factor / 1000
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self._random.random() < self.error_rate
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.requests[key] += 1
+
+
+def _seed_for(text: str) -> int:
+    return int(hashlib.sha1(text.encode()).hexdigest()[:12], 16)
+
+
+def make_place(seed_text: str, allow_generic: bool, generic_ratio: float) -> Dict[str, Any]:
+    rng = random.Random(_seed_for(seed_text))
+    lat = -33.87 + rng.uniform(-0.05, 0.05)
+    lng = 151.21 + rng.uniform(-0.05, 0.05)
+    place = {
+        "id": f"sim-{_seed_for(seed_text):x}",
+        "formattedAddress": seed_text,
+        "location": {"latitude": round(lat, 6), "longitude": round(lng, 6)},
+    }
+    if allow_generic and rng.random() < generic_ratio:
+        primary = rng.choice(GENERIC_TYPES)
+        place.update(displayName={"text": seed_text}, primaryType=primary, types=[primary])
+        return place
+    template, primary, types = rng.choice(BUSINESS_TEMPLATES)
+    place.update(displayName={"text": template.format(word=rng.choice(WORDS))}, primaryType=primary, types=list(types))
+    return place
+
+
+def answer_prompt(prompt: str, rng: random.Random) -> Dict[str, Any]:
+    """Answers an AI tier prompt: usually option 1, sometimes another option, a code or Unknown."""
+    answers: Dict[str, Any] = {}
+    current = None
+    for line in prompt.splitlines():
+        item = ITEM_PATTERN.match(line)
+        if item:
+            current = item.group(1)
+            answers[current] = rng.choice(FALLBACK_CODES)
+            continue
+        options = OPTIONS_PATTERN.match(line)
+        if options and current:
+            count = len(options.group(1).split("; "))
+            answers[current] = 1 if rng.random() < 0.8 else rng.randint(0, count)
+    return answers
+
+
+def make_handler(sim: Simulation):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return self._send(400, {"error": {"message": "Invalid JSON"}})
+
+            path = self.path.split("?", 1)[0]
+            if path.endswith("/places:searchText"):
+                sim.count("searchText")
+                time.sleep(sim.delay(sim.places_latency_ms))
+                if sim.should_fail():
+                    return self._fail()
+                query = str(payload.get("textQuery", ""))
+                return self._send(200, {"places": [make_place(query, True, sim.generic_ratio)]})
+
+            if path.endswith("/places:searchNearby"):
+                sim.count("searchNearby")
+                time.sleep(sim.delay(sim.places_latency_ms))
+                if sim.should_fail():
+                    return self._fail()
+                circle = payload.get("locationRestriction", {}).get("circle", {})
+                center = circle.get("center", {})
+                origin = f"{center.get('latitude')},{center.get('longitude')}"
+                radius = float(circle.get("radius", 50))
+                count = int(payload.get("maxResultCount", 5))
+                # Wider searches find more businesses, like a real street
+                found = min(count, max(1, int(radius / 25)))
+                places = [make_place(f"{n} near {origin}", False, 0) for n in range(found)]
+                return self._send(200, {"places": places})
+
+            if path.endswith(":generateContent"):
+                sim.count("generateContent")
+                time.sleep(sim.delay(sim.ai_latency_ms))
+                if sim.should_fail():
+                    return self._fail()
+                prompt = payload["contents"][0]["parts"][0]["text"]
+                answers = answer_prompt(prompt, random.Random(_seed_for(prompt)))
+                return self._send(200, {"candidates": [{"content": {"parts": [{"text": json.dumps(answers)}]}}]})
+
+            return self._send(404, {"error": {"message": f"Unknown endpoint {path}"}})
+
+        def _fail(self):
+            sim.count("errors")
+            self._send(503, {"error": {"code": 503, "message": "Simulated upstream failure", "status": "UNAVAILABLE"}})
+
+        def _send(self, status: int, data: Dict[str, Any]):
+            out = json.dumps(data).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_simulator(sim: Simulation, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Starts the simulator on a background thread; port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), make_handler(sim))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def service_env(server: ThreadingHTTPServer) -> Dict[str, str]:
+    """Environment that points the service (config.locator_from_env) at this simulator."""
+    base = f"http://{server.server_address[0]}:{server.server_port}"
+    return {
+        "GOOGLE_API_KEY": "simulated",
+        "GEMINI_API_KEY": "simulated",
+        "PLACES_API_BASE_URL": f"{base}/v1",
+        "AI_BACKENDS": f"{base}/v1beta/models/sim-primary:generateContent,{base}/v1beta/models/sim-secondary:generateContent",
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulated Places and Gemini upstream for load tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--places-latency-ms", type=float, default=120, help="Median Places latency")
+    parser.add_argument("--ai-latency-ms", type=float, default=1500, help="Median generateContent latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Log-normal sigma (0 = fixed latency)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--generic-ratio", type=float, default=0.3, help="Share of addresses that need nearby search")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    sim = Simulation(args.places_latency_ms, args.ai_latency_ms, args.latency_sigma,
+                     args.error_rate, args.generic_ratio, args.seed)
+    server = start_simulator(sim, args.host, args.port)
+    print(f"Upstream simulator listening on http://{args.host}:{server.server_port}")
+    for key, value in service_env(server).items():
+        print(f"  {key}={value}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Local shortlist of plausible ANZSIC classes for a business.
+
+Scores every class by word overlap between the business name/type and the
+class, group and subdivision titles, using an inverted index built once per
+code table. The AI tier sends only these options to Gemini, so prompts and
+answers stay short and the model cannot return a code that does not exist.
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from models import AnzsicClass
+
+STOPWORDS = {
+    "and", "or", "the", "of", "for", "services", "service", "retailing", "manufacturing",
+    "other", "not", "elsewhere", "classified", "goods", "shop", "store", "centre", "center",
+    "except", "n.e.c", "nec", "operation", "point", "interest", "establishment", "pty", "ltd",
+}
+
+# Hierarchy level weights: a hit on the class title counts most
+TITLE_WEIGHT = 3.0
+GROUP_WEIGHT = 2.0
+SUBDIVISION_WEIGHT = 1.0
+
+_SUFFIXES = ("ing", "ers", "er", "ies", "s")
+
+
+def _stem(word: str) -> str:
+    """Crude suffix stripping so plumber/plumbing and bakery/bakeries meet."""
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 4:
+            return word[:-len(suffix)]
+    return word
+
+
+def keywords(text: str) -> Set[str]:
+    words = re.split(r"[^a-z]+", (text or "").lower())
+    return {_stem(w) for w in words if len(w) > 2 and w not in STOPWORDS}
+
+
+class ShortlistIndex:
+    def __init__(self, codes: List[AnzsicClass]):
+        self.codes = codes
+        # keyword -> { class position: weight }
+        self._index: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for pos, c in enumerate(codes):
+            for text, weight in ((c.subdivision_title, SUBDIVISION_WEIGHT),
+                                 (c.group_title, GROUP_WEIGHT),
+                                 (c.title, TITLE_WEIGHT)):
+                for word in keywords(text):
+                    postings = self._index[word]
+                    postings[pos] = max(postings.get(pos, 0.0), weight)
+
+    def shortlist(self, name: str, place_type: str, size: int = 8) -> List[AnzsicClass]:
+        """Best-scoring classes for the business, most plausible first; empty if nothing overlaps."""
+        scores: Dict[int, float] = defaultdict(float)
+        for word in keywords(name) | keywords(place_type.replace("_", " ")):
+            for pos, weight in self._index.get(word, {}).items():
+                scores[pos] += weight
+        ranked = sorted(scores, key=lambda pos: (-scores[pos], self.codes[pos].code))
+        return [self.codes[pos] for pos in ranked[:size]]
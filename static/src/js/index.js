@@ -0,0 +1,299 @@
+// --- APP STATE ---
+const state = {
+    currentView: 'search', // 'search', 'list', 'details'
+    searchResults: [],
+    selectedBusiness: null,
+    searchQuery: '',
+    pendingAI: new Set() // candidate tokens with an AI request in flight
+};
+
+// --- DOM ELEMENTS ---
+const views = {
+    search: document.getElementById('view-search'),
+    list: document.getElementById('view-list'),
+    details: document.getElementById('view-details')
+};
+const elements = {
+    searchForm: document.getElementById('searchForm'),
+    input: document.getElementById('addressInput'),
+    btnText: document.getElementById('btnText'),
+    btnSpinner: document.getElementById('btnSpinner'),
+    resultsGrid: document.getElementById('results-grid'),
+    listHeader: document.getElementById('list-header-address'),
+    errorToast: document.getElementById('errorToast'),
+    errorText: document.getElementById('errorText'),
+    // Details
+    detailName: document.getElementById('detail-name'),
+    detailType: document.getElementById('detail-type'),
+    detailAddress: document.getElementById('detail-address'),
+    detailCode: document.getElementById('detail-anzsic-code'),
+    detailTitle: document.getElementById('detail-anzsic-title'),
+    detailJson: document.getElementById('detail-json')
+};
+
+// --- EVENT LISTENERS ---
+elements.searchForm.addEventListener('submit', handleSearch);
+// Buttons declare their action in data-action (no inline handlers, so the CSP needs no 'unsafe-inline')
+document.addEventListener('click', (e) => {
+    const target = e.target.closest('[data-action]');
+    if (!target) return;
+    const action = target.dataset.action;
+    if (action === 'reset') resetApp();
+    else if (action === 'hide-error') hideError();
+    else if (action === 'navigate') navigateTo(target.dataset.view);
+});
+
+// --- NAVIGATION LOGIC ---
+function navigateTo(viewName) {
+    // Hide all views
+    Object.values(views).forEach(el => el.classList.add('hidden'));
+
+    // Show target view
+    views[viewName].classList.remove('hidden');
+    state.currentView = viewName;
+
+    // Scroll to top
+    window.scrollTo(0, 0);
+
+    // Special logic for View transitions
+    if (viewName === 'search') {
+        elements.input.focus();
+    }
+}
+
+function resetApp() {
+    elements.input.value = '';
+    state.searchResults = [];
+    state.selectedBusiness = null;
+    navigateTo('search');
+}
+
+// --- CORE FUNCTIONS ---
+
+async function handleSearch(e) {
+    e.preventDefault();
+    const address = elements.input.value.trim();
+    if (!address) return;
+
+    setLoading(true);
+    state.searchQuery = address;
+    state.searchResults = [];
+    hideError();
+
+    try {
+        const response = await fetch('/api/identify/stream', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            // AI runs on demand for the business the user opens (see requestAIClassification)
+            body: JSON.stringify({ address, ai: 'lazy' })
+        });
+
+        if (!response.ok) {
+            const data = await response.json();
+            throw new Error(data.error || 'Failed to fetch data');
+        }
+
+        // PROCESS RESULTS
+        // The backend streams newline-delimited JSON events:
+        // place -> candidate (one per business) -> ai_classification -> done
+        // The list is rendered as soon as the first candidate arrives.
+        await readEventStream(response, handleStreamEvent);
+
+    } catch (err) {
+        console.error(err);
+        showError(err.message);
+    } finally {
+        setLoading(false);
+    }
+}
+
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onEvent(JSON.parse(line));
+        }
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+function handleStreamEvent(event) {
+    if (event.event === 'error') {
+        throw new Error(event.error);
+    } else if (event.event === 'candidate') {
+        state.searchResults[event.index] = event.result;
+        renderList(state.searchResults);
+        if (state.currentView === 'search') navigateTo('list');
+    } else if (event.event === 'ai_classification') {
+        const item = state.searchResults[event.index];
+        if (!item) return;
+        item.ai_classification = event.ai_classification;
+        // Refresh the details view if the user already opened this business
+        if (state.currentView === 'details' && state.selectedBusiness === item) {
+            selectBusiness(item);
+        }
+    }
+}
+
+function renderList(items) {
+    elements.listHeader.textContent = state.searchQuery;
+    elements.resultsGrid.innerHTML = '';
+
+    items.forEach((item, index) => {
+        const card = document.createElement('div');
+        card.className = 'bg-white p-5 rounded-xl border border-gray-200 hover:border-blue-500 hover:shadow-lg transition-all cursor-pointer group flex items-center justify-between';
+        card.tabIndex = 0; // Accessible focus
+
+        card.innerHTML = `
+            <div class="flex items-start gap-4">
+                <div class="w-10 h-10 rounded-full bg-blue-50 flex items-center justify-center text-blue-600 shrink-0 group-hover:bg-blue-600 group-hover:text-white transition-colors">
+                    <span class="font-bold text-sm">${index + 1}</span>
+                </div>
+                <div>
+                    <h3 class="font-bold text-gray-900 text-lg mb-1 group-hover:text-blue-600 transition-colors">${item.source_intelligence.business_name}</h3>
+                    <div class="flex items-center gap-2">
+                        <span class="text-xs font-semibold text-gray-500 uppercase tracking-wide bg-gray-100 px-2 py-0.5 rounded">${item.source_intelligence.detected_type.replace(/_/g, ' ')}</span>
+                        <span class="text-sm text-gray-400">&bull;</span>
+                        <span class="text-sm text-gray-500 truncate max-w-[200px]">${item.source_intelligence.address}</span>
+                    </div>
+                </div>
+            </div>
+            <div class="flex items-center gap-4 text-right">
+                <div>
+                   <div class="text-xs text-gray-400 font-medium uppercase tracking-wider mb-0.5">ANZSIC</div>
+                   <div class="font-mono font-bold text-green-600 text-lg">${item.recommended_classification.code}</div>
+                </div>
+                <svg class="w-5 h-5 text-gray-300 group-hover:text-blue-600 transform group-hover:translate-x-1 transition-all" fill="none" stroke="currentColor" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 5l7 7-7 7"></path></svg>
+            </div>
+        `;
+
+        // Add click handler
+        const selectItem = () => {
+            selectBusiness(item);
+        };
+        card.onclick = selectItem;
+
+        // Add keyboard handler (Enter)
+        card.onkeydown = (e) => {
+            if (e.key === 'Enter') selectItem();
+        };
+
+        elements.resultsGrid.appendChild(card);
+    });
+}
+
+function selectBusiness(item) {
+    state.selectedBusiness = item;
+
+    // Populate Source
+    elements.detailName.textContent = item.source_intelligence.business_name;
+    elements.detailType.textContent = item.source_intelligence.detected_type.replace(/_/g, ' ');
+    elements.detailAddress.textContent = item.source_intelligence.address;
+
+    // Populate Official ANZSIC (Green)
+    elements.detailCode.textContent = item.recommended_classification.code;
+    elements.detailTitle.textContent = item.recommended_classification.title;
+
+    // Populate AI Recommendation (Blue)
+    const aiCard = document.getElementById('card-ai-prediction');
+    const aiCode = document.getElementById('detail-ai-code');
+    const aiTitle = document.getElementById('detail-ai-title');
+
+    // Logic: Show AI card if we have a result OR if the official result is Unknown (so we see the "empty" AI state)
+    const isOfficialUnknown = !item.recommended_classification.code || item.recommended_classification.code === 'Unknown';
+    const hasAIResult = !!item.ai_classification;
+
+    if (hasAIResult) {
+        aiCode.textContent = item.ai_classification.code;
+        aiTitle.textContent = item.ai_classification.title;
+        aiCard.classList.remove('hidden');
+    } else if (item.candidate_token) {
+        // Deferred: classify just this business now
+        aiCode.textContent = "...";
+        aiTitle.textContent = "Classifying...";
+        aiCard.classList.remove('hidden');
+        requestAIClassification(item);
+    } else if (isOfficialUnknown && item.ai_negative_cached) {
+        // AI could not classify this business recently; not asked again yet
+        aiCode.textContent = "---";
+        aiTitle.textContent = "No AI Classification (Recently Checked)";
+        aiCard.classList.remove('hidden');
+    } else if (isOfficialUnknown) {
+        // Official is unknown, but AI also failed (e.g. Rate Limit)
+        // Show card with "Unavailable" state
+        aiCode.textContent = "---";
+        aiTitle.textContent = "Service Unavailable (Rate Limit)";
+        aiCard.classList.remove('hidden');
+    } else {
+        // Official is known (e.g. McDonalds), so we hide AI suggestion to reduce clutter
+        aiCard.classList.add('hidden');
+    }
+
+    elements.detailJson.textContent = JSON.stringify(item, null, 2);
+
+    navigateTo('details');
+}
+
+async function requestAIClassification(item) {
+    const token = item.candidate_token;
+    if (state.pendingAI.has(token)) return;
+    state.pendingAI.add(token);
+
+    try {
+        const response = await fetch('/api/identify/ai', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ tokens: [token] })
+        });
+        const data = await response.json();
+        if (!response.ok) throw new Error(data.error || 'AI classification failed');
+
+        // Clear the token either way so the card falls back to the "unavailable" state
+        item.ai_classification = data.results[0].ai_classification || null;
+        delete item.candidate_token;
+    } catch (err) {
+        console.error(err);
+        delete item.candidate_token;
+    } finally {
+        state.pendingAI.delete(token);
+        if (state.currentView === 'details' && state.selectedBusiness === item) {
+            selectBusiness(item);
+        }
+    }
+}
+
+// --- UTILS ---
+function setLoading(isLoading) {
+    if (isLoading) {
+        elements.btnText.textContent = 'Searching...';
+        elements.btnSpinner.classList.remove('hidden');
+        elements.input.disabled = true;
+    } else {
+        elements.btnText.textContent = 'Identify';
+        elements.btnSpinner.classList.add('hidden');
+        elements.input.disabled = false;
+        elements.input.focus();
+    }
+}
+
+function showError(msg) {
+    elements.errorText.textContent = msg;
+    elements.errorToast.classList.remove('hidden');
+    setTimeout(() => {
+        elements.errorToast.classList.add('hidden');
+    }, 5000);
+}
+
+function hideError() {
+    elements.errorToast.classList.add('hidden');
+}
@@ -0,0 +1,108 @@
+"""
+Fingerprinted static assets.
+
+scripts/build_assets.py compiles static/src/ into static/dist/: Tailwind CSS
+compiled ahead of time and minified JS, each named after a hash of its content
+(index.3f9c2a61d0.css). It also writes .gz and, when brotli is installed, .br
+copies and a manifest.json that maps source names to built names. A changed
+file gets a new name, so built files can be cached by browsers "forever"
+(immutable).
+
+Templates link assets through asset_url("css/index.css"). Without a build
+(local development), it falls back to the source file and the templates use
+the Tailwind CDN runtime.
+"""
+
+import json
+import logging
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from flask import Flask, abort, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+SOURCE_DIR = "src"
+MANIFEST_NAME = "manifest.json"
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Precompressed variants written by the build, in order of preference
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+def load_manifest(static_folder: str) -> Dict[str, str]:
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.error("Could not read asset manifest %s: %s", path, e)
+        return {}
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}; codings with q=0 are left out."""
+    accepted = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted[coding] = q
+    return accepted
+
+
+def init_assets(app: Flask) -> Dict[str, str]:
+    """Registers asset_url / assets_built for templates and the immutable dist/ route. Returns the manifest."""
+    manifest = load_manifest(app.static_folder)
+    if manifest:
+        logger.info("Serving %s precompiled assets from %s/%s", len(manifest), app.static_folder, DIST_DIR)
+
+    def asset_url(name: str) -> str:
+        built = manifest.get(name)
+        if built:
+            return url_for("static_dist", filename=built)
+        return url_for("static", filename=f"{SOURCE_DIR}/{name}")
+
+    @app.context_processor
+    def asset_helpers():
+        return {"asset_url": asset_url, "assets_built": bool(manifest)}
+
+    dist_folder = os.path.join(app.static_folder, DIST_DIR)
+
+    @app.route(f"{app.static_url_path}/{DIST_DIR}/<path:filename>", endpoint="static_dist")
+    def static_dist(filename):
+        """Built assets: precompressed variant when the client accepts it, cached as immutable."""
+        if filename == MANIFEST_NAME or filename.endswith((".gz", ".br")):
+            abort(404)
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+        encoding = None
+        served = filename
+        for coding, suffix in PRECOMPRESSED:
+            if coding in accepted and os.path.isfile(os.path.join(dist_folder, filename + suffix)):
+                encoding, served = coding, filename + suffix
+                break
+
+        response = send_from_directory(dist_folder, served, max_age=31536000)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            # Type of the original file, not of the .gz/.br wrapper
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add("Accept-Encoding")
+        return response
+
+    return manifest
@@ -0,0 +1,179 @@
+"""
+Queue-based, structured logging.
+
+A log call on a request thread only builds the LogRecord, stamps it with the
+current request id and puts it on a queue. A QueueListener thread merges the
+%-style arguments into the message, renders one JSON object per line and does
+the write, so neither formatting nor I/O happen on the request path. Because
+arguments are merged later, pass values that will not be mutated afterwards.
+
+Request ids live in a context variable: app.py sets one per request (from an
+X-Request-ID header or a fresh one), and the thread pools already run work in
+a copy of the caller's context, so records from worker threads carry it too.
+
+Records below WARNING can be sampled. The decision is made per request id, so
+a sampled request keeps its full trail and an unsampled one logs only its
+warnings and errors.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from typing import Iterator, Optional, TextIO
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def request_id_from_header(value: Optional[str]) -> str:
+    """The caller's X-Request-ID when it is a plausible id, otherwise a new one."""
+    if value and REQUEST_ID_PATTERN.match(value):
+        return value
+    return new_request_id()
+
+
+@contextmanager
+def request_context(request_id: str) -> Iterator[str]:
+    """Runs the block with request_id as the current request id."""
+    token = request_id_var.set(request_id)
+    try:
+        yield request_id
+    finally:
+        request_id_var.reset(token)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps the current request id on each record (on the logging thread, before it is queued)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` share of records at or below max_level; higher levels always pass."""
+
+    def __init__(self, rate: float = 1.0, max_level: int = logging.INFO):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate >= 1:
+            return True
+        if self.rate <= 0:
+            return False
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            # Same decision for every record of a request
+            return zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        return random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records unformatted. The stock QueueHandler merges the message
+    on the calling thread; here only tracebacks are rendered up front (errors
+    are rare, and the text lets the frames be released).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, message, request_id, extra fields, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(
+    level: str = "INFO",
+    fmt: str = "json",
+    sample_rate: float = 1.0,
+    stream: Optional[TextIO] = None,
+) -> logging.handlers.QueueListener:
+    """
+    Routes the root logger through the queue to a stream handler (stderr by
+    default; Vercel has a read-only filesystem). fmt is "json" or "text".
+    Calling it again replaces the previous setup.
+    """
+    global _listener
+    _stop_listener()
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(SamplingFilter(sample_rate))
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+    return _listener
+
+
+def flush_logging() -> None:
+    """Writes out everything queued so far (the listener is stopped and restarted)."""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+        _listener.start()
+
+
+def _stop_listener() -> None:
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
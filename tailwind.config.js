@@ -0,0 +1,9 @@
+/** @type {import('tailwindcss').Config} */
+// Used by scripts/build_assets.py: only classes found in these files are compiled
+module.exports = {
+  content: ["./templates/**/*.html", "./static/src/js/**/*.js"],
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -0,0 +1,46 @@
+import unittest
+from address_normalizer import normalize_address, canonical_key
+
+class TestAddressNormalizer(unittest.TestCase):
+    def test_spelling_variants_share_key(self):
+        variants = [
+            "45 William St, Melbourne",
+            "45 william street melbourne",
+            "45 William St., Melbourne VIC",
+            "45 William Street, Melbourne VIC 3000, Australia",
+        ]
+        keys = {canonical_key(v) for v in variants}
+        self.assertEqual(len(keys), 1)
+
+    def test_unit_and_level_parsing(self):
+        self.assertEqual(normalize_address("3/45 William St, Melbourne").unit, "3")
+        self.assertEqual(normalize_address("Unit 3, 45 William St, Melbourne").unit, "3")
+        self.assertEqual(normalize_address("Level 2, 45 William St, Melbourne").level, "2")
+        self.assertNotEqual(canonical_key("3/45 William St, Melbourne"), canonical_key("45 William St, Melbourne"))
+
+    def test_street_type_inside_name(self):
+        addr = normalize_address("100 St Kilda Rd, St Kilda VIC 3182")
+        self.assertEqual(addr.street_name, "ST KILDA")
+        self.assertEqual(addr.street_type, "RD")
+        self.assertEqual(addr.locality, "ST KILDA")
+
+    def test_state_from_postcode_and_nz(self):
+        self.assertEqual(normalize_address("1 Church St Richmond 3121").state, "VIC")
+        nz = normalize_address("12 Queen Street, Auckland 1010, New Zealand")
+        self.assertEqual(nz.country, "NZ")
+        self.assertEqual(nz.state, "")
+
+    def test_nz_city_without_country_is_not_given_an_au_state(self):
+        self.assertEqual(canonical_key("12 Ponsonby Rd, Grey Lynn, Auckland 1021"),
+                         canonical_key("12 Ponsonby Rd, Grey Lynn, Auckland 1021, New Zealand"))
+        wellington = normalize_address("5 Cuba St, Te Aro, Wellington 6011")
+        self.assertEqual((wellington.country, wellington.state), ("NZ", ""))
+        # A given Australian state wins over a same-named NZ city
+        hamilton = normalize_address("1 Main St, Hamilton QLD 4007")
+        self.assertEqual((hamilton.country, hamilton.state), ("AU", "QLD"))
+
+    def test_unparsed_address_falls_back_to_raw(self):
+        self.assertEqual(canonical_key("Sydney Opera House"), "raw:SYDNEY OPERA HOUSE")
+
+if __name__ == '__main__':
+    unittest.main()
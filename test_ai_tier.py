@@ -0,0 +1,269 @@
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock, patch
+from ai_tier import AITier, negative_key
+from hedging import AIBackend, HedgeBudget
+from models import AnzsicClass
+
+def gemini_response(answers):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {
+        "candidates": [{"content": {"parts": [{"text": json.dumps(answers)}]}}]
+    }
+    return response
+
+def anzsic_class(code, title, group_title):
+    return AnzsicClass(code, title, "X", "", code[:2], "", code[:3], group_title)
+
+CODES = [
+    anzsic_class("3231", "Plumbing Services", "Building Installation Services"),
+    anzsic_class("3332", "Plumbing Goods Wholesaling", "Hardware, Plumbing and Heating Equipment Wholesaling"),
+    anzsic_class("5420", "Software Publishing", "Software Publishing"),
+]
+
+def prompt_of(call):
+    return call[1]["json"]["contents"][0]["parts"][0]["text"]
+
+class TestAITier(unittest.TestCase):
+    def setUp(self):
+        self.tier = AITier(
+            "dummy_key",
+            "http://gemini.local/generateContent",
+            codes=CODES,
+            max_items_per_prompt=2,
+            max_concurrency=2,
+        )
+
+    def candidates(self, n):
+        return [{"name": f"Business {i}", "type": "point_of_interest", "address": "1 Test St"} for i in range(n)]
+
+    @patch('requests.post')
+    def test_chunks_and_free_form_codes(self, mock_post):
+        # No shortlist for these names -> free-form codes, titles from the local table
+        mock_post.side_effect = lambda *args, **kwargs: gemini_response({"1": "5420", "2": "7000"})
+
+        results = self.tier.classify(self.candidates(3))
+
+        # 3 candidates with 2 items per prompt -> 2 prompts
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(results[0].title, "Software Publishing")
+        self.assertTrue(results[0].official)
+        # A code the table does not have is not an answer
+        self.assertIsNone(results[1])
+        self.assertEqual(self.tier.negative_cache.get(negative_key(self.candidates(2)[1])).failure_class, "ai_unknown")
+
+    @patch('requests.post')
+    def test_answers_stream_per_prompt(self, mock_post):
+        release = threading.Event()
+
+        def answer(*args, **kwargs):
+            if "Business 2" in prompt_of((args, kwargs)):
+                release.wait(5)
+                return gemini_response({"1": "5420"})
+            return gemini_response({"1": "5420", "2": "5420"})
+        mock_post.side_effect = answer
+
+        # The first prompt's answers arrive while the second prompt is still running
+        stream = self.tier.iter_classify(self.candidates(3))
+        self.assertEqual(sorted([next(stream)[0], next(stream)[0]]), [0, 1])
+        release.set()
+        self.assertEqual([i for i, _ in stream], [2])
+
+    @patch('requests.post')
+    def test_shortlist_option_answers(self, mock_post):
+        candidates = [
+            {"name": "Bob's Plumbing", "type": "plumber", "address": "1 Pipe Lane"},
+            {"name": "Acme Plumbing Supplies", "type": "wholesaler", "address": "2 Pipe Lane"},
+        ]
+        # 0 = none of the options fit: asked again for a free-form code, without options
+        mock_post.side_effect = [gemini_response({"1": 1, "2": 0}), gemini_response({"1": "5420"})]
+        results = self.tier.classify(candidates)
+
+        prompt = prompt_of(mock_post.call_args_list[0])
+        self.assertIn("1) Plumbing Services", prompt)
+        self.assertNotIn("Software Publishing", prompt)
+        self.assertEqual(results[0].code, "3231")
+        self.assertEqual(results[0].title, "Plumbing Services")
+        retry = prompt_of(mock_post.call_args_list[1])
+        self.assertIn("Acme Plumbing Supplies", retry)
+        self.assertNotIn("Options:", retry)
+        self.assertEqual((results[1].code, results[1].title), ("5420", "Software Publishing"))
+
+    @patch('requests.post')
+    def test_code_outside_the_shortlist(self, mock_post):
+        candidate = {"name": "Acme Plumbing Supplies", "type": "wholesaler", "address": "2 Pipe Lane"}
+        mock_post.return_value = gemini_response({"1": "5420"})
+        self.assertEqual(self.tier.classify([candidate])[0].code, "5420")
+        self.assertEqual(mock_post.call_count, 1)
+
+        # A made-up code instead of an option is asked again without options
+        self.tier.cache.clear()
+        mock_post.side_effect = [gemini_response({"1": "abcd"}), gemini_response({"1": "3332"})]
+        self.assertEqual(self.tier.classify([candidate])[0].code, "3332")
+        self.assertEqual(mock_post.call_count, 3)
+
+        # Only a free-form "Unknown" is negatively cached, after the options did not fit either
+        self.tier.cache.clear()
+        mock_post.side_effect = [gemini_response({"1": 0}), gemini_response({"1": "Unknown"})]
+        self.assertEqual(self.tier.classify([candidate]), [None])
+        self.assertEqual(mock_post.call_count, 5)
+        self.assertEqual(self.tier.negative_cache.get(negative_key(candidate)).failure_class, "ai_unknown")
+
+    @patch('requests.post')
+    def test_cache_and_unknown(self, mock_post):
+        mock_post.return_value = gemini_response({"1": "5420", "2": "Unknown"})
+
+        first = self.tier.classify(self.candidates(2))
+        self.assertEqual(first[0].code, "5420")
+        self.assertIsNone(first[1])
+
+        # The answer is cached and the unknown one negatively cached: no second prompt
+        second = self.tier.classify(self.candidates(2))
+        self.assertEqual(second[0].code, "5420")
+        self.assertIsNone(second[1])
+        self.assertEqual(mock_post.call_count, 1)
+
+        # Once the re-check is due, only the unknown one is asked again; a second
+        # failure doubles its re-check interval
+        entry = self.tier.negative_cache.get(negative_key(self.candidates(2)[1]))
+        self.assertEqual((entry.failure_class, entry.failures), ("ai_unknown", 1))
+        entry.until = 0
+        mock_post.return_value = gemini_response({"1": "9999"})
+        self.tier.classify(self.candidates(2))
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertIn("Business 1", prompt_of(mock_post.call_args))
+        self.assertNotIn("Business 0", prompt_of(mock_post.call_args))
+        entry = self.tier.negative_cache.get(negative_key(self.candidates(2)[1]))
+        self.assertEqual(entry.failures, 2)
+        self.assertAlmostEqual(entry.until - time.time(), 2 * 3600, delta=5)
+
+    @patch('requests.post')
+    def test_unparseable_answer_is_negatively_cached_briefly(self, mock_post):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"candidates": [{"content": {"parts": [{"text": "not json"}]}}]}
+        mock_post.return_value = response
+
+        self.assertEqual(self.tier.classify(self.candidates(1)), [None])
+        entry = self.tier.negative_cache.get(negative_key(self.candidates(1)[0]))
+        self.assertEqual(entry.failure_class, "ai_error")
+        self.assertAlmostEqual(entry.until - time.time(), 60, delta=5)
+
+
+def stand_in_server(delay, answers, status=200):
+    """A local generateContent stand-in that answers after `delay` seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        hits = 0
+
+        def do_POST(self):
+            Handler.hits += 1
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            time.sleep(delay)
+            body = json.dumps({"candidates": [{"content": {"parts": [{"text": json.dumps(answers)}]}}]}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, Handler
+
+
+class TestHedging(unittest.TestCase):
+    def setUp(self):
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+
+    def backend(self, name, delay, answers, status=200):
+        server, handler = stand_in_server(delay, answers, status)
+        self.servers.append(server)
+        return AIBackend(name, f"http://127.0.0.1:{server.server_port}/generate", timeout=5), handler
+
+    def tier(self, backends, budget):
+        return AITier("dummy_key", backends, codes=CODES, hedge_budget=budget, hedge_default_delay=0.1)
+
+    def test_slow_primary_is_hedged_to_secondary(self):
+        primary, _ = self.backend("primary", 2.0, {"1": "5420"})
+        secondary, secondary_hits = self.backend("secondary", 0.0, {"1": "3231"})
+        tier = self.tier([primary, secondary], HedgeBudget(ratio=0.1, burst=1))
+
+        started = time.monotonic()
+        results = tier.classify(self.candidates())
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(results[0].code, "3231")
+        self.assertEqual(secondary_hits.hits, 1)
+        self.assertEqual(tier.hedger.stats()["hedged"], 1)
+        self.assertEqual(tier.hedger.stats()["wins"], {"secondary": 1})
+
+    def test_exhausted_budget_waits_for_primary(self):
+        primary, _ = self.backend("primary", 0.4, {"1": "5420"})
+        secondary, secondary_hits = self.backend("secondary", 0.0, {"1": "3231"})
+        tier = self.tier([primary, secondary], HedgeBudget(ratio=0.0, burst=0))
+
+        results = tier.classify(self.candidates())
+        self.assertEqual(results[0].code, "5420")
+        self.assertEqual(secondary_hits.hits, 0)
+        self.assertEqual(tier.hedger.stats()["budget_denied"], 1)
+
+    def test_failed_primary_fails_over_without_budget(self):
+        primary, _ = self.backend("primary", 0.0, {}, status=503)
+        secondary, _ = self.backend("secondary", 0.0, {"1": "3231"})
+        tier = self.tier([primary, secondary], HedgeBudget(ratio=0.0, burst=0))
+
+        results = tier.classify(self.candidates())
+        self.assertEqual(results[0].code, "3231")
+        self.assertEqual(tier.hedger.stats()["failovers"], 1)
+
+    def test_denied_hedge_still_fails_over(self):
+        primary, _ = self.backend("primary", 0.4, {}, status=503)
+        secondary, secondary_hits = self.backend("secondary", 0.0, {"1": "3231"})
+        tier = self.tier([primary, secondary], HedgeBudget(ratio=0.0, burst=0))
+
+        # The hedge after 0.1 s is denied, but the primary's later 503 still fails over
+        results = tier.classify(self.candidates())
+        self.assertEqual(results[0].code, "3231")
+        self.assertEqual(secondary_hits.hits, 1)
+        stats = tier.hedger.stats()
+        self.assertEqual((stats["budget_denied"], stats["failovers"], stats["hedged"]), (1, 1, 0))
+
+    def test_concurrent_calls_do_not_queue_into_hedges(self):
+        primary, primary_hits = self.backend("primary", 0.3, {"1": "5420"})
+        secondary, secondary_hits = self.backend("secondary", 0.0, {"1": "3231"})
+        tier = AITier("dummy_key", [primary, secondary], codes=CODES, max_concurrency=1,
+                      hedge_budget=HedgeBudget(ratio=0.0, burst=0), hedge_default_delay=0.5)
+
+        # Eight requests at once: every primary attempt starts right away, none waits out the hedge delay
+        results = [None] * 8
+        def classify(n):
+            results[n] = tier.classify([{"name": f"Zyx Holdings {n}", "type": "point_of_interest", "address": "1 Test St"}])
+        threads = [threading.Thread(target=classify, args=(n,)) for n in range(8)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual([r[0].code for r in results], ["5420"] * 8)
+        self.assertEqual((primary_hits.hits, secondary_hits.hits), (8, 0))
+        self.assertEqual(tier.hedger.stats()["budget_denied"], 0)
+
+    def candidates(self):
+        return [{"name": "Zyx Holdings", "type": "point_of_interest", "address": "1 Test St"}]
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,214 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Read by app.py at import time
+os.environ["ADMIN_TOKEN"] = "admin-secret"
+os.environ["GOOGLE_API_KEY"] = "dummy_key"
+os.environ["RATELIMIT_ENABLED"] = "false"
+os.environ.pop("RESULT_STORE_PATH", None)
+os.environ.pop("CACHE_SNAPSHOT_PATH", None)
+
+import app as app_module  # noqa: E402
+from auth import AdminAuth  # noqa: E402
+from job_queue import JobQueue  # noqa: E402
+
+ADMIN = {"X-Admin-Token": "admin-secret"}
+PLACE = {"status": "single", "result": {"business_name": "Test Cafe"}}
+
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        app_module._job_queue = JobQueue(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module._job_queue = None
+        self.tmp.cleanup()
+
+
+class TestAdminAuth(AppTestCase):
+    def test_admin_routes_require_the_token(self):
+        for path in ("/api/jobs", "/api/admin/profiles", "/api/admin/cache/warm", "/api/results/counts"):
+            self.assertEqual(self.client.get(path).status_code, 401, path)
+            self.assertEqual(self.client.get(path, headers={"X-Admin-Token": "wrong"}).status_code, 401, path)
+
+    def test_admin_routes_do_not_exist_without_admin_token(self):
+        with patch.object(app_module, "admin_auth", AdminAuth(None)):
+            for path in ("/api/jobs", "/api/admin/profiles", "/api/admin/cache/warm", "/api/results/lookup"):
+                self.assertEqual(self.client.get(path, headers=ADMIN).status_code, 404, path)
+
+
+class TestJobRoutes(AppTestCase):
+    def test_create_job_reports_rejected_addresses(self):
+        response = self.client.post("/api/jobs", headers=ADMIN,
+                                    json={"addresses": ["1 George St, Sydney", "<b>x</b>", 7], "name": "t"})
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        self.assertEqual(body["total"], 1)
+        self.assertEqual(body["rejected_count"], 2)
+        self.assertEqual([r["position"] for r in body["rejected"]], [1, 2])
+
+        response = self.client.post("/api/jobs", headers=ADMIN, json={"addresses": ["<b>x</b>"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(response.get_json()["rejected"]), 1)
+
+    def test_create_job_from_file_upload(self):
+        data = {"file": (io.BytesIO(b"id,address\n1,\"1 George St, Sydney\"\n2,45 William St\n"), "book.csv")}
+        response = self.client.post("/api/jobs", headers=ADMIN, data=data, content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.get_json()["total"], 2)
+        self.assertEqual(self.client.get("/api/jobs", headers=ADMIN).get_json()["jobs"][0]["name"], "book.csv")
+
+    def test_create_job_size_caps(self):
+        with patch.object(app_module, "MAX_JOB_ADDRESSES", 2):
+            response = self.client.post("/api/jobs", headers=ADMIN, json={"addresses": ["1 A St", "2 A St", "3 A St"]})
+            self.assertEqual(response.status_code, 400)
+
+        addresses = [f"{n} George St, Sydney" for n in range(50)]
+        # Job uploads may exceed MAX_CONTENT_LENGTH, which still applies elsewhere
+        with patch.dict(app_module.app.config, {"MAX_CONTENT_LENGTH": 200}):
+            self.assertEqual(self.client.post("/api/jobs", headers=ADMIN, json={"addresses": addresses}).status_code, 202)
+            self.assertEqual(self.client.post("/api/identify/batch", json={"addresses": addresses}).status_code, 413)
+        with patch.object(app_module, "MAX_JOB_UPLOAD_BYTES", 200):
+            response = self.client.post("/api/jobs", headers=ADMIN, json={"addresses": addresses})
+            self.assertEqual(response.status_code, 413)
+            self.assertIn("200 bytes", response.get_json()["error"])
+
+    def test_job_access_with_admin_or_job_token(self):
+        created = self.client.post("/api/jobs", headers=ADMIN, json={"addresses": ["1 George St, Sydney"]}).get_json()
+        other = self.client.post("/api/jobs", headers=ADMIN, json={"addresses": ["2 George St, Sydney"]}).get_json()
+        job_id = created["job_id"]
+        bearer = {"Authorization": f"Bearer {created['job_token']}"}
+
+        for path in (f"/api/jobs/{job_id}", f"/api/jobs/{job_id}/results"):
+            self.assertEqual(self.client.get(path, headers=ADMIN).status_code, 200, path)
+            self.assertEqual(self.client.get(path, headers=bearer).status_code, 200, path)
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+            self.assertEqual(self.client.get(path, headers={"Authorization": "Bearer wrong"}).status_code, 404, path)
+        # A job token opens its own job only
+        self.assertEqual(self.client.get(f"/api/jobs/{other['job_id']}", headers=bearer).status_code, 404)
+        self.assertEqual(self.client.get("/api/jobs/unknown", headers=ADMIN).status_code, 404)
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}/results?limit=x", headers=ADMIN).status_code, 400)
+        self.assertEqual(self.client.get(f"/api/jobs/{job_id}", headers=ADMIN).get_json()["total"], 1)
+
+
+class TestIdentifyRoutes(AppTestCase):
+    def test_stream(self):
+        events = [{"event": "place", "name": "Test Cafe"}, {"event": "done"}]
+        with patch.object(app_module.locator, "iter_business_details", return_value=iter(events)) as stream:
+            response = self.client.post("/api/identify/stream", json={"address": "45 William St, Melbourne", "ai": "lazy"})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertEqual(lines, events)
+        stream.assert_called_once_with("45 William St, Melbourne", lazy_ai=True)
+        self.assertEqual(self.client.post("/api/identify/stream", json={}).status_code, 400)
+        self.assertEqual(self.client.post("/api/identify/stream", json={"address": "<x>"}).status_code, 400)
+
+    def test_batch(self):
+        with patch.object(app_module.locator, "get_business_details_batch", return_value=[PLACE]) as batch:
+            response = self.client.post("/api/identify/batch", json={"addresses": ["45 William St, Melbourne", "<x>"]})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body["count"], 2)
+        self.assertEqual(body["results"][0]["response"], PLACE)
+        self.assertIn("error", body["results"][1]["response"])
+        batch.assert_called_once_with(["45 William St, Melbourne"], lazy_ai=False)
+
+        with patch.object(app_module, "MAX_BATCH_ADDRESSES", 1):
+            self.assertEqual(self.client.post("/api/identify/batch", json={"addresses": ["a b c", "d e f"]}).status_code, 400)
+        self.assertEqual(self.client.post("/api/identify/batch", json={"addresses": "1 George St"}).status_code, 400)
+
+    def test_location(self):
+        with patch.object(app_module.locator, "get_business_details_by_location", return_value=PLACE) as single:
+            response = self.client.post("/api/identify/location", json={"latitude": -37.81, "longitude": 144.96})
+        self.assertEqual(response.get_json(), PLACE)
+        single.assert_called_once_with(-37.81, 144.96, lazy_ai=False)
+
+        with patch.object(app_module.locator, "get_business_details_by_location_batch", return_value=[PLACE]) as bulk:
+            response = self.client.post("/api/identify/location", json={
+                "locations": [{"latitude": -37.81, "longitude": 144.96}, {"latitude": 91, "longitude": 0}], "ai": "lazy",
+            })
+        results = response.get_json()["results"]
+        self.assertEqual(results[0]["response"], PLACE)
+        self.assertIn("error", results[1]["response"])
+        bulk.assert_called_once_with([(-37.81, 144.96)], lazy_ai=True)
+
+        self.assertEqual(self.client.post("/api/identify/location", json={"latitude": "x", "longitude": 0}).status_code, 400)
+        self.assertEqual(self.client.post("/api/identify/location", json={"locations": {}}).status_code, 400)
+
+    def test_ai(self):
+        response = self.client.post("/api/identify/ai", json={"tokens": ["forged"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["results"],
+                         [{"error": "Invalid candidate token", "candidate_token": "forged"}])
+        self.assertEqual(self.client.post("/api/identify/ai", json={"tokens": []}).status_code, 400)
+
+
+class TestAdminRoutes(AppTestCase):
+    def test_profiles(self):
+        with patch.object(app_module.locator, "get_business_details", return_value=PLACE):
+            response = self.client.post("/api/identify", json={"address": "45 William St, Melbourne"},
+                                        headers={"X-Profile": "admin-secret"})
+            self.assertNotIn("X-Profile-Id", self.client.post(
+                "/api/identify", json={"address": "45 William St, Melbourne"}, headers={"X-Profile": "wrong"}).headers)
+        report_id = response.headers["X-Profile-Id"]
+
+        profiles = self.client.get("/api/admin/profiles", headers=ADMIN).get_json()["profiles"]
+        self.assertIn(int(report_id), [p["id"] for p in profiles])
+        self.assertEqual(self.client.get(f"/api/admin/profiles/{report_id}", headers=ADMIN).status_code, 200)
+        self.assertEqual(self.client.get("/api/admin/profiles/999999", headers=ADMIN).status_code, 404)
+        self.assertEqual(self.client.get(f"/api/admin/profiles/{report_id}").status_code, 401)
+
+    def test_cache_snapshot_and_warm(self):
+        self.assertEqual(self.client.post("/api/admin/cache/snapshot", headers=ADMIN).status_code, 404)
+        self.assertEqual(self.client.post("/api/admin/cache/warm", headers=ADMIN).status_code, 404)
+        self.assertEqual(self.client.post("/api/admin/cache/snapshot").status_code, 401)
+
+        path = os.path.join(self.tmp.name, "snapshot.json")
+        with patch.object(app_module.cache_warmer, "snapshot_path", path):
+            response = self.client.post("/api/admin/cache/snapshot", headers=ADMIN)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(self.client.post("/api/admin/cache/warm", headers=ADMIN).status_code, 202)
+            app_module.cache_warmer.wait(5)
+        status = self.client.get("/api/admin/cache/warm", headers=ADMIN).get_json()
+        self.assertEqual(status["state"], "done")
+        self.assertIn("place_cache", status)
+
+
+class TestResultRoutes(AppTestCase):
+    def test_disabled_without_result_store(self):
+        with patch.object(app_module.locator, "result_store", None):
+            self.assertEqual(self.client.get("/api/results/counts", headers=ADMIN).status_code, 404)
+            self.assertEqual(self.client.get("/api/results/lookup?place_id=p1", headers=ADMIN).status_code, 404)
+
+    def test_counts_and_lookup(self):
+        def count_by(level):
+            if level != "division":
+                raise ValueError("Unknown level")
+            return {"H": 3}
+
+        store = MagicMock()
+        store.count_by.side_effect = count_by
+        store.lookup.return_value = [{"place_id": "p1"}]
+        with patch.object(app_module.locator, "result_store", store):
+            self.assertEqual(self.client.get("/api/results/counts", headers=ADMIN).get_json(),
+                             {"level": "division", "counts": {"H": 3}})
+            self.assertEqual(self.client.get("/api/results/counts?level=x", headers=ADMIN).status_code, 400)
+            self.assertEqual(self.client.get("/api/results/counts").status_code, 401)
+
+            response = self.client.get("/api/results/lookup?address=45 William St, Melbourne&limit=5", headers=ADMIN)
+            self.assertEqual(response.get_json(), {"results": [{"place_id": "p1"}]})
+            store.lookup.assert_called_once_with(place_id=None, address_key=app_module.canonical_key("45 William St, Melbourne"), limit=5)
+            self.assertEqual(self.client.get("/api/results/lookup", headers=ADMIN).status_code, 400)
+            self.assertEqual(self.client.get("/api/results/lookup?place_id=p1&limit=x", headers=ADMIN).status_code, 400)
+            self.assertEqual(self.client.get("/api/results/lookup?place_id=p1").status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
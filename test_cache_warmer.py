@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from anzsic_mapper import BusinessAnzsicLocator
+from cache_warmer import CacheWarmer, export_snapshot, load_snapshot
+from models import AIClassification
+
+PLACE = {
+    "id": "place-1",
+    "displayName": {"text": "Zyxwv Qrstu"},
+    "primaryType": "point_of_interest",
+    "types": ["point_of_interest", "establishment"],
+    "formattedAddress": "1 Test St, Sydney NSW 2000",
+}
+
+def upstream(url, **kwargs):
+    response = MagicMock()
+    response.status_code = 200
+    if "generateContent" in url:
+        answers = {"1": "5420"}
+        response.json.return_value = {"candidates": [{"content": {"parts": [{"text": json.dumps(answers)}]}}]}
+    else:
+        response.json.return_value = {"places": [PLACE]}
+    return response
+
+class TestCacheWarmer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def locator(self):
+        return BusinessAnzsicLocator("dummy_key", "dummy_gemini_key")
+
+    @patch('requests.post')
+    def test_warmed_locator_needs_no_upstream_calls(self, mock_post):
+        mock_post.side_effect = upstream
+        cold = self.locator()
+        first = cold.get_business_details("1 Test St, Sydney")
+        self.assertEqual(first["result"].ai_classification.code, "5420")
+        self.assertEqual(mock_post.call_count, 2)  # Text search + AI
+
+        path = os.path.join(self.tmp.name, "snapshot.json.gz")
+        self.assertEqual(export_snapshot(cold, path), {"places": 1, "ai": 1})
+
+        warm = self.locator()
+        warmer = CacheWarmer(warm, path)
+        self.assertTrue(warmer.start())
+        warmer.wait(5)
+        status = warmer.status()
+        self.assertEqual((status["state"], status["loaded"]["places"], status["loaded"]["ai"]), ("done", 1, 1))
+
+        mock_post.reset_mock()
+        response = warm.get_business_details("1 Test St, Sydney")
+        mock_post.assert_not_called()
+        self.assertEqual(response["result"].ai_classification.code, "5420")
+
+    def test_hottest_entries_first_and_stale_codes_skipped(self):
+        source = self.locator()
+        for n in range(3):
+            source.place_cache.put(f"key-{n}", {"places": [dict(PLACE, id=f"place-{n}")]})
+        source.cache_hits.touch("place:key-2", 5)
+        source.cache_hits.touch("place:key-1", 2)
+        source.ai_cache["Old|Addr"] = AIClassification(code="0000", title="Retired class", official=True)
+        source.ai_cache["Free|Addr"] = AIClassification(code="5420", title="Software Publishing", official=True)
+        source.ai_cache["Made|Up"] = AIClassification(code="abcd", title="Model title", official=False)
+
+        path = os.path.join(self.tmp.name, "snapshot.json")
+        export_snapshot(source, path, max_places=2)
+        with open(path) as f:
+            self.assertEqual([e["key"] for e in json.load(f)["places"]], ["key-2", "key-1"])
+
+        target = self.locator()
+        target.ai_cache["Free|Addr"] = AIClassification(code="1111", title="Newer answer", official=False)
+        loaded = load_snapshot(target, path)
+        self.assertEqual(loaded, {"places": 2, "ai": 0, "skipped": 2})
+        self.assertEqual(target.ai_cache["Free|Addr"].code, "1111")  # Existing entries win
+        self.assertEqual(target.cache_hits.get("place:key-2"), 5)
+
+    def test_missing_snapshot_does_not_start(self):
+        warmer = CacheWarmer(self.locator(), os.path.join(self.tmp.name, "missing.json"))
+        self.assertFalse(warmer.start())
+        self.assertEqual(warmer.status(), {"state": "idle"})
+
+if __name__ == '__main__':
+    unittest.main()
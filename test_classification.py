@@ -29,20 +29,20 @@ print("--- Starting Classification Test ---")
 # 1. Test Direct Map
 print("\nTest 1: Direct Map (Cafe)")
 res1 = locator._enrich_deterministic({"displayName": {"text": "My Cafe"}, "primaryType": "cafe", "formattedAddress": "1 St", "types": ["cafe"]})
-print(f"Result: {res1['recommended_classification']['title']} | Method: {res1['source_intelligence']['match_method']}")
+print(f"Result: {res1.recommended_classification.title} | Method: {res1.source_intelligence.match_method}")
 
 # 2. Test Keyword Match (if I add a specific kw to json)
 # "Legal Services" is in JSON. "Legal" is in name.
 print("\nTest 2: Keyword Match (Legal)")
 # Mocking a type that is NOT in the direct map, but name has keyword
 res2 = locator._enrich_deterministic({"displayName": {"text": "Smith Legal Services"}, "primaryType": "consultant", "formattedAddress": "1 St", "types": ["consultant"]})
-print(f"Result: {res2['recommended_classification']['title']} | Method: {res2['source_intelligence']['match_method']}")
+print(f"Result: {res2.recommended_classification.title} | Method: {res2.source_intelligence.match_method}")
 
 # 3. Test AI (Real Test with new Key)
 print("\nTest 3: AI Inference (Real)")
 # "Plumbing" is NOT in our local json, so it must go to AI.
 res3 = locator._enrich_deterministic({"displayName": {"text": "Bob's Plumbing Services"}, "primaryType": "plumber", "formattedAddress": "123 Pipe Lane", "types": ["plumber"]})
-print(f"Result: {res3['recommended_classification']['title']} | Code: {res3['recommended_classification']['code']} | Method: {res3['source_intelligence']['match_method']}")
+print(f"Result: {res3.recommended_classification.title} | Code: {res3.recommended_classification.code} | Method: {res3.source_intelligence.match_method}")
 
 import json
 # 4. Test Batch Logic (Manual invocation)
@@ -53,4 +53,4 @@ candidates = [
 ]
 # We need to manually call _batch_ai_classification to test it in isolation
 results = locator._batch_ai_classification(candidates)
-print(f"Batch Results: {json.dumps(results, indent=2)}")
+print(f"Batch Results: {json.dumps([r.to_dict() if r else None for r in results], indent=2)}")
@@ -0,0 +1,116 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+from anzsic_mapper import BusinessAnzsicLocator
+from job_queue import JobQueue, read_addresses, validate_addresses
+from job_worker import main, run_worker
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.queue = JobQueue(self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_addresses(self):
+        self.assertEqual(read_addresses("id,Address\n1,\"1 George St, Sydney\"\n2,\n"), ["1 George St, Sydney"])
+        self.assertEqual(read_addresses("1 George St, Sydney\n\n45 William St, Melbourne\n"),
+                         ["1 George St, Sydney", "45 William St, Melbourne"])
+
+    def test_validate_addresses_reports_rejected_positions(self):
+        valid, rejected = validate_addresses(["1 George St, Sydney", "<script>", None, "x"])
+        self.assertEqual(valid, ["1 George St, Sydney"])
+        self.assertEqual([r["position"] for r in rejected], [1, 2, 3])
+
+    def test_submit_skips_invalid_addresses(self):
+        path = os.path.join(self.tmp.name, "addresses.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("1 George St, Sydney\n<b>bold</b>\n")
+        self.assertEqual(main(["--db", self.db_path, "--submit", path]), 0)
+        job = self.queue.list_jobs()[0]
+        self.assertEqual(job["total"], 1)
+
+    def test_leases_are_exclusive_and_survive_restart(self):
+        job_id = self.queue.create_job([f"{n} George St, Sydney" for n in range(5)])
+
+        first = self.queue.lease("worker-a", 3, lease_seconds=60)
+        second = self.queue.lease("worker-b", 3, lease_seconds=60)
+        self.assertEqual([i.seq for i in first], [0, 1, 2])
+        self.assertEqual([i.seq for i in second], [3, 4])
+
+        self.queue.complete("worker-a", [(first[0], json.dumps({"status": "single"}))])
+
+        # "Restart": a new process opens the same file once worker-b's lease has expired
+        restarted = JobQueue(self.db_path)
+        self.assertEqual(restarted.lease("worker-c", 10, lease_seconds=60), [])
+        restarted._conn().execute("UPDATE job_items SET lease_until = 0 WHERE lease_owner = 'worker-b'")
+        reclaimed = restarted.lease("worker-c", 10, lease_seconds=60)
+        self.assertEqual([i.seq for i in reclaimed], [3, 4])
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+        # worker-b lost its lease, so its late checkpoint is ignored
+        self.assertEqual(restarted.complete("worker-b", [(second[0], "{}")]), 0)
+
+        progress = restarted.progress(job_id)
+        self.assertEqual((progress["done"], progress["leased"], progress["status"]), (1, 4, "running"))
+        self.assertEqual(restarted.results(job_id)[0]["response"], {"status": "single"})
+
+    def test_failed_items_are_retried_then_given_up(self):
+        job_id = self.queue.create_job(["1 George St, Sydney"])
+        for attempt in range(2):
+            item, = self.queue.lease("worker", 1, lease_seconds=60)
+            self.queue.fail("worker", item, "boom", max_attempts=2)
+        self.assertEqual(self.queue.lease("worker", 1, lease_seconds=60), [])
+        progress = self.queue.progress(job_id)
+        self.assertEqual((progress["failed"], progress["status"]), (1, "completed"))
+
+    def test_job_token_grants_access_to_its_job_only(self):
+        job_id = self.queue.create_job(["1 George St, Sydney"], token="secret-a")
+        other_id = self.queue.create_job(["2 George St, Sydney"])
+        self.assertTrue(self.queue.check_token(job_id, "secret-a"))
+        self.assertFalse(self.queue.check_token(job_id, "secret-b"))
+        self.assertFalse(self.queue.check_token(job_id, ""))
+        self.assertFalse(self.queue.check_token(other_id, "secret-a"))
+        self.assertFalse(self.queue.check_token("missing", "secret-a"))
+
+    def test_worker_completes_job(self):
+        job_id = self.queue.create_job(["123 Test St", "45 Coffee Lane", "123 test street"])
+        locator = BusinessAnzsicLocator(None)  # Demo mode: no upstream calls
+
+        processed = run_worker(self.queue, locator, worker_id="test", batch_size=2, exit_when_idle=True)
+
+        self.assertEqual(processed, 3)
+        progress = self.queue.progress(job_id)
+        self.assertEqual((progress["done"], progress["status"]), (3, "completed"))
+        results = self.queue.results(job_id, after=0)
+        self.assertEqual([r["seq"] for r in results], [1, 2])
+        self.assertIn("recommended_classification", results[0]["response"]["result"])
+
+    def test_worker_retries_transient_errors_with_backoff(self):
+        job_id = self.queue.create_job(["1 George St, Sydney", "2 George St, Sydney"])
+        locator = MagicMock()
+        locator.get_business_details_batch.return_value = [
+            {"error": "API Request Failed: 503 Server Error", "retryable": True},
+            {"error": "No business found at this address.", "negative_cached": False},
+        ]
+
+        processed = run_worker(self.queue, locator, worker_id="test", exit_when_idle=True, retry_base_seconds=60)
+
+        # "Not found" is a final answer; the 503 goes back to the queue and is not leased during its backoff
+        self.assertEqual(processed, 1)
+        progress = self.queue.progress(job_id)
+        self.assertEqual((progress["done"], progress["pending"]), (1, 1))
+        self.assertEqual(self.queue.lease("other", 10, lease_seconds=60), [])
+
+        self.queue._conn().execute("UPDATE job_items SET retry_at = 0")
+        locator.get_business_details_batch.return_value = [{"status": "single", "result": None}]
+        self.assertEqual(run_worker(self.queue, locator, worker_id="test", exit_when_idle=True), 1)
+        self.assertEqual(self.queue.results(job_id)[0]["response"], {"status": "single", "result": None})
+        self.assertEqual(self.queue.progress(job_id)["status"], "completed")
+
+if __name__ == '__main__':
+    unittest.main()
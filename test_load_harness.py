@@ -0,0 +1,75 @@
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "scripts"))
+import load_test
+import upstream_simulator
+from anzsic_mapper import BusinessAnzsicLocator
+from hedging import parse_backends
+
+class TestUpstreamSimulator(unittest.TestCase):
+    def setUp(self):
+        self.sim = upstream_simulator.Simulation(places_latency_ms=1, ai_latency_ms=1, latency_sigma=0, seed=1)
+        self.server = upstream_simulator.start_simulator(self.sim)
+        env = upstream_simulator.service_env(self.server)
+        self.locator = BusinessAnzsicLocator(
+            env["GOOGLE_API_KEY"],
+            env["GEMINI_API_KEY"],
+            places_base_url=env["PLACES_API_BASE_URL"],
+            ai_backends=parse_backends(env["AI_BACKENDS"], timeout=5),
+        )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_full_code_path_against_simulator(self):
+        responses = self.locator.get_business_details_batch([f"{n} George St, Sydney NSW 2000" for n in range(1, 30)])
+
+        self.assertTrue(all("error" not in r for r in responses))
+        self.assertGreater(self.sim.requests["searchText"], 0)
+        self.assertGreater(self.sim.requests["searchNearby"], 0)  # Some addresses are generic
+        self.assertGreater(self.sim.requests["generateContent"], 0)  # Some businesses need the AI tier
+
+        # Same address, same business
+        again = self.locator.get_business_details("1 George St, Sydney NSW 2000")
+        self.assertEqual(app_json(again), app_json(responses[0]))
+
+    def test_error_rate(self):
+        self.sim.error_rate = 1.0
+        response = self.locator.get_business_details("5 Pitt St, Sydney NSW 2000")
+        self.assertIn("API Request Failed", response["error"])
+
+class TestLoadReport(unittest.TestCase):
+    def test_summary_and_saturation(self):
+        stage = load_test.summarize(4, 2.0, [0.1] * 98 + [0.5, 0.9])
+        self.assertEqual((stage["throughput_rps"], stage["p50_ms"], stage["p99_ms"]), (50.0, 100.0, 900.0))
+
+        stages = [{"concurrency": c, "throughput_rps": rps} for c, rps in ((1, 10), (2, 19), (4, 36), (8, 38), (16, 37))]
+        self.assertEqual(load_test.find_saturation(stages), 8)
+        self.assertIsNone(load_test.find_saturation(stages[:3]))
+
+    def test_only_expected_400s_are_answers(self):
+        classify = load_test.classify_response
+        self.assertIsNone(classify(200, {"status": "single"}))
+        self.assertIsNone(classify(400, {"error": "No business found at this address.", "negative_cached": True}))
+        failures = [
+            classify(400, {"error": "API Request Failed: 503 Server Error", "retryable": True}),
+            classify(400, {"error": "API Request Failed: 503 Server Error", "retryable": True}),
+            classify(429, {"error": "ratelimit exceeded"}),
+            classify(502, None),
+        ]
+        self.assertEqual(failures[0], "upstream: API Request Failed: 503 Server Error")
+        self.assertEqual(failures[3], "502")
+
+        stage = load_test.summarize(1, 1.0, [0.1] * 4, failures)
+        self.assertEqual((stage["error_rate"], stage["upstream_errors"]), (0.5, 2))
+        self.assertEqual(stage["top_failures"][0], ("upstream: API Request Failed: 503 Server Error", 2))
+
+def app_json(response):
+    return json.dumps(response, default=lambda o: o.to_dict(), sort_keys=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,13 @@
 import unittest
 from unittest.mock import MagicMock, patch
+from address_normalizer import canonical_key
 from anzsic_mapper import BusinessAnzsicLocator
 import json
+import os
+import tempfile
+import time
+from anzsic_data import meta_path_for
+from models import AIClassification
 
 class TestAnzsicMapper(unittest.TestCase):
     def setUp(self):
@@ -35,9 +41,9 @@ class TestAnzsicMapper(unittest.TestCase):
         result = response["result"]
 
         # Verify Mapped Output
-        self.assertEqual(result["source_intelligence"]["detected_type"], "cafe")
-        self.assertEqual(result["recommended_classification"]["code"], "4511")
-        self.assertEqual(result["recommended_classification"]["title"], "Cafes and Restaurants")
+        self.assertEqual(result.source_intelligence.detected_type, "cafe")
+        self.assertEqual(result.recommended_classification.code, "4511")
+        self.assertEqual(result.recommended_classification.title, "Cafes and Restaurants")
 
     @patch('requests.post')
     def test_gym_mapping(self, mock_post):
@@ -58,8 +64,8 @@ class TestAnzsicMapper(unittest.TestCase):
         response = self.locator.get_business_details("456 Fit Way")
         self.assertEqual(response["status"], "single")
         result = response["result"]
-        self.assertEqual(result["recommended_classification"]["code"], "9111")
-        self.assertEqual(result["recommended_classification"]["title"], "Health and Fitness Centres and Gymnasia Operation")
+        self.assertEqual(result.recommended_classification.code, "9111")
+        self.assertEqual(result.recommended_classification.title, "Health and Fitness Centres and Gymnasia Operation")
 
     @patch('requests.post')
     def test_no_results(self, mock_post):
@@ -70,6 +76,363 @@ class TestAnzsicMapper(unittest.TestCase):
 
         result = self.locator.get_business_details("Unknown Place")
         self.assertIn("error", result)
+        self.assertNotIn("negative_cached", result)
+
+        # A retry within the re-check interval is answered without calling Places
+        retry = self.locator.get_business_details("unknown place")
+        self.assertEqual(retry["error"], result["error"])
+        self.assertTrue(retry["negative_cached"])
+        mock_post.assert_called_once()
+
+    @patch('requests.post')
+    def test_success_clears_failure_count(self, mock_post):
+        empty = MagicMock(status_code=200)
+        empty.json.return_value = {}
+        found = MagicMock(status_code=200)
+        found.json.return_value = {"places": [{"displayName": {"text": "Test Cafe"}, "primaryType": "cafe"}]}
+        key = "address:" + canonical_key("9 Quiet Lane")
+        mock_post.side_effect = [empty, found, empty]
+
+        self.locator.get_business_details("9 Quiet Lane")
+        with patch("negative_cache.time.time", return_value=time.time() + 3600):
+            self.assertEqual(self.locator.get_business_details("9 Quiet Lane")["status"], "single")
+            self.assertEqual(self.locator.negative_cache.get(key), None)
+            with patch("place_store.time.time", return_value=time.time() + 7 * 3600):  # Cached search expired
+                self.locator.get_business_details("9 Quiet Lane")
+            # Counted as a first failure again, not a second one with a doubled TTL
+            self.assertEqual(self.locator.negative_cache.get(key).failures, 1)
+
+    @patch('requests.post')
+    def test_stream_events_for_generic_address(self, mock_post):
+        # Text search resolves to a generic address, nearby search finds two businesses
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {
+            "places": [
+                {
+                    "displayName": {"text": "45 William St"},
+                    "primaryType": "street_address",
+                    "formattedAddress": "45 William St, Melbourne VIC 3000",
+                    "location": {"latitude": -37.8, "longitude": 144.9}
+                }
+            ]
+        }
+        nearby_response = MagicMock()
+        nearby_response.status_code = 200
+        nearby_response.json.return_value = {
+            "places": [
+                {"displayName": {"text": "Corner Cafe"}, "primaryType": "cafe", "formattedAddress": "45 William St"},
+                {"displayName": {"text": "Fit Gym"}, "primaryType": "gym", "formattedAddress": "45 William St"}
+            ]
+        }
+        mock_post.side_effect = [text_response, nearby_response]
+
+        events = list(self.locator.iter_business_details("45 William St"))
+
+        self.assertEqual([e["event"] for e in events], ["place", "candidate", "candidate", "done"])
+        self.assertTrue(events[0]["place"]["is_generic"])
+        self.assertEqual(events[1]["result"].recommended_classification.code, "4511")
+        self.assertEqual(events[2]["index"], 1)
+        self.assertEqual(events[3]["status"], "multiple")
+
+    @patch('requests.post')
+    def test_address_variants_share_text_search(self, mock_post):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {
+            "places": [
+                {"displayName": {"text": "Test Cafe"}, "primaryType": "cafe", "formattedAddress": "45 William St"}
+            ]
+        }
+        mock_post.return_value = mock_response
+
+        responses = self.locator.get_business_details_batch([
+            "45 William St, Melbourne",
+            "45 william street melbourne",
+            "45 William St., Melbourne VIC",
+        ])
+
+        mock_post.assert_called_once()
+        self.assertEqual(len(responses), 3)
+        self.assertTrue(all(r["status"] == "single" for r in responses))
+
+    @patch('requests.post')
+    def test_known_place_skips_nearby_search(self, mock_post):
+        def text_response(types):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {
+                "places": [{
+                    "id": "ChIJ-mall",
+                    "displayName": {"text": "Westfield"},
+                    "primaryType": types[0],
+                    "types": types,
+                    "formattedAddress": "45 William St, Melbourne VIC 3000",
+                    "location": {"latitude": -37.8, "longitude": 144.9}
+                }]
+            }
+            return response
+
+        nearby_response = MagicMock()
+        nearby_response.status_code = 200
+        nearby_response.json.return_value = {
+            "places": [{"id": "ChIJ-cafe", "displayName": {"text": "Corner Cafe"}, "primaryType": "cafe", "formattedAddress": "45 William St"}]
+        }
+
+        mock_post.side_effect = [text_response(["premise"]), nearby_response, text_response(["premise"])]
+        first = self.locator.get_business_details("45 William St, Melbourne")
+        # A different spelling that Places resolves to the same place id
+        second = self.locator.get_business_details("Shop 1, 45 William Street Melbourne")
+
+        self.assertEqual(mock_post.call_count, 3)  # text, nearby, text - no second nearby search
+        self.assertEqual(first["status"], "multiple")
+        self.assertEqual(second["candidates"][0].source_intelligence.business_name, "Corner Cafe")
+        self.assertIn("places.id", mock_post.call_args_list[0][1]["headers"]["X-Goog-FieldMask"])
+
+        # Google re-categorises the place -> stored entry is invalidated and recomputed
+        mock_post.side_effect = [text_response(["shopping_mall"])]
+        third = self.locator.get_business_details("Level 2, 45 William St, Melbourne")
+        self.assertEqual(third["status"], "single")
+
+    @patch('requests.post')
+    def test_nearby_outage_is_not_stored_as_known_place(self, mock_post):
+        locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key")
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {"places": [{
+            "id": "ChIJ-lot", "displayName": {"text": "12 Smith St"}, "primaryType": "street_address",
+            "formattedAddress": "12 Smith St, Collingwood VIC 3066", "location": {"latitude": -37.8, "longitude": 144.98},
+        }]}
+        gemini_response = MagicMock()
+        gemini_response.status_code = 200
+        gemini_response.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": '{"1": {"code": "6720"}}'}]}}]
+        }
+        mock_post.side_effect = [text_response, MagicMock(status_code=503, text="unavailable"), gemini_response]
+
+        response = locator.get_business_details("12 Smith St, Collingwood")
+
+        # The bare address still gets an answer, but it is not kept for the place store TTL
+        self.assertEqual(response["status"], "single")
+        self.assertEqual(len(locator.place_store), 0)
+
+    @patch('requests.post')
+    def test_place_cache_expiry_reveals_type_change(self, mock_post):
+        def text_response(types):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {"places": [{
+                "id": "ChIJ-shop", "displayName": {"text": "Corner Shop"}, "primaryType": types[0],
+                "types": types, "formattedAddress": "7 High St, Kew VIC 3101",
+            }]}
+            return response
+
+        mock_post.side_effect = [text_response(["cafe"]), text_response(["bakery"])]
+        self.assertEqual(self.locator.get_business_details("7 High St, Kew")["result"].recommended_classification.code, "4511")
+        # Within the place cache TTL neither Places nor the place store is asked again
+        self.locator.get_business_details("7 High St, Kew")
+        self.assertEqual(mock_post.call_count, 1)
+
+        # Once the cached text search expires, the new types invalidate the stored classification
+        with patch("place_store.time.time", return_value=time.time() + 7 * 3600):
+            later = self.locator.get_business_details("7 High St, Kew")
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(later["result"].recommended_classification.code, "1174")
+
+    @patch('requests.post')
+    def test_location_lookup_skips_text_search(self, mock_post):
+        nearby_response = MagicMock()
+        nearby_response.status_code = 200
+        nearby_response.json.return_value = {
+            "places": [{"id": "ChIJ-gym", "displayName": {"text": "Fit Gym"}, "primaryType": "gym", "formattedAddress": "456 Fit Way"}]
+        }
+        mock_post.return_value = nearby_response
+
+        responses = self.locator.get_business_details_by_location_batch([(-37.8136, 144.9631), (-37.813601, 144.963101)])
+
+        # Both coordinates round to the same key -> one nearby search, no text search
+        mock_post.assert_called_once()
+        self.assertEqual(mock_post.call_args[0][0], self.locator.nearby_url)
+        self.assertEqual(responses[1]["candidates"][0].recommended_classification.code, "9111")
+
+        # Repeat lookups are served from the place store
+        self.locator.get_business_details_by_location(-37.8136, 144.9631)
+        mock_post.assert_called_once()
+
+    @patch('requests.post')
+    def test_nearby_outage_is_retryable_not_no_match(self, mock_post):
+        unavailable = MagicMock(status_code=503, text="unavailable")
+        mock_post.return_value = unavailable
+
+        response = self.locator.get_business_details_by_location(-33.8688, 151.2093)
+        self.assertTrue(response["retryable"])
+        self.assertNotIn("negative_cached", response)
+        self.assertIn("503", response["error"])
+
+        # Not negatively cached: the retry goes upstream again
+        self.locator.get_business_details_by_location(-33.8688, 151.2093)
+        self.assertEqual(mock_post.call_count, 2)
+
+    @patch('requests.post')
+    def test_adaptive_nearby_search(self, mock_post):
+        def nearby(places):
+            response = MagicMock()
+            response.status_code = 200
+            response.json.return_value = {"places": places}
+            return response
+
+        unknown = [{"displayName": {"text": f"Shop {i}"}, "primaryType": "point_of_interest"} for i in range(5)]
+        mock_post.side_effect = [
+            nearby([{"displayName": {"text": "Lot"}, "primaryType": "premise"}]),   # nothing useful: widen
+            nearby(unknown),                                                         # no direct match: more results
+            nearby(unknown + [{"displayName": {"text": "Corner Cafe"}, "primaryType": "cafe"}]),
+        ]
+
+        places, search, error = self.locator._search_nearby(-37.8, 144.9)
+
+        payloads = [c[1]["json"] for c in mock_post.call_args_list]
+        self.assertEqual([p["locationRestriction"]["circle"]["radius"] for p in payloads], [50.0, 100.0, 100.0])
+        self.assertEqual([p["maxResultCount"] for p in payloads], [5, 5, 10])
+        self.assertEqual(len(places), 6)
+        self.assertEqual(search["requests"], 3)
+        self.assertTrue(search["stopped_early"])
+        self.assertEqual(search["policy"]["max_result_count"], 20)
+        self.assertIsNone(error)
+        self.assertFalse(search["failed"])
+
+    @patch('requests.post')
+    def test_lazy_ai_defers_to_candidate_tokens(self, mock_post):
+        locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key", token_secret="test-secret")
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {
+            "places": [{"id": "ChIJ-zyx", "displayName": {"text": "Zyx Holdings"}, "primaryType": "point_of_interest",
+                        "formattedAddress": "1 Test St"}]
+        }
+        mock_post.return_value = text_response
+
+        response = locator.get_business_details("1 Test St", lazy_ai=True)
+
+        mock_post.assert_called_once()  # No Gemini call yet
+        result = response["result"]
+        self.assertIsNone(result.ai_classification)
+        self.assertTrue(result.candidate_token)
+
+        gemini_response = MagicMock()
+        gemini_response.status_code = 200
+        gemini_response.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": json.dumps({"1": {"code": "6931"}})}]}}]
+        }
+        mock_post.return_value = gemini_response
+
+        answers = locator.classify_candidate_tokens([result.candidate_token, "tampered"])
+        self.assertEqual(answers[0]["ai_classification"].title, "Legal Services")
+        self.assertIn("error", answers[1])
+        self.assertIn("Zyx Holdings", mock_post.call_args[1]["json"]["contents"][0]["parts"][0]["text"])
+
+        # The deterministic result was stored when the token was issued; the answer is written back to it
+        stored = locator.place_store.result_at("ChIJ-zyx", 0, "Zyx Holdings")
+        self.assertEqual(stored.ai_classification.code, "6931")
+        self.assertIsNone(stored.candidate_token)
+        mock_post.reset_mock()
+        again = locator.get_business_details("1 Test St", lazy_ai=True)["result"]
+        mock_post.assert_not_called()  # Place cache and place store hits
+        self.assertEqual(again.ai_classification.code, "6931")
+
+    @patch('requests.post')
+    def test_eager_lookup_completes_lazily_stored_place(self, mock_post):
+        locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key", token_secret="test-secret")
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {"places": [{
+            "id": "ChIJ-zyx", "displayName": {"text": "Zyx Holdings"}, "primaryType": "point_of_interest",
+            "formattedAddress": "1 Test St",
+        }]}
+        gemini_response = MagicMock()
+        gemini_response.status_code = 200
+        gemini_response.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": json.dumps({"1": {"code": "6931"}})}]}}]
+        }
+        mock_post.side_effect = [text_response, gemini_response]
+
+        self.assertTrue(locator.get_business_details("1 Test St", lazy_ai=True)["result"].candidate_token)
+        result = locator.get_business_details("1 Test St")["result"]  # Place cache + place store hit
+        self.assertEqual(mock_post.call_count, 2)
+        self.assertEqual(result.ai_classification.code, "6931")
+
+    @patch('requests.post')
+    def test_lazy_ai_bulk_location(self, mock_post):
+        locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key", token_secret="test-secret")
+        nearby_response = MagicMock()
+        nearby_response.status_code = 200
+        nearby_response.json.return_value = {
+            "places": [{"displayName": {"text": "Zyx Holdings"}, "primaryType": "point_of_interest", "formattedAddress": "1 Test St"}]
+        }
+        mock_post.return_value = nearby_response
+
+        responses = locator.get_business_details_by_location_batch([(-37.8136, 144.9631)], lazy_ai=True)
+
+        mock_post.assert_called_once()  # Nearby search only, no Gemini call
+        self.assertTrue(responses[0]["candidates"][0].candidate_token)
+
+    @patch('requests.post')
+    def test_lazy_ai_address_batch(self, mock_post):
+        locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key", token_secret="test-secret")
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {
+            "places": [{"displayName": {"text": "Zyx Holdings"}, "primaryType": "point_of_interest", "formattedAddress": "1 Test St"}]
+        }
+        mock_post.return_value = text_response
+
+        responses = locator.get_business_details_batch(["1 Test St", "1 Test Street"], lazy_ai=True)
+
+        mock_post.assert_called_once()  # Text search only, no Gemini call
+        self.assertTrue(responses[0]["result"].candidate_token)
+        self.assertIs(responses[0], responses[1])
+
+    def test_keyword_match_serializes_hierarchy(self):
+        result = self.locator._enrich_deterministic({
+            "displayName": {"text": "Smith Legal Services"},
+            "primaryType": "consultant",
+            "types": ["consultant"],
+            "formattedAddress": "1 St"
+        })
+        self.assertEqual(result.source_intelligence.match_method, "keyword_match")
+        data = result.to_dict()
+        self.assertIn("division_title", data["recommended_classification"])
+        self.assertEqual(data["source_intelligence"]["raw_types"], ["consultant"])
+        self.assertIsNone(data["ai_classification"])
+
+    def test_hot_reload_invalidates_changed_codes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            codes_path = os.path.join(tmp, "anzsic_codes.json")
+            row = {"code": "6931", "title": "Legal Services", "division": "M", "division_title": "",
+                   "subdivision": "69", "subdivision_title": "", "group": "693", "group_title": ""}
+            with open(codes_path, "w") as f:
+                json.dump([row, dict(row, code="6932", title="Accounting Services")], f)
+
+            locator = BusinessAnzsicLocator("dummy_key", data_path=codes_path)
+            locator.ai_cache["A|1 St"] = AIClassification("6931", "Legal Services", True)
+            locator.ai_cache["B|1 St"] = AIClassification("6932", "Accounting Services", True)
+
+            # Same version on disk -> nothing to do
+            self.assertFalse(locator.reload_codes_if_changed(force=False))
+
+            with open(codes_path, "w") as f:
+                json.dump([dict(row, title="Legal Services (Revised)"), dict(row, code="6932", title="Accounting Services")], f)
+            with open(meta_path_for(codes_path), "w") as f:
+                json.dump({"version": 2}, f)
+            locator.reload_check_interval = 0
+
+            self.assertTrue(locator.reload_codes_if_changed())
+            self.assertEqual(locator.data_version, 2)
+            self.assertEqual(locator.ai_tier.official_titles["6931"], "Legal Services (Revised)")
+            self.assertNotIn("A|1 St", locator.ai_cache)
+            self.assertIn("B|1 St", locator.ai_cache)
+            # Tier 1 answers carry the new title too
+            self.assertEqual(locator.anzsic_map["lawyer"].title, "Legal Services (Revised)")
+            self.assertEqual(locator.anzsic_map["cafe"].title, "Cafes and Restaurants")
 
 if __name__ == '__main__':
     unittest.main()
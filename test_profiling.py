@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from anzsic_mapper import BusinessAnzsicLocator
+from auth import AdminAuth
+from profiling import RequestProfiler, upstream_call
+
+class TestRequestProfiler(unittest.TestCase):
+    def test_trigger(self):
+        profiler = RequestProfiler(auth=AdminAuth("secret"))
+        self.assertEqual(profiler.trigger("secret"), "header")
+        self.assertIsNone(profiler.trigger("wrong"))
+        self.assertIsNone(profiler.trigger(None))
+        self.assertEqual(RequestProfiler(sample_rate=1.0).trigger(None), "sampled")
+        self.assertIsNone(RequestProfiler().trigger("anything"))
+
+    @patch('requests.post')
+    def test_upstream_timings_follow_worker_threads(self, mock_post):
+        # Generic text search result, nearby search returns nothing -> the hit itself is classified
+        places = MagicMock(status_code=200)
+        places.json.return_value = {"places": [{
+            "id": "p1", "displayName": {"text": "Zyx Holdings"}, "primaryType": "corporate_office",
+            "types": ["corporate_office"], "formattedAddress": "1 Test St",
+        }]}
+        mock_post.return_value = places
+        locator = BusinessAnzsicLocator("dummy_key")
+        profiler = RequestProfiler(max_reports=2)
+
+        with profiler.profile("POST /api/identify", "header") as report:
+            locator.get_business_details_batch(["1 Test St", "2 Test St"])
+
+        names = [u["name"] for u in report.upstream]
+        self.assertEqual(names.count("places.searchText"), 2)
+        self.assertEqual(report.upstream[0]["status"], 200)
+        self.assertIn("get_business_details_batch", report.profile)
+
+        # Outside a profiled request nothing is recorded; the ring buffer keeps the newest reports
+        with upstream_call("places.searchText"):
+            pass
+        for label in ("second", "third"):
+            with profiler.profile(label, "sampled"):
+                pass
+        self.assertEqual([r["label"] for r in profiler.reports()], ["third", "second"])
+        self.assertEqual(len(report.upstream), 2)
+        self.assertIsNone(profiler.get(report.id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+import result_store
+from anzsic_mapper import BusinessAnzsicLocator
+from result_store import ResultStore
+
+def row(place_id, address_key, code, division, classified_at=1.0):
+    return {
+        "place_id": place_id,
+        "address_key": address_key,
+        "address": address_key.title(),
+        "business_name": f"Business {place_id}",
+        "detected_type": "cafe",
+        "code": code,
+        "code_title": f"Class {code}",
+        "division": division,
+        "division_title": f"Division {division}",
+        "subdivision": code[:2],
+        "subdivision_title": "",
+        "group": code[:3],
+        "group_title": "",
+        "code_source": "direct_map",
+        "classified_at": classified_at,
+    }
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "results")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def segments(self):
+        return [n for n in os.listdir(self.path) if n.startswith("seg-")]
+
+    def wait_for(self, condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline, "timed out")
+            time.sleep(0.01)
+
+    def test_buffers_until_flush_and_counts(self):
+        store = ResultStore(self.path, flush_rows=3)
+        self.addCleanup(store.close)
+        store.append([row("a", "1 george st", "4511", "H"), row("b", "2 george st", "4511", "H")])
+        self.assertEqual(len(store), 0)  # Still buffered
+        store.append([row("c", "3 george st", "6931", "M")])
+        self.wait_for(lambda: len(store) == 3)
+
+        self.assertEqual(store.count_by("division"), [
+            {"division": "H", "title": "Division H", "count": 2},
+            {"division": "M", "title": "Division M", "count": 1},
+        ])
+        self.assertEqual(store.count_by("code")[0], {"code": "4511", "title": "Class 4511", "count": 2})
+        with self.assertRaises(ValueError):
+            store.count_by("place_id")
+
+    def test_lookup_newest_first_and_reopen(self):
+        store = ResultStore(self.path)
+        store.append([row("a", "1 george st", "4511", "H", 1.0), row("b", "1 george st", "6931", "M", 1.0)])
+        store.flush()
+        store.append([row("a", "1 george st", "4512", "H", 2.0)])
+        store.flush()
+
+        reopened = ResultStore(self.path)
+        by_place = reopened.lookup(place_id="a")
+        self.assertEqual([(r["code"], r["classified_at"]) for r in by_place], [("4512", 2.0), ("4511", 1.0)])
+        self.assertEqual(by_place[0]["code_title"], "Class 4512")
+        self.assertEqual(len(reopened.lookup(address_key="1 george st")), 3)
+        self.assertEqual(len(reopened.lookup(address_key="1 george st", limit=2)), 2)
+        self.assertEqual(reopened.lookup(place_id="missing"), [])
+
+    def test_compact_merges_segments(self):
+        store = ResultStore(self.path)
+        for n in range(3):
+            store.append([row(str(n), f"{n} george st", "4511", "H")])
+            store.flush()
+        self.assertIsNotNone(store.compact())
+        self.assertEqual(len(self.segments()), 1)
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.lookup(place_id="1")[0]["address_key"], "1 george st")
+
+    def test_segments_are_written_and_compacted_off_the_appending_thread(self):
+        writers = []
+
+        def recording(function):
+            def record(*args, **kwargs):
+                writers.append(threading.current_thread())
+                return function(*args, **kwargs)
+            return record
+
+        store = ResultStore(self.path, flush_rows=1, compact_segments=3)
+        self.addCleanup(store.close)
+        with patch("result_store._write_segment", recording(result_store._write_segment)), \
+                patch("result_store._merge_segments", recording(result_store._merge_segments)):
+            for n in range(3):
+                store.append([row(str(n), f"{n} george st", "4511", "H")])
+                self.wait_for(lambda: len(writers) > n)
+            self.wait_for(lambda: len(writers) == 4 and len(self.segments()) == 1)
+        self.assertNotIn(threading.current_thread(), writers)
+        self.assertEqual(len(store), 3)
+
+    def test_size_tiered_runs_leave_large_segments_alone(self):
+        self.assertEqual(result_store._tiered_run([5000, 10, 10, 10], 3), 1)
+        self.assertEqual(result_store._tiered_run([5000, 10, 10, 10], 4), 4)  # The large one never joins
+        self.assertEqual(result_store._tiered_run([40, 20, 10, 10], 4), 0)
+        self.assertEqual(result_store._tiered_run([10], 2), 1)
+
+    def test_superseded_placeholders_are_not_counted_and_merged_away(self):
+        def placeholder(place_id, address_key):
+            return dict(row(place_id, address_key, "Unknown", ""), code_source="failed", classified_at=1.0)
+
+        store = ResultStore(self.path)
+        store.append([row("a", "1 george st", "4511", "H"), placeholder("x", "2 george st"),
+                      row("b", "3 george st", "6931", "M"), placeholder("y", "4 george st")])
+        store.flush()
+        store.append([dict(row("x", "2 george st", "6931", "M", 2.0), code_source="ai"),
+                      row("c", "5 george st", "4511", "H")])
+        store.flush()
+
+        expected = [{"code": "4511", "title": "Class 4511", "count": 2}, {"code": "6931", "title": "Class 6931", "count": 2},
+                    {"code": "Unknown", "title": "Class Unknown", "count": 1}]
+        self.assertEqual(store.count_by("code"), expected)
+        self.assertEqual(len(store), 6)
+
+        self.assertIsNotNone(store.compact())
+        self.assertEqual(len(store), 5)
+        self.assertEqual(store.count_by("code"), expected)
+        # Rows after a dropped one are still found through the merged indexes
+        for place_id, address_key, code in (("a", "1 george st", "4511"), ("b", "3 george st", "6931"),
+                                            ("y", "4 george st", "Unknown"), ("x", "2 george st", "6931"),
+                                            ("c", "5 george st", "4511")):
+            self.assertEqual([r["code"] for r in store.lookup(place_id=place_id)], [code])
+            self.assertEqual(store.lookup(address_key=address_key)[0]["place_id"], place_id)
+        self.assertEqual(store.lookup(place_id="b")[0]["division_title"], "Division M")
+
+    def test_compacted_segments_stay_readable_until_reads_finish(self):
+        store = ResultStore(self.path)
+        for n in range(2):
+            store.append([row(str(n), f"{n} george st", "4511", "H")])
+            store.flush()
+        with store._reading() as segments:
+            store.compact()
+            self.assertEqual(segments[0].row(0)["place_id"], "0")  # Files deleted, still mapped
+        self.assertEqual(segments[0]._maps, {})  # Unmapped after the read
+        self.assertEqual([s.rows for s in store._open_segments()], [2])
+
+    @patch('requests.post')
+    def test_locator_records_fresh_classifications(self, mock_post):
+        response = MagicMock()
+        response.status_code = 200
+        response.json.return_value = {"places": [{
+            "id": "place-1",
+            "displayName": {"text": "Test Cafe"},
+            "primaryType": "cafe",
+            "types": ["cafe", "restaurant", "food", "point_of_interest", "establishment"],
+            "formattedAddress": "123 Test St",
+        }]}
+        mock_post.return_value = response
+
+        store = ResultStore(self.path)
+        locator = BusinessAnzsicLocator("dummy_key", result_store=store)
+        locator.get_business_details("123 Test St")
+        locator.get_business_details("123 Test St")  # Served from the place cache: not recorded again
+        store.flush()
+
+        rows = store.lookup(place_id="place-1")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual((rows[0]["code"], rows[0]["division"], rows[0]["code_source"]), ("4511", "H", "direct_map"))
+        self.assertEqual(rows[0]["business_name"], "Test Cafe")
+
+    @patch('requests.post')
+    def test_on_demand_ai_answer_replaces_placeholder_row(self, mock_post):
+        text_response = MagicMock()
+        text_response.status_code = 200
+        text_response.json.return_value = {"places": [{
+            "id": "place-2", "displayName": {"text": "Zyx Holdings"}, "primaryType": "point_of_interest",
+            "formattedAddress": "1 Test St",
+        }]}
+        gemini_response = MagicMock()
+        gemini_response.status_code = 200
+        gemini_response.json.return_value = {
+            "candidates": [{"content": {"parts": [{"text": '{"1": {"code": "6931"}}'}]}}]
+        }
+
+        for flush_between in (False, True):
+            store = ResultStore(os.path.join(self.tmp.name, f"results-{flush_between}"))
+            locator = BusinessAnzsicLocator("dummy_key", "dummy_gemini_key", result_store=store)
+            mock_post.side_effect = [text_response, gemini_response]
+            token = locator.get_business_details("1 Test St", lazy_ai=True)["result"].candidate_token
+            if flush_between:
+                # A placeholder already written is superseded, and dropped by compaction
+                store.flush()
+                store.append([row("other", "other st", "4511", "H")])
+                store.flush()
+            locator.classify_candidate_tokens([token])
+            store.flush()
+            if flush_between:
+                self.assertEqual([r["code"] for r in store.lookup(place_id="place-2")], ["6931", "Unknown"])
+                store.compact()
+
+            rows = store.lookup(place_id="place-2")
+            self.assertEqual([(r["code"], r["code_source"]) for r in rows], [("6931", "ai")])
+
+if __name__ == '__main__':
+    unittest.main()
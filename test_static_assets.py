@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import sys
+import tempfile
+import unittest
+from flask import Flask, Response, jsonify, render_template_string
+from compression import choose_encoding, init_compression
+from static_assets import IMMUTABLE_CACHE_CONTROL, init_assets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "scripts"))
+from build_assets import build, minify_js  # noqa: E402
+
+class TestMinifyJs(unittest.TestCase):
+    def test_keeps_literals_and_line_breaks_that_matter(self):
+        source = (
+            "// header comment\n"
+            "const a = 'x // not a comment';\n"
+            "const b = `  <span>${value.replace(/_/g, ' ')}</span>  `; /* block */\n"
+            "let ratio = total / 2 / count\n"
+            "let c = a + +b\n"
+            "function f() {\n"
+            "    return /[/]x/.test(a)\n"
+            "}\n"
+        )
+        self.assertEqual(minify_js(source), (
+            "const a='x // not a comment';const b=`  <span>${value.replace(/_/g, ' ')}</span>  `;"
+            "let ratio=total/2/count\nlet c=a+ +b\nfunction f(){return/[/]x/.test(a)\n}\n"
+        ))
+
+class TestAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        for name, content in (("css/index.css", "body { color: red; }\n"), ("js/index.js", "// hi\nconst x = 1;\n")):
+            path = os.path.join(self.static, "src", name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def app(self):
+        app = Flask(__name__, static_folder=self.static)
+        init_assets(app)
+        app.add_url_rule("/page", "page", lambda: render_template_string(
+            "{{ assets_built }} {{ asset_url('css/index.css') }} {{ asset_url('js/index.js') }}"))
+        return app
+
+    def test_falls_back_to_sources_without_a_build(self):
+        page = self.app().test_client().get("/page").get_data(as_text=True)
+        self.assertEqual(page, "False /static/src/css/index.css /static/src/js/index.js")
+
+    def test_built_assets_are_fingerprinted_precompressed_and_immutable(self):
+        manifest = build(lambda path: open(path, "rb").read(), os.path.join(self.static, "src"),
+                         os.path.join(self.static, "dist"))
+        self.assertRegex(manifest["js/index.js"], r"^js/index\.[0-9a-f]{10}\.js$")
+        self.assertTrue(os.path.exists(os.path.join(self.static, "dist", manifest["js/index.js"] + ".gz")))
+
+        client = self.app().test_client()
+        page = client.get("/page").get_data(as_text=True)
+        self.assertEqual(page, f"True /static/dist/{manifest['css/index.css']} /static/dist/{manifest['js/index.js']}")
+
+        response = client.get(f"/static/dist/{manifest['js/index.js']}", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(response.headers["Cache-Control"], IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(response.mimetype, "text/javascript")
+        self.assertEqual(gzip.decompress(response.get_data()), b"const x=1;\n")
+
+        plain = client.get(f"/static/dist/{manifest['js/index.js']}")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertEqual(plain.get_data(), b"const x=1;\n")
+        self.assertEqual(client.get("/static/dist/manifest.json").status_code, 404)
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        app = Flask(__name__)
+        init_compression(app, min_size=100)
+        app.add_url_rule("/big", "big", lambda: jsonify({"items": ["4511 Cafes and Restaurants"] * 50}))
+        app.add_url_rule("/small", "small", lambda: jsonify({"ok": True}))
+        app.add_url_rule("/stream", "stream", lambda: Response(iter(["x" * 500]), mimetype="application/x-ndjson"))
+        self.client = app.test_client()
+
+    def test_large_json_is_compressed(self):
+        response = self.client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertEqual(len(json.loads(gzip.decompress(response.get_data()))["items"]), 50)
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.get_data()))
+
+    def test_small_streamed_or_unaccepted_responses_are_not(self):
+        self.assertNotIn("Content-Encoding", self.client.get("/small", headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/stream", headers={"Accept-Encoding": "gzip"}).headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/big").headers)
+        self.assertNotIn("Content-Encoding", self.client.get("/big", headers={"Accept-Encoding": "gzip;q=0"}).headers)
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip;q=0.5, identity"), "gzip")
+        self.assertEqual(choose_encoding("*"), "br" if choose_encoding("br") else "gzip")
+        self.assertIsNone(choose_encoding("identity"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import contextvars
+import io
+import json
+import logging
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from structured_logging import (
+    SamplingFilter,
+    configure_logging,
+    flush_logging,
+    request_context,
+    request_id_from_header,
+)
+
+class TestStructuredLogging(unittest.TestCase):
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.saved = (list(self.root.handlers), self.root.level)
+        self.stream = io.StringIO()
+        self.logger = logging.getLogger("test_structured_logging")
+
+    def tearDown(self):
+        configure_logging(stream=io.StringIO())  # Stops this test's listener
+        self.root.handlers, level = self.saved
+        self.root.setLevel(level)
+
+    def lines(self):
+        flush_logging()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_json_lines_carry_request_id_across_threads(self):
+        configure_logging(stream=self.stream)
+        with request_context("req-1"):
+            self.logger.info("Processing %s of %d", "batch", 3, extra={"items": 3})
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                pool.submit(contextvars.copy_context().run, self.logger.warning, "from worker").result()
+        self.logger.error("outside")
+
+        first, second, third = self.lines()
+        self.assertEqual((first["message"], first["level"], first["request_id"], first["items"]),
+                         ("Processing batch of 3", "INFO", "req-1", 3))
+        self.assertEqual(second["request_id"], "req-1")
+        self.assertNotIn("request_id", third)
+
+    def test_exceptions_are_rendered(self):
+        configure_logging(stream=self.stream)
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            self.logger.error("failed", exc_info=True)
+        entry, = self.lines()
+        self.assertIn("RuntimeError: boom", entry["exc"])
+
+    def test_sampling_is_per_request_and_spares_warnings(self):
+        configure_logging(stream=self.stream, sample_rate=0.5)
+        kept = set()
+        for n in range(40):
+            with request_context(f"req-{n}"):
+                self.logger.info("first")
+                self.logger.info("second")
+                self.logger.warning("always")
+        by_request = {}
+        for entry in self.lines():
+            by_request.setdefault(entry["request_id"], []).append(entry["message"])
+            if entry["message"] == "first":
+                kept.add(entry["request_id"])
+        self.assertEqual(len(by_request), 40)
+        self.assertTrue(0 < len(kept) < 40)
+        for request_id, messages in by_request.items():
+            expected = ["first", "second", "always"] if request_id in kept else ["always"]
+            self.assertEqual(messages, expected)
+
+        self.assertFalse(SamplingFilter(0).filter(logging.makeLogRecord({"levelno": logging.DEBUG})))
+
+    def test_request_id_from_header(self):
+        self.assertEqual(request_id_from_header("abc-123"), "abc-123")
+        self.assertEqual(len(request_id_from_header("bad id\n")), 32)
+        self.assertEqual(len(request_id_from_header(None)), 32)
+
+if __name__ == '__main__':
+    unittest.main()
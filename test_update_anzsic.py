@@ -0,0 +1,101 @@
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "scripts", "update_anzsic_from_abs.py")
+spec = importlib.util.spec_from_file_location("update_anzsic_from_abs", SCRIPT_PATH)
+updater = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(updater)
+
+CODELIST_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<m:Structure xmlns:m="http://www.sdmx.org/message" xmlns:s="http://www.sdmx.org/structure" xmlns:c="http://www.sdmx.org/common">
+  <s:Code id="M"><c:Name>Professional, Scientific and Technical Services</c:Name></s:Code>
+  <s:Code id="69"><c:Name>Professional, Scientific and Technical Services (Except Computer System Design and Related Services)</c:Name></s:Code>
+  <s:Code id="693"><c:Name>Legal and Accounting Services</c:Name></s:Code>
+  <s:Code id="6931"><c:Name>{legal_title}</c:Name></s:Code>
+  <s:Code id="6932"><c:Name>Accounting Services</c:Name></s:Code>
+</m:Structure>
+"""
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves the codelist with an ETag and honours If-None-Match."""
+    body = CODELIST_TEMPLATE.format(legal_title="Legal Services")
+    etag = '"v1"'
+    requests_seen = []
+
+    def do_GET(self):
+        FixtureHandler.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == FixtureHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = FixtureHandler.body.encode()
+        self.send_response(200)
+        self.send_header("ETag", FixtureHandler.etag)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestIncrementalUpdate(unittest.TestCase):
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), FixtureHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/codelist"
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp.name, "anzsic_codes.json")
+        FixtureHandler.requests_seen = []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def run_updater(self):
+        with redirect_stdout(io.StringIO()):
+            return updater.main(["--url", self.url, "--output", self.output])
+
+    def read_meta(self):
+        with open(updater.meta_path_for(self.output)) as f:
+            return json.load(f)
+
+    def test_conditional_refresh_and_diff(self):
+        FixtureHandler.body = CODELIST_TEMPLATE.format(legal_title="Legal Services")
+        FixtureHandler.etag = '"v1"'
+        self.run_updater()
+        meta = self.read_meta()
+        self.assertEqual(meta["version"], 1)
+        self.assertEqual(meta["last_diff"]["added"], ["6931", "6932"])
+
+        # Unchanged upstream -> 304, nothing rewritten
+        self.run_updater()
+        self.assertEqual(FixtureHandler.requests_seen[-1].get("If-None-Match"), '"v1"')
+        self.assertEqual(self.read_meta()["version"], 1)
+
+        # Retitled class -> version bump and diff
+        FixtureHandler.body = CODELIST_TEMPLATE.format(legal_title="Legal Services (Revised)")
+        FixtureHandler.etag = '"v2"'
+        self.run_updater()
+        meta = self.read_meta()
+        self.assertEqual(meta["version"], 2)
+        self.assertEqual(meta["etag"], '"v2"')
+        self.assertEqual(meta["last_diff"], {"added": [], "removed": [], "retitled": ["6931"]})
+        with open(self.output) as f:
+            entries = {e["code"]: e for e in json.load(f)}
+        self.assertEqual(entries["6931"]["title"], "Legal Services (Revised)")
+        self.assertEqual(entries["6931"]["division"], "M")
+
+
+if __name__ == '__main__':
+    unittest.main()